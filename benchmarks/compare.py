@@ -0,0 +1,133 @@
+"""
+Regression detection between two benchmark reports.
+"""
+from typing import Any, Dict, Iterable, List, Tuple
+
+# Absolute noise floors per metric unit; changes below these never count
+NOISE_FLOORS = {
+    "ms": None,  # taken from the ``min_ms`` argument
+    "mb": 5.0,
+    "bytes": 0.0,
+    "rps": 0.5,
+    "rate": 0.01,
+}
+
+# Units where a decrease is the regression
+HIGHER_IS_BETTER = {"rps"}
+
+
+def _flatten(record: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """Flatten nested numeric fields into dotted metric names."""
+    flat: Dict[str, float] = {}
+    for key, value in record.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, prefix=f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = float(value)
+    return flat
+
+
+def _metric_unit(name: str) -> str:
+    """Classify a metric by name; unknown metrics are not compared."""
+    if name.endswith(("median_ms", "p95_ms", "p99_ms")) or name == "total_ms":
+        return "ms"
+    if name.endswith("_rps"):
+        return "rps"
+    if name == "error_rate":
+        return "rate"
+    if name.endswith("_mb"):
+        return "mb"
+    if name.startswith("output_bytes."):
+        return "bytes"
+    return ""
+
+
+def _case_key(record: Dict[str, Any], key_fields: Iterable[str]) -> Tuple:
+    return tuple(record.get(field) for field in key_fields)
+
+
+def compare_results(
+    baseline: Dict[str, Any],
+    candidate: Dict[str, Any],
+    threshold: float = 0.10,
+    min_ms: float = 5.0,
+    key_fields: Iterable[str] = ("fixture", "size", "colors"),
+) -> List[Dict[str, Any]]:
+    """
+    Compare two benchmark reports case by case.
+
+    Args:
+        baseline: Report produced by the reference run
+        candidate: Report produced by the run under test
+        threshold: Relative increase that counts as a regression (0.10 = 10%)
+        min_ms: Timing changes smaller than this many ms are treated as noise
+        key_fields: Record fields that identify a case
+
+    Returns:
+        One finding per metric present in both reports, with the relative
+        change and whether it is a regression
+    """
+    key_fields = tuple(key_fields)
+    base_cases = {_case_key(r, key_fields): r for r in baseline.get("results", [])}
+    findings: List[Dict[str, Any]] = []
+
+    for record in candidate.get("results", []):
+        key = _case_key(record, key_fields)
+        base = base_cases.get(key)
+        if base is None:
+            continue
+
+        base_metrics = _flatten(base)
+        for name, new_value in _flatten(record).items():
+            unit = _metric_unit(name)
+            if not unit or name not in base_metrics:
+                continue
+
+            old_value = base_metrics[name]
+            delta = new_value - old_value
+            change = delta / old_value if old_value else (0.0 if delta == 0 else float("inf"))
+            floor = min_ms if unit == "ms" else NOISE_FLOORS[unit]
+            # Positive means worse, whichever direction the metric grows
+            sign = -1.0 if unit in HIGHER_IS_BETTER else 1.0
+            findings.append(
+                {
+                    "case": dict(zip(key_fields, key)),
+                    "metric": name,
+                    "baseline": old_value,
+                    "candidate": new_value,
+                    "change": change,
+                    "regression": sign * change > threshold and sign * delta > floor,
+                    "improvement": sign * change < -threshold and -sign * delta > floor,
+                }
+            )
+
+    return findings
+
+
+def format_report(findings: List[Dict[str, Any]]) -> str:
+    """
+    Render comparison findings as a human-readable table.
+
+    Args:
+        findings: Output of ``compare_results``
+
+    Returns:
+        Report text listing regressions and improvements
+    """
+    regressions = [f for f in findings if f["regression"]]
+    improvements = [f for f in findings if f["improvement"]]
+
+    lines = [f"Compared {len(findings)} metrics: {len(regressions)} regressions, {len(improvements)} improvements"]
+    for title, items in (("REGRESSIONS", regressions), ("Improvements", improvements)):
+        if not items:
+            continue
+        lines.append("")
+        lines.append(title)
+        for f in sorted(items, key=lambda item: -abs(item["change"])):
+            case = " ".join(f"{k}={v}" for k, v in f["case"].items())
+            lines.append(
+                f"  {case:<40} {f['metric']:<40} "
+                f"{f['baseline']:>12.1f} -> {f['candidate']:>12.1f} ({f['change']:+.1%})"
+            )
+    return "\n".join(lines)
@@ -0,0 +1,208 @@
+"""
+Benchmark fixtures: synthetic generators and real sample images.
+
+Every fixture is produced as encoded PNG bytes so the decode stage is
+measured exactly as the API sees it.
+"""
+import io
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import cv2
+import numpy as np
+from PIL import Image
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+PARKS_LOGO_PATH = REPO_ROOT / "Parks Canada Logo.png"
+
+
+def _encode_png(image: np.ndarray) -> bytes:
+    """
+    Encode an RGB or RGBA numpy array as PNG bytes.
+
+    Args:
+        image: Image array in RGB(A) order
+
+    Returns:
+        PNG bytes
+    """
+    buffer = io.BytesIO()
+    Image.fromarray(image).save(buffer, format="PNG", compress_level=1)
+    return buffer.getvalue()
+
+
+def _canvas_size(size: int, aspect: float) -> tuple:
+    """Return (width, height) with the long side equal to ``size``."""
+    if aspect >= 1.0:
+        return size, max(int(round(size / aspect)), 1)
+    return max(int(round(size * aspect)), 1), size
+
+
+def make_flat_logo(size: int, seed: int = 0) -> bytes:
+    """
+    Flat-color logo: a few anti-aliased shapes on a white background.
+
+    Args:
+        size: Long side in pixels
+        seed: Random seed
+
+    Returns:
+        PNG bytes
+    """
+    rng = np.random.default_rng(seed)
+    width, height = _canvas_size(size, 1.0)
+    image = np.full((height, width, 3), 255, dtype=np.uint8)
+    palette = [(200, 16, 46), (0, 92, 60), (250, 180, 0), (20, 40, 120), (30, 30, 30)]
+
+    scale = size / 256.0
+    for i in range(6):
+        color = tuple(int(c) for c in palette[i % len(palette)])
+        center = (int(rng.integers(width // 5, 4 * width // 5)), int(rng.integers(height // 5, 4 * height // 5)))
+        if i % 2 == 0:
+            radius = int(rng.integers(20, 60) * scale)
+            cv2.circle(image, center, radius, color, -1, lineType=cv2.LINE_AA)
+        else:
+            pts = rng.integers(0, size, size=(5, 2)).astype(np.int32)
+            cv2.fillPoly(image, [pts], color, lineType=cv2.LINE_AA)
+
+    return _encode_png(image)
+
+
+def make_photo(size: int, seed: int = 0) -> bytes:
+    """
+    Photo-like image: smooth gradients, soft blobs and sensor noise.
+
+    Args:
+        size: Long side in pixels
+        seed: Random seed
+
+    Returns:
+        PNG bytes
+    """
+    rng = np.random.default_rng(seed)
+    width, height = _canvas_size(size, 1.5)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    x /= max(width - 1, 1)
+    y /= max(height - 1, 1)
+
+    image = np.empty((height, width, 3), dtype=np.float32)
+    image[..., 0] = 40 + 180 * x
+    image[..., 1] = 60 + 150 * y
+    image[..., 2] = 120 + 100 * (1 - x) * y
+
+    for _ in range(8):
+        cx, cy = rng.random(2)
+        sigma = 0.05 + 0.15 * rng.random()
+        blob = np.exp(-((x - cx) ** 2 + (y - cy) ** 2) / (2 * sigma**2))
+        image += blob[..., None] * rng.uniform(-80, 80, size=3).astype(np.float32)
+
+    image += rng.normal(0, 6, size=image.shape).astype(np.float32)
+    return _encode_png(np.clip(image, 0, 255).astype(np.uint8))
+
+
+def make_transparent(size: int, seed: int = 0) -> bytes:
+    """
+    RGBA logo on a fully transparent background.
+
+    Args:
+        size: Long side in pixels
+        seed: Random seed
+
+    Returns:
+        PNG bytes
+    """
+    logo = np.array(Image.open(io.BytesIO(make_flat_logo(size, seed))).convert("RGB"))
+    alpha = np.where(np.all(logo == 255, axis=2), 0, 255).astype(np.uint8)
+    rgba = np.dstack([logo, alpha])
+    rgba[alpha == 0, :3] = 0
+    return _encode_png(rgba)
+
+
+def make_poster(size: int, seed: int = 0) -> bytes:
+    """
+    Poster-like image: many overlapping shapes, bands and text.
+
+    Args:
+        size: Long side in pixels
+        seed: Random seed
+
+    Returns:
+        PNG bytes
+    """
+    rng = np.random.default_rng(seed)
+    width, height = _canvas_size(size, 0.7)
+    image = np.full((height, width, 3), (245, 238, 220), dtype=np.uint8)
+
+    band = max(height // 12, 1)
+    for i in range(0, height, 2 * band):
+        image[i : i + band] = rng.integers(0, 256, size=3, dtype=np.uint8)
+
+    for _ in range(40):
+        color = tuple(int(c) for c in rng.integers(0, 256, size=3))
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        axes = (int(rng.integers(4, max(width // 6, 5))), int(rng.integers(4, max(height // 6, 5))))
+        cv2.ellipse(image, center, axes, float(rng.uniform(0, 180)), 0, 360, color, -1, cv2.LINE_AA)
+
+    font_scale = max(size / 400.0, 0.3)
+    thickness = max(int(size / 200), 1)
+    for row in range(5):
+        origin = (width // 12, int(height * (0.15 + 0.17 * row)))
+        cv2.putText(image, "EK TOOLS 2026", origin, cv2.FONT_HERSHEY_SIMPLEX, font_scale, (15, 15, 15), thickness, cv2.LINE_AA)
+
+    return _encode_png(image)
+
+
+def load_parks_logo(size: int, seed: int = 0) -> bytes:
+    """
+    Real-world fixture: the Parks Canada logo resized to ``size``.
+
+    Args:
+        size: Long side in pixels
+        seed: Unused, kept for a uniform generator signature
+
+    Returns:
+        PNG bytes
+    """
+    image = Image.open(PARKS_LOGO_PATH)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA")
+    width, height = _canvas_size(size, image.width / image.height)
+    resample = Image.Resampling.LANCZOS if size > max(image.size) else Image.Resampling.BOX
+    resized = image.resize((width, height), resample)
+    return _encode_png(np.array(resized))
+
+
+FIXTURES: Dict[str, Callable[[int, int], bytes]] = {
+    "logo": make_flat_logo,
+    "photo": make_photo,
+    "transparent": make_transparent,
+    "poster": make_poster,
+    "parks": load_parks_logo,
+}
+
+
+def available_fixtures() -> List[str]:
+    """Names of fixtures that can be generated in this checkout."""
+    names = list(FIXTURES)
+    if not PARKS_LOGO_PATH.exists():
+        names.remove("parks")
+    return names
+
+
+def make_fixture(name: str, size: int, seed: int = 0) -> bytes:
+    """
+    Generate a named fixture at the given size.
+
+    Args:
+        name: Fixture name (see ``FIXTURES``)
+        size: Long side in pixels
+        seed: Random seed for synthetic fixtures
+
+    Returns:
+        PNG bytes
+    """
+    try:
+        generator = FIXTURES[name]
+    except KeyError:
+        raise ValueError(f"Unknown fixture '{name}'. Choose from: {', '.join(FIXTURES)}") from None
+    return generator(size, seed)
@@ -0,0 +1,103 @@
+"""
+Per-task IPC overhead of handing frames to a worker process.
+
+A worker receives an (H, W, 3) uint8 frame and returns an (H, W, 4) result,
+the shape of a background removal. Both directions go either through the
+worker pipe (the arrays are pickled) or through shared memory segments (only
+``SharedHandle`` tuples are pickled, the input already sits in a segment as
+it would after decoding). The worker's only work is filling the result, also
+timed in-process, so the difference is what moving the arrays costs.
+"""
+import statistics
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from src.core.sandbox import RenderSandbox
+from src.core.shared_arrays import SharedArena, attach
+
+
+def _pickled_task(image: np.ndarray):
+    """Worker side of the pipe transfer."""
+    yield np.full(image.shape[:2] + (4,), 255, dtype=np.uint8)
+
+
+def _shared_task(image, result):
+    """Worker side of the shared memory transfer."""
+    with attach(image), attach(result) as out:
+        out.fill(255)
+    return iter(())
+
+
+def _median_ms(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000.0)
+    return round(statistics.median(times), 3)
+
+
+def run_ipc_case(megapixels: float, repeat: int = 5) -> Dict[str, Any]:
+    """
+    Time one frame size both ways.
+
+    Args:
+        megapixels: Frame size (4:3 aspect)
+        repeat: Timed round trips per transfer
+
+    Returns:
+        Result record
+    """
+    height = max(1, int(round((megapixels * 1e6 * 3 / 4) ** 0.5)))
+    width = max(1, int(round(height * 4 / 3)))
+    frame = np.random.default_rng(0).integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+    fill_ms = _median_ms(lambda: np.full((height, width, 4), 255, dtype=np.uint8), repeat)
+
+    pickled = RenderSandbox(_pickled_task, workers=1, timeout=300)
+    shared_sandbox = RenderSandbox(_shared_task, workers=1, timeout=300)
+    try:
+        def round_trip_pickled():
+            (result,) = pickled.render_stream(frame)
+            return result
+
+        with SharedArena() as inputs:
+            image = inputs.empty(frame.shape, np.uint8)
+            image[:] = frame
+            image_handle = inputs.handle(image)
+
+            def round_trip_shared():
+                with SharedArena() as outputs:
+                    result = outputs.empty((height, width, 4), np.uint8)
+                    shared_sandbox.render(image_handle, outputs.handle(result))
+                    del result
+
+            # Start the workers outside the timings
+            round_trip_pickled()
+            round_trip_shared()
+            pickled_ms = _median_ms(round_trip_pickled, repeat)
+            shared_ms = _median_ms(round_trip_shared, repeat)
+            del image
+    finally:
+        pickled.close()
+        shared_sandbox.close()
+
+    return {
+        "megapixels": round(width * height / 1e6, 2),
+        "width": width,
+        "height": height,
+        "bytes_in": int(frame.nbytes),
+        "bytes_out": int(width * height * 4),
+        "fill_ms": fill_ms,
+        "pickled_ms": pickled_ms,
+        "shared_ms": shared_ms,
+        "pickled_overhead_ms": round(pickled_ms - fill_ms, 3),
+        "shared_overhead_ms": round(shared_ms - fill_ms, 3),
+    }
+
+
+def run_ipc_benchmarks(megapixels: List[float], repeat: int = 5) -> List[Dict[str, Any]]:
+    """Run ``run_ipc_case`` for every frame size."""
+    return [run_ipc_case(mp, repeat) for mp in megapixels]
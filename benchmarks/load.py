@@ -0,0 +1,419 @@
+"""
+Load test: the real server under a concurrent mix of API requests.
+
+The app is started with ``src.serve`` (the production preforking server) on
+a free local port, then a weighted mix of scenarios is replayed against it
+over HTTP, either by a fixed number of concurrent clients (closed loop) or
+at a fixed Poisson arrival rate (open loop). In the open loop, latency is
+measured from each request's scheduled arrival, so time spent waiting for a
+saturated server is not hidden (no coordinated omission).
+
+Records are written per scenario and per endpoint, in the same report shape
+as the pipeline benchmarks, so ``compare`` works on them: latency
+percentiles, throughput, error and 429 counts, and the peak RSS of the
+server's process tree while that endpoint had requests in flight.
+"""
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from benchmarks.fixtures import REPO_ROOT, make_fixture
+from benchmarks.startup import free_port, wait_until_healthy
+
+# Seconds between RSS samples of the server process tree
+RSS_SAMPLE_INTERVAL = 0.05
+
+# Open-loop requests allowed in flight before new arrivals are dropped
+MAX_OUTSTANDING = 1000
+
+
+class Scenario(NamedTuple):
+    """
+    One kind of request in the traffic mix.
+
+    Attributes:
+        endpoint: API path
+        fixture: Benchmark fixture the upload is made from
+        size: Fixture long side in pixels
+        colors: ``colors`` form value for /vectorize (None otherwise)
+        method: ``method`` form value for /remove-background
+    """
+
+    endpoint: str
+    fixture: str
+    size: int
+    colors: Optional[str] = None
+    method: Optional[str] = None
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "vectorize_logo_512": Scenario("/vectorize", "logo", 512, colors="4"),
+    "vectorize_photo_1024": Scenario("/vectorize", "photo", 1024, colors="8"),
+    "vectorize_poster_2048_auto": Scenario("/vectorize", "poster", 2048, colors="auto"),
+    "rasterize_logo_512": Scenario("/rasterize", "logo", 512, colors="6"),
+    "remove_bg_photo_512": Scenario("/remove-background", "photo", 512, method="kmeans"),
+}
+
+DEFAULT_MIX: Dict[str, float] = {
+    "vectorize_logo_512": 4,
+    "vectorize_photo_1024": 2,
+    "vectorize_poster_2048_auto": 1,
+    "rasterize_logo_512": 2,
+    "remove_bg_photo_512": 1,
+}
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """
+    Parse ``name:weight,name:weight`` (weight defaults to 1).
+
+    Raises:
+        ValueError: Unknown scenario or non-positive weight
+    """
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.strip().partition(":")
+        if not name:
+            continue
+        if name not in SCENARIOS:
+            raise ValueError(f"unknown scenario {name!r}; known: {', '.join(SCENARIOS)}")
+        mix[name] = float(weight) if weight else 1.0
+        if mix[name] <= 0:
+            raise ValueError(f"weight of {name} must be positive")
+    return mix
+
+
+def build_request(scenario: Scenario) -> Tuple[Dict[str, tuple], Dict[str, str]]:
+    """
+    Multipart files and form fields for a scenario.
+
+    /rasterize uploads the SVG the pipeline makes from the fixture.
+    """
+    png = make_fixture(scenario.fixture, scenario.size)
+    if scenario.endpoint == "/rasterize":
+        from src.core.pipeline import vectorize_image
+
+        svg = vectorize_image(png, colors=int(scenario.colors)).svg.encode("utf-8")
+        return {"file": ("input.svg", svg, "image/svg+xml")}, {}
+    data = {}
+    if scenario.colors is not None:
+        data["colors"] = scenario.colors
+    if scenario.method is not None:
+        data["method"] = scenario.method
+    return {"file": ("input.png", png, "image/png")}, data
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile ``q`` (0-100) of ``values``."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), int(-(-q * len(ordered) // 100))))
+    return ordered[rank - 1]
+
+
+def tree_rss_bytes(pid: int) -> Optional[int]:
+    """
+    Resident memory of a process and all its descendants (Linux only).
+
+    Returns:
+        Bytes, or None where ``/proc`` is not available
+    """
+    page = os.sysconf("SC_PAGE_SIZE")
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/statm") as statm:
+                total += int(statm.read().split()[1]) * page
+            with open(f"/proc/{current}/task/{current}/children") as children:
+                pending.extend(int(child) for child in children.read().split())
+        except (OSError, ValueError, IndexError):
+            if current == pid:
+                return None
+    return total
+
+
+@contextmanager
+def start_server(workers: int = 1, rate_limits: bool = False, timeout: float = 180.0) -> Iterator[Tuple[str, int]]:
+    """
+    Run ``src.serve`` on a free local port until the block exits.
+
+    Args:
+        workers: Worker processes
+        rate_limits: Keep the per-client rate limits (one client IP sends
+            everything, so they normally turn the run into 429s)
+        timeout: Seconds to wait for the server to become healthy
+
+    Yields:
+        (base URL, server pid)
+    """
+    port = free_port()
+    env = dict(os.environ, EKTOOLS_RATE_LIMITS="1" if rate_limits else "0")
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "src.serve",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning",
+        ],
+        cwd=REPO_ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_healthy(base_url + "/health", server, timeout)
+        yield base_url, server.pid
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+class _Recorder:
+    """Outcomes per scenario and RSS peaks per endpoint."""
+
+    def __init__(self, mix: Dict[str, float]):
+        self.latencies: Dict[str, List[float]] = {name: [] for name in mix}
+        self.statuses: Dict[str, Dict[str, int]] = {name: {} for name in mix}
+        self.in_flight: Dict[str, int] = {}
+        self.peak_rss: Dict[str, int] = {}
+        self.dropped = 0
+
+    def record(self, name: str, outcome: str, latency_ms: Optional[float]) -> None:
+        counts = self.statuses[name]
+        counts[outcome] = counts.get(outcome, 0) + 1
+        if latency_ms is not None:
+            self.latencies[name].append(latency_ms)
+
+    def sample_rss(self, rss: Optional[int]) -> None:
+        if rss is None:
+            return
+        self.peak_rss["all"] = max(self.peak_rss.get("all", 0), rss)
+        for endpoint, count in self.in_flight.items():
+            if count:
+                self.peak_rss[endpoint] = max(self.peak_rss.get(endpoint, 0), rss)
+
+
+async def _send(client, recorder: _Recorder, name: str, request, started: float) -> None:
+    """Send one request and record its outcome, timed from ``started``."""
+    endpoint = SCENARIOS[name].endpoint
+    recorder.in_flight[endpoint] = recorder.in_flight.get(endpoint, 0) + 1
+    try:
+        files, data = request
+        response = await client.post(endpoint, files=files, data=data)
+        await response.aread()
+        if response.status_code == 429:
+            outcome = "rate_limited"
+        elif response.status_code >= 400:
+            outcome = "error"
+        else:
+            outcome = "ok"
+    except Exception:  # noqa: BLE001 - connection errors and timeouts count as errors
+        outcome = "error"
+    finally:
+        recorder.in_flight[endpoint] -= 1
+    recorder.record(name, outcome, (time.perf_counter() - started) * 1000.0)
+
+
+async def _drive(
+    base_url: str,
+    server_pid: Optional[int],
+    mix: Dict[str, float],
+    requests: Dict[str, tuple],
+    concurrency: Optional[int],
+    rate: Optional[float],
+    duration: float,
+    seed: int,
+    timeout: float,
+) -> Tuple[_Recorder, float]:
+    import httpx
+
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    recorder = _Recorder(mix)
+    connections = concurrency if concurrency else MAX_OUTSTANDING
+
+    async def sample_rss() -> None:
+        while True:
+            recorder.sample_rss(tree_rss_bytes(server_pid) if server_pid else None)
+            await asyncio.sleep(RSS_SAMPLE_INTERVAL)
+
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        sampler = asyncio.ensure_future(sample_rss())
+        start = time.perf_counter()
+        end = start + duration
+
+        if concurrency:
+            # Closed loop: every client sends its next request when the
+            # previous one finished
+            async def client_loop() -> None:
+                while time.perf_counter() < end:
+                    name = rng.choices(names, weights)[0]
+                    await _send(client, recorder, name, requests[name], time.perf_counter())
+
+            await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        else:
+            # Open loop: Poisson arrivals regardless of how the server copes
+            tasks = set()
+            arrival = start
+            while True:
+                arrival += rng.expovariate(rate)
+                if arrival >= end:
+                    break
+                await asyncio.sleep(max(0.0, arrival - time.perf_counter()))
+                name = rng.choices(names, weights)[0]
+                if len(tasks) >= MAX_OUTSTANDING:
+                    recorder.dropped += 1
+                    continue
+                task = asyncio.ensure_future(_send(client, recorder, name, requests[name], arrival))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+
+        elapsed = time.perf_counter() - start
+        sampler.cancel()
+    return recorder, elapsed
+
+
+def _summary_record(
+    fixture: str,
+    endpoint: str,
+    size: Optional[int],
+    colors: Optional[str],
+    latencies: List[float],
+    counts: Dict[str, int],
+    elapsed: float,
+    peak_rss: Optional[int],
+) -> Dict[str, Any]:
+    requests = sum(counts.values())
+    ok = counts.get("ok", 0)
+    return {
+        "fixture": fixture,
+        "endpoint": endpoint,
+        "size": size,
+        "colors": colors,
+        "requests": requests,
+        "ok": ok,
+        "errors": counts.get("error", 0),
+        "rate_limited": counts.get("rate_limited", 0),
+        "error_rate": round(counts.get("error", 0) / requests, 4) if requests else 0.0,
+        "throughput_rps": round(ok / elapsed, 3) if elapsed else 0.0,
+        "latency": {
+            "median_ms": round(percentile(latencies, 50), 3),
+            "p95_ms": round(percentile(latencies, 95), 3),
+            "p99_ms": round(percentile(latencies, 99), 3),
+            "max_ms": round(max(latencies), 3) if latencies else 0.0,
+        },
+        "peak_rss_mb": round(peak_rss / (1024 * 1024), 1) if peak_rss else None,
+    }
+
+
+def summarize(recorder: _Recorder, mix: Dict[str, float], elapsed: float) -> List[Dict[str, Any]]:
+    """
+    Result records: one per scenario, one per endpoint and one for all
+    traffic (fixture ``"all"``).
+    """
+    records = []
+    groups: Dict[str, Tuple[List[float], Dict[str, int]]] = {}
+    for name in mix:
+        scenario = SCENARIOS[name]
+        latencies, counts = recorder.latencies[name], recorder.statuses[name]
+        records.append(
+            _summary_record(
+                name, scenario.endpoint, scenario.size, scenario.colors,
+                latencies, counts, elapsed, recorder.peak_rss.get(scenario.endpoint),
+            )
+        )
+        for group in (scenario.endpoint, "all"):
+            group_latencies, group_counts = groups.setdefault(group, ([], {}))
+            group_latencies.extend(latencies)
+            for outcome, count in counts.items():
+                group_counts[outcome] = group_counts.get(outcome, 0) + count
+
+    for group in sorted(groups, key=lambda name: name == "all"):
+        latencies, counts = groups[group]
+        records.append(
+            _summary_record(
+                group, group, None, None, latencies, counts, elapsed, recorder.peak_rss.get(group)
+            )
+        )
+    return records
+
+
+def run_load(
+    mix: Optional[Dict[str, float]] = None,
+    concurrency: Optional[int] = 8,
+    rate: Optional[float] = None,
+    duration: float = 30.0,
+    workers: int = 1,
+    seed: int = 0,
+    rate_limits: bool = False,
+    timeout: float = 120.0,
+    base_url: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Start the server and replay the traffic mix against it.
+
+    Args:
+        mix: Scenario name -> relative weight (default ``DEFAULT_MIX``)
+        concurrency: Concurrent clients (closed loop); ignored with ``rate``
+        rate: Mean arrivals per second (open loop)
+        duration: Seconds of traffic
+        workers: Server worker processes
+        seed: Seed for the scenario sequence and arrival times
+        rate_limits: Keep the per-client rate limits
+        timeout: Per-request timeout in seconds
+        base_url: Load an already running server instead (peak RSS is then
+            not measured)
+
+    Returns:
+        Report dict with ``meta`` and ``results``
+    """
+    from benchmarks.run import _git_commit
+
+    mix = dict(mix or DEFAULT_MIX)
+    if rate:
+        concurrency = None
+    requests = {name: build_request(SCENARIOS[name]) for name in mix}
+
+    def drive(url: str, pid: Optional[int]) -> Tuple[_Recorder, float]:
+        return asyncio.run(
+            _drive(url, pid, mix, requests, concurrency, rate, duration, seed, timeout)
+        )
+
+    if base_url:
+        recorder, elapsed = drive(base_url, None)
+    else:
+        with start_server(workers, rate_limits=rate_limits) as (url, pid):
+            recorder, elapsed = drive(url, pid)
+
+    return {
+        "meta": {
+            "git_commit": _git_commit(),
+            "mode": "open" if rate else "closed",
+            "concurrency": concurrency,
+            "rate": rate,
+            "duration_s": duration,
+            "elapsed_s": round(elapsed, 3),
+            "workers": workers,
+            "cpu_count": os.cpu_count(),
+            "rate_limits": rate_limits,
+            "seed": seed,
+            "mix": mix,
+            "dropped": recorder.dropped,
+        },
+        "results": summarize(recorder, mix, elapsed),
+    }
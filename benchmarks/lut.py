@@ -0,0 +1,103 @@
+"""
+Lookup-table color assignment against brute-force nearest-color assignment.
+
+For every fixture and size a palette is fitted once, then every pixel is
+labeled three ways: brute force over all palette colors (what K-means
+``predict`` does), the lookup table alone, and the lookup table with exact
+refinement. Records hold the timings, the table build time, the share of
+ambiguous cells and how often the unrefined table disagrees with brute force.
+"""
+import statistics
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from benchmarks.fixtures import make_fixture
+
+
+def assign_brute_force(image: np.ndarray, colors: np.ndarray, chunk: int = 1 << 16) -> np.ndarray:
+    """Nearest palette index per pixel from all pixel-to-color distances."""
+    pixels = image.reshape(-1, 3)
+    centers = colors.astype(np.float32)
+    labels = np.empty(len(pixels), dtype=np.int32)
+    for start in range(0, len(pixels), chunk):
+        block = pixels[start : start + chunk][:, ::-1].astype(np.float32)
+        distances = ((block[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        labels[start : start + len(block)] = distances.argmin(axis=1)
+    return labels
+
+
+def _median_ms(fn, repeat: int):
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - start) * 1000.0)
+    return round(statistics.median(times), 3), result
+
+
+def run_lut_case(fixture: str, size: int, colors: int, bits: int, repeat: int = 3) -> Dict[str, Any]:
+    """
+    Compare assignment methods on one fixture.
+
+    Args:
+        fixture: Fixture name
+        size: Long side in pixels
+        colors: Palette size
+        bits: Lookup table resolution in bits per channel
+        repeat: Timed repetitions
+
+    Returns:
+        Result record
+    """
+    from src.core.color_lut import ColorLUT
+    from src.core.quantize import quantize_colors
+    from src.utils.image_io import load_image_from_bytes
+
+    image, _ = load_image_from_bytes(make_fixture(fixture, size))
+    _, _, palette = quantize_colors(image, colors, quantized=False)
+    centers = np.asarray(palette, dtype=np.uint8)
+
+    brute_ms, reference = _median_ms(lambda: assign_brute_force(image, centers), repeat)
+    build_ms, lut = _median_ms(lambda: ColorLUT(centers, bits), repeat)
+    lut_ms, approximate = _median_ms(lambda: lut.assign(image, exact=False), repeat)
+    exact_ms, refined = _median_ms(lambda: lut.assign(image, exact=True), repeat)
+
+    # Extra distance paid by pixels the unrefined table labels differently
+    pixels = image.reshape(-1, 3)[:, ::-1].astype(np.float32)
+    wrong = approximate != reference
+    extra = np.linalg.norm(pixels[wrong] - centers[approximate[wrong]], axis=1) - np.linalg.norm(
+        pixels[wrong] - centers[reference[wrong]], axis=1
+    )
+
+    return {
+        "fixture": fixture,
+        "size": size,
+        "colors": colors,
+        "bits": bits,
+        "pixels": int(len(pixels)),
+        "brute_force_ms": brute_ms,
+        "lut_build_ms": build_ms,
+        "lut_ms": lut_ms,
+        "lut_exact_ms": exact_ms,
+        "speedup": round(brute_ms / lut_ms, 2) if lut_ms else None,
+        "speedup_exact": round(brute_ms / exact_ms, 2) if exact_ms else None,
+        "ambiguous_cells": round(lut.ambiguous_fraction, 4),
+        "agreement": round(1.0 - float(wrong.mean()), 6),
+        "max_extra_distance": round(float(extra.max()), 3) if extra.size else 0.0,
+        "exact_matches": bool(np.array_equal(refined, reference)),
+    }
+
+
+def run_lut_benchmarks(
+    fixtures: List[str], sizes: List[int], colors: int = 8, bits: List[int] = (5, 6), repeat: int = 3
+) -> List[Dict[str, Any]]:
+    """Run ``run_lut_case`` over every fixture, size and resolution."""
+    return [
+        run_lut_case(fixture, size, colors, b, repeat)
+        for fixture in fixtures
+        for size in sizes
+        for b in bits
+    ]
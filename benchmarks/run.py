@@ -0,0 +1,478 @@
+"""
+Benchmark runner for the full image pipeline.
+
+Runs every fixture/size combination through the same ``src`` functions the
+API uses, recording per-stage wall time, peak RSS and output sizes to JSON.
+A ``compare`` subcommand flags regressions between two result files.
+
+Usage:
+    python -m benchmarks.run run --sizes 256,1024 --output bench.json
+    python -m benchmarks.run run --startup-only --output startup.json
+    python -m benchmarks.run compare baseline.json bench.json
+    python -m benchmarks.run lut --sizes 1024,4096 --bits 5,6
+    python -m benchmarks.run ipc --megapixels 1,4,12
+    python -m benchmarks.run load --concurrency 8 --duration 30 --output load.json
+"""
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.compare import compare_results, format_report
+from benchmarks.fixtures import available_fixtures, make_fixture, REPO_ROOT
+from benchmarks.ipc import run_ipc_benchmarks
+from benchmarks.load import DEFAULT_MIX, SCENARIOS, parse_mix, run_load
+from benchmarks.lut import run_lut_benchmarks
+from benchmarks.startup import run_startup
+
+STAGES = [
+    "decode",
+    "prefilter",
+    "quantize",
+    "masks",
+    "trace",
+    "build_svg",
+    "rasterize",
+    "remove_background",
+]
+
+SIZE_PROFILES = {
+    "quick": [256, 512, 1024],
+    "full": [256, 512, 1024, 2048, 4096, 8192],
+}
+
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of the current process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def _timed(timings: Dict[str, List[float]], stage: str, fn: Callable[[], Any]) -> Any:
+    """Run ``fn`` and append its wall time in ms to ``timings[stage]``."""
+    start = time.perf_counter()
+    result = fn()
+    timings.setdefault(stage, []).append((time.perf_counter() - start) * 1000.0)
+    return result
+
+
+def run_pipeline(
+    png_bytes: bytes,
+    colors: int,
+    stages: List[str],
+    timings: Dict[str, List[float]],
+    tracer: str = "shared",
+    prefilter: str = "none",
+) -> Dict[str, int]:
+    """
+    Run one pass of the pipeline, mirroring the API endpoints.
+
+    Args:
+        png_bytes: Encoded input image
+        colors: Number of colors for vectorization
+        stages: Stages to run (subset of ``STAGES``)
+        timings: Dict that collects per-stage timings in ms
+        tracer: "shared" (one pass over the label image) or "layers"
+            (per-color masks, the ``masks`` stage)
+        prefilter: Smoothing method for the ``prefilter`` stage ("none" skips it)
+
+    Returns:
+        Output sizes in bytes keyed by artifact name
+    """
+    from src.utils.image_io import load_image_from_bytes
+    from src.core.quantize import quantize_colors, get_color_masks
+    from src.utils.mask_ops import DEFAULT_SPECKLE_AREA, filter_speckles
+    from src.core.trace import trace_label_image, trace_mask
+    from src.core.svg_builder import build_svg
+    from src.core.pipeline import _determine_scale_factor
+    from src.core.prefilter import prefilter_image
+
+    outputs: Dict[str, int] = {}
+    opencv_image, pil_image = _timed(timings, "decode", lambda: load_image_from_bytes(png_bytes))
+    width, height = pil_image.size
+
+    if "prefilter" in stages and prefilter != "none":
+        opencv_image = _timed(
+            timings, "prefilter", lambda: prefilter_image(opencv_image, prefilter)
+        )
+
+    svg_content: Optional[str] = None
+    if "quantize" in stages:
+        def quantize():
+            _, labels, palette = quantize_colors(opencv_image, colors, quantized=False)
+            # Speckle merging is part of quantization as the API runs it
+            return filter_speckles(labels, DEFAULT_SPECKLE_AREA, len(palette)), palette
+
+        label_image, color_list = _timed(timings, "quantize", quantize)
+
+        paths = None
+        if tracer == "shared":
+            if "trace" in stages:
+
+                def trace_all():
+                    traced = trace_label_image(label_image)
+                    return [(traced[i], color_list[i]) for i in sorted(traced)]
+
+                paths = _timed(timings, "trace", trace_all)
+
+        elif "masks" in stages:
+            masks = _timed(timings, "masks", lambda: get_color_masks(label_image, colors))
+
+            if "trace" in stages:
+
+                def trace_all():
+                    paths = []
+                    for i, mask in enumerate(masks):
+                        for path_str in trace_mask(mask, prefer_potrace=True):
+                            if path_str:
+                                paths.append((path_str, color_list[i]))
+                    return paths
+
+                paths = _timed(timings, "trace", trace_all)
+
+        if paths is not None and "build_svg" in stages:
+            scale_factor = _determine_scale_factor(paths, width, height)
+            svg_content = _timed(
+                timings,
+                "build_svg",
+                lambda: build_svg(width, height, paths, scale_factor=scale_factor),
+            )
+            outputs["svg"] = len(svg_content.encode("utf-8"))
+
+    if "rasterize" in stages and svg_content is not None:
+        from src.core.rasterizer import svg_to_png
+
+        svg_bytes = svg_content.encode("utf-8")
+        png = _timed(timings, "rasterize", lambda: svg_to_png(svg_bytes))
+        outputs["png"] = len(png)
+
+    if "remove_background" in stages:
+        from src.core.background import remove_background
+
+        result = _timed(timings, "remove_background", lambda: remove_background(opencv_image))
+        outputs["remove_background_rgba"] = int(result.nbytes)
+
+    return outputs
+
+
+def run_case(
+    fixture: str,
+    size: int,
+    colors: int,
+    repeat: int,
+    stages: List[str],
+    tracer: str = "shared",
+    prefilter: str = "none",
+) -> Dict[str, Any]:
+    """
+    Benchmark a single fixture at a single size.
+
+    Args:
+        fixture: Fixture name
+        size: Long side in pixels
+        colors: Number of colors for vectorization
+        repeat: Number of timed repetitions
+        stages: Stages to run
+        tracer: Tracing mode passed to ``run_pipeline``
+        prefilter: Pre-quantization smoothing passed to ``run_pipeline``
+
+    Returns:
+        Result record for the JSON report
+    """
+    png_bytes = make_fixture(fixture, size)
+    timings: Dict[str, List[float]] = {}
+    outputs: Dict[str, int] = {}
+    for _ in range(repeat):
+        outputs = run_pipeline(png_bytes, colors, stages, timings, tracer=tracer, prefilter=prefilter)
+
+    return {
+        "fixture": fixture,
+        "size": size,
+        "colors": colors,
+        "input_bytes": len(png_bytes),
+        "stages": {
+            stage: {
+                "median_ms": round(statistics.median(values), 3),
+                "min_ms": round(min(values), 3),
+                "max_ms": round(max(values), 3),
+            }
+            for stage, values in timings.items()
+        },
+        "total_ms": round(sum(statistics.median(v) for v in timings.values()), 3),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "output_bytes": outputs,
+    }
+
+
+def _run_case_isolated(args: tuple) -> Dict[str, Any]:
+    """Process-pool entry point so each case gets its own peak RSS."""
+    return run_case(*args)
+
+
+def _git_commit() -> Optional[str]:
+    """Current git commit of the checkout, if available."""
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def run_benchmarks(
+    fixtures: List[str],
+    sizes: List[int],
+    colors: int = 8,
+    repeat: int = 3,
+    stages: Optional[List[str]] = None,
+    isolate: bool = True,
+    startup: bool = True,
+    tracer: str = "shared",
+    prefilter: str = "none",
+) -> Dict[str, Any]:
+    """
+    Run the benchmark matrix.
+
+    Args:
+        fixtures: Fixture names
+        sizes: Long-side sizes in pixels
+        colors: Number of colors for vectorization
+        repeat: Timed repetitions per case
+        stages: Stages to run (default: all)
+        isolate: Run every case in a fresh process so peak RSS is per case
+        startup: Also measure cold start (import and time to first /health)
+        tracer: "shared" or "layers" vectorization tracing
+        prefilter: Smoothing applied before quantization
+
+    Returns:
+        Report dict with ``meta`` and ``results``
+    """
+    stages = stages or list(STAGES)
+    results = []
+    if startup:
+        record = run_startup(repeat=repeat)
+        results.append(record)
+        print(f"{'startup':>12}         first /health {record['total_ms']:>8.1f} ms", file=sys.stderr)
+
+    for fixture in fixtures:
+        for size in sizes:
+            case = (fixture, size, colors, repeat, stages, tracer, prefilter)
+            if isolate:
+                ctx = multiprocessing.get_context("spawn")
+                with ctx.Pool(1) as pool:
+                    record = pool.apply(_run_case_isolated, (case,))
+            else:
+                record = run_case(*case)
+            results.append(record)
+            print(
+                f"{fixture:>12} {size:>5}px  total {record['total_ms']:>10.1f} ms  "
+                f"rss {record['peak_rss_mb']:>7.1f} MB",
+                file=sys.stderr,
+            )
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": multiprocessing.cpu_count(),
+            "colors": colors,
+            "repeat": repeat,
+            "stages": stages,
+            "tracer": tracer,
+            "prefilter": prefilter,
+        },
+        "results": results,
+    }
+
+
+def _parse_list(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="Run the benchmark matrix")
+    run_parser.add_argument("--fixtures", default=",".join(available_fixtures()), help="Comma-separated fixture names")
+    run_parser.add_argument("--sizes", default=None, help="Comma-separated long-side sizes in px")
+    run_parser.add_argument("--profile", choices=sorted(SIZE_PROFILES), default="quick", help="Preset size list")
+    run_parser.add_argument("--colors", type=int, default=8)
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--stages", default=",".join(STAGES), help="Comma-separated stages to run")
+    run_parser.add_argument("--tracer", choices=["shared", "layers"], default="shared", help="Vectorization tracer")
+    run_parser.add_argument(
+        "--prefilter",
+        choices=["none", "median", "bilateral", "meanshift"],
+        default="none",
+        help="Smoothing before quantization",
+    )
+    run_parser.add_argument("--no-isolate", action="store_true", help="Run cases in this process")
+    run_parser.add_argument("--no-startup", action="store_true", help="Skip the cold-start measurement")
+    run_parser.add_argument("--startup-only", action="store_true", help="Only measure cold start")
+    run_parser.add_argument("--output", "-o", default=None, help="Write JSON report here (default: stdout)")
+
+    cmp_parser = sub.add_parser("compare", help="Compare two benchmark reports")
+    cmp_parser.add_argument("baseline")
+    cmp_parser.add_argument("candidate")
+    cmp_parser.add_argument("--threshold", type=float, default=0.10, help="Relative slowdown that counts as a regression")
+    cmp_parser.add_argument("--min-ms", type=float, default=5.0, help="Ignore absolute timing changes below this")
+
+    lut_parser = sub.add_parser("lut", help="Lookup-table vs brute-force color assignment")
+    lut_parser.add_argument("--fixtures", default=",".join(available_fixtures()), help="Comma-separated fixture names")
+    lut_parser.add_argument("--sizes", default="1024,2048", help="Comma-separated long-side sizes in px")
+    lut_parser.add_argument("--colors", type=int, default=8)
+    lut_parser.add_argument("--bits", default="5,6", help="Comma-separated table resolutions in bits per channel")
+    lut_parser.add_argument("--repeat", type=int, default=3)
+    lut_parser.add_argument("--output", "-o", default=None, help="Write JSON report here (default: stdout)")
+
+    ipc_parser = sub.add_parser("ipc", help="Pipe vs shared memory transfer of frames to a worker")
+    ipc_parser.add_argument("--megapixels", default="1,4,12", help="Comma-separated frame sizes in MP")
+    ipc_parser.add_argument("--repeat", type=int, default=5)
+    ipc_parser.add_argument("--output", "-o", default=None, help="Write JSON report here (default: stdout)")
+
+    load_parser = sub.add_parser("load", help="Concurrent traffic mix against a local server")
+    load_parser.add_argument(
+        "--mix",
+        default=",".join(f"{name}:{weight:g}" for name, weight in DEFAULT_MIX.items()),
+        help=f"Comma-separated scenario:weight pairs; scenarios: {', '.join(SCENARIOS)}",
+    )
+    mode = load_parser.add_mutually_exclusive_group()
+    mode.add_argument("--concurrency", type=int, default=8, help="Concurrent clients (closed loop)")
+    mode.add_argument("--rate", type=float, default=None, help="Mean requests per second (open loop)")
+    load_parser.add_argument("--duration", type=float, default=30.0, help="Seconds of traffic")
+    load_parser.add_argument("--workers", type=int, default=1, help="Server worker processes")
+    load_parser.add_argument("--seed", type=int, default=0)
+    load_parser.add_argument("--rate-limits", action="store_true", help="Keep the per-client rate limits")
+    load_parser.add_argument("--url", default=None, help="Load an already running server instead")
+    load_parser.add_argument("--output", "-o", default=None, help="Write JSON report here (default: stdout)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "load":
+        try:
+            mix = parse_mix(args.mix)
+        except ValueError as e:
+            parser.error(str(e))
+        report = run_load(
+            mix,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            duration=args.duration,
+            workers=args.workers,
+            seed=args.seed,
+            rate_limits=args.rate_limits,
+            base_url=args.url,
+        )
+        for record in report["results"]:
+            latency = record["latency"]
+            print(
+                f"{record['fixture']:>28}  {record['requests']:>5} req  {record['throughput_rps']:>7.2f} rps  "
+                f"p50 {latency['median_ms']:>8.1f}  p95 {latency['p95_ms']:>8.1f}  p99 {latency['p99_ms']:>8.1f} ms  "
+                f"err {record['errors']:>3}  429 {record['rate_limited']:>3}  rss {record['peak_rss_mb'] or 0:>7.1f} MB",
+                file=sys.stderr,
+            )
+        text = json.dumps(report, indent=2)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+        else:
+            print(text)
+        return 0
+
+    if args.command == "ipc":
+        results = run_ipc_benchmarks([float(mp) for mp in _parse_list(args.megapixels)], repeat=args.repeat)
+        for record in results:
+            print(
+                f"{record['megapixels']:>6} MP  pickled {record['pickled_ms']:>8.1f} ms "
+                f"(+{record['pickled_overhead_ms']:.1f})  shared {record['shared_ms']:>7.1f} ms "
+                f"(+{record['shared_overhead_ms']:.1f})",
+                file=sys.stderr,
+            )
+        report = {"meta": {"git_commit": _git_commit()}, "results": results}
+        text = json.dumps(report, indent=2)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+        else:
+            print(text)
+        return 0
+
+    if args.command == "lut":
+        results = run_lut_benchmarks(
+            _parse_list(args.fixtures),
+            [int(s) for s in _parse_list(args.sizes)],
+            colors=args.colors,
+            bits=[int(b) for b in _parse_list(args.bits)],
+            repeat=args.repeat,
+        )
+        for record in results:
+            print(
+                f"{record['fixture']:>12} {record['size']:>5}px {record['bits']}b  "
+                f"brute {record['brute_force_ms']:>9.1f} ms  lut {record['lut_ms']:>7.1f} ms "
+                f"(x{record['speedup']})  exact {record['lut_exact_ms']:>7.1f} ms "
+                f"(x{record['speedup_exact']})  agreement {record['agreement']:.4f}",
+                file=sys.stderr,
+            )
+        report = {"meta": {"git_commit": _git_commit(), "colors": args.colors}, "results": results}
+        text = json.dumps(report, indent=2)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+        else:
+            print(text)
+        return 0
+
+    if args.command == "run":
+        sizes = [int(s) for s in _parse_list(args.sizes)] if args.sizes else SIZE_PROFILES[args.profile]
+        stages = _parse_list(args.stages)
+        unknown = set(stages) - set(STAGES)
+        if unknown:
+            parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+        report = run_benchmarks(
+            [] if args.startup_only else _parse_list(args.fixtures),
+            sizes,
+            colors=args.colors,
+            repeat=args.repeat,
+            stages=stages,
+            isolate=not args.no_isolate,
+            startup=not args.no_startup,
+            tracer=args.tracer,
+            prefilter=args.prefilter,
+        )
+        text = json.dumps(report, indent=2)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+        else:
+            print(text)
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+    findings = compare_results(baseline, candidate, threshold=args.threshold, min_ms=args.min_ms)
+    print(format_report(findings))
+    return 1 if any(item["regression"] for item in findings) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+Cold-start measurement: module import time and time to first healthy response.
+"""
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Dict, List, Optional
+
+from benchmarks.fixtures import REPO_ROOT
+
+_IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import src.main; "
+    "print((time.perf_counter() - start) * 1000.0)"
+)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_import_ms() -> float:
+    """Time to import ``src.main`` in a fresh interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-c", _IMPORT_SNIPPET],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def measure_first_health_ms(env: Optional[Dict[str, str]] = None, timeout: float = 120.0) -> float:
+    """
+    Time from spawning uvicorn until ``/health`` first answers 200.
+
+    Args:
+        env: Extra environment variables for the server process
+        timeout: Give up after this many seconds
+
+    Returns:
+        Elapsed time in ms
+    """
+    port = free_port()
+    process_env = dict(os.environ, **(env or {}))
+    url = f"http://127.0.0.1:{port}/health"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=REPO_ROOT,
+        env=process_env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_healthy(url, server, timeout)
+        return (time.perf_counter() - start) * 1000.0
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+def wait_until_healthy(url: str, server: subprocess.Popen, timeout: float = 120.0) -> None:
+    """
+    Poll ``url`` until it answers 200.
+
+    Args:
+        url: Health endpoint URL
+        server: Server process; an early exit is reported as an error
+        timeout: Give up after this many seconds
+
+    Raises:
+        RuntimeError: The server exited
+        TimeoutError: No healthy answer within ``timeout``
+    """
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited with code {server.returncode}")
+        try:
+            with urllib.request.urlopen(url, timeout=1.0) as response:
+                if response.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(0.01)
+    raise TimeoutError(f"/health did not answer within {timeout}s")
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    return {
+        "median_ms": round(statistics.median(values), 3),
+        "min_ms": round(min(values), 3),
+        "max_ms": round(max(values), 3),
+    }
+
+
+def run_startup(repeat: int = 3, include_warmup: bool = True) -> Dict[str, Any]:
+    """
+    Measure cold start ``repeat`` times.
+
+    Args:
+        repeat: Number of fresh processes per measurement
+        include_warmup: Also measure readiness with ``EKTOOLS_WARMUP=1``
+
+    Returns:
+        A result record in the same shape as pipeline benchmark cases
+    """
+    stages = {
+        "import": _summary([measure_import_ms() for _ in range(repeat)]),
+        "first_health": _summary([measure_first_health_ms() for _ in range(repeat)]),
+    }
+    if include_warmup:
+        stages["first_health_warmup"] = _summary(
+            [measure_first_health_ms({"EKTOOLS_WARMUP": "1"}) for _ in range(repeat)]
+        )
+
+    return {
+        "fixture": "startup",
+        "size": None,
+        "colors": None,
+        "stages": stages,
+        "total_ms": stages["first_health"]["median_ms"],
+    }
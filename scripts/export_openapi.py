@@ -0,0 +1,29 @@
+"""
+Export the OpenAPI specification of the service to YAML.
+
+This is a build step; the running service never writes to disk.
+
+Usage:
+    uv run python scripts/export_openapi.py [output_path]
+"""
+import sys
+from pathlib import Path
+
+import yaml
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from src.main import app  # noqa: E402
+
+
+def main() -> int:
+    output = Path(sys.argv[1]) if len(sys.argv) > 1 else REPO_ROOT / "openapi.yaml"
+    with open(output, "w", encoding="utf-8") as f:
+        yaml.dump(app.openapi(), f, sort_keys=False)
+    print(f"Wrote {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+Admin endpoints for request profiling, guarded by EKTOOLS_PROFILE_TOKEN.
+"""
+from fastapi import APIRouter, Depends, Form, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+
+from src.core.profiling import (
+    PROFILE_MODES,
+    check_token,
+    profile_sampler,
+    profile_store,
+    profile_token,
+)
+
+router = APIRouter()
+
+
+def require_profile_token(request: Request) -> None:
+    """
+    Reject requests without the profiling token.
+    
+    Raises:
+        HTTPException: 404 when profiling is off, 403 for a wrong token
+    """
+    if profile_token() is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not check_token(request.headers.get("x-profile-token")):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+
+@router.post("/profiles/sample", dependencies=[Depends(require_profile_token)])
+async def arm_sampling(
+    count: int = Form(...),
+    rate: float = Form(1.0),
+    mode: str = Form("sample"),
+):
+    """
+    Profile the next ``count`` requests this worker picks with probability
+    ``rate``.
+    
+    Args:
+        count: Requests to profile (1-1000; 0 disarms)
+        rate: Probability that a request is picked, in (0, 1]
+        mode: "sample" (stack sampling) or "cprofile"
+        
+    Returns:
+        The sampling state
+    """
+    if not 0 <= count <= 1000:
+        raise HTTPException(status_code=400, detail="count must be between 0 and 1000")
+    if not 0 < rate <= 1:
+        raise HTTPException(status_code=400, detail="rate must be in (0, 1]")
+    if mode not in PROFILE_MODES:
+        raise HTTPException(
+            status_code=400, detail=f"mode must be one of: {', '.join(PROFILE_MODES)}"
+        )
+    profile_sampler.arm(count, rate, mode)
+    return {"remaining": count, "rate": rate, "mode": mode}
+
+
+@router.get("/profiles", dependencies=[Depends(require_profile_token)])
+async def list_profiles():
+    """Stored profile reports, newest first."""
+    return {"profiles": profile_store.list()}
+
+
+@router.get("/profiles/{profile_id}", dependencies=[Depends(require_profile_token)])
+async def get_profile(profile_id: str):
+    """One profile report: pstats text or collapsed stacks."""
+    report = profile_store.read(profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(report)
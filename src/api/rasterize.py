@@ -1,12 +1,17 @@
 """
 POST /rasterize endpoint: Convert SVG to PNG.
 """
+import itertools
+
 from fastapi import APIRouter, UploadFile, File, HTTPException, Request
-from fastapi.responses import Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
 
 from src.core.limiter import limiter
 from src.utils.validators import validate_svg_file, validate_file_size, get_file_size
-from src.core.rasterizer import svg_to_png
+from src.core.rasterizer import RenderSizeMismatch, RenderTooLarge, render_sandbox
+from src.core.sandbox import RenderTimeout
+from src.core.svg_scan import SvgTooComplex
 
 router = APIRouter()
 
@@ -16,12 +21,16 @@ router = APIRouter()
 async def rasterize(request: Request, file: UploadFile = File(...)):
     """
     Convert an SVG file to PNG.
+
+    The document is checked for output size and complexity, then rendered
+    in a sandbox worker that is killed when it exceeds the time budget.
     
     Args:
         file: SVG file
         
     Returns:
-        PNG image as image/png
+        PNG image as image/png; large outputs are rendered in strips and
+        streamed
     """
     # Validate file type
     validate_svg_file(file)
@@ -33,19 +42,23 @@ async def rasterize(request: Request, file: UploadFile = File(...)):
     file_size = len(file_content)
     validate_file_size(file_size, 10)
     
+    headers = {"Content-Disposition": "attachment; filename=rasterized.png"}
+    stream = render_sandbox.render_stream(file_content)
     try:
-        # Convert SVG to PNG
-        png_bytes = svg_to_png(file_content)
-        
-        # Return PNG as image/png
-        return Response(
-            content=png_bytes,
-            media_type="image/png",
-            headers={"Content-Disposition": "attachment; filename=rasterized.png"}
-        )
-        
+        # Checks and, for small outputs, the whole render (for large ones the
+        # first strip) happen before the first chunk; the rest streams
+        # strip by strip
+        first = await run_in_threadpool(next, stream)
+    except (RenderTooLarge, RenderSizeMismatch, SvgTooComplex) as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    except RenderTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e)) from e
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error converting SVG to PNG: {str(e)}"
-        )
+        ) from e
+
+    return StreamingResponse(
+        itertools.chain([first], stream), media_type="image/png", headers=headers
+    )
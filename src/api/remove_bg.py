@@ -1,61 +1,78 @@
 """
 POST /remove-background endpoint: Remove background from JPEG or PNG.
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException, Request
+from typing import Optional
+
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import Response
-import numpy as np
-import cv2
-from PIL import Image
 
+from src.core.background import BACKGROUND_METHODS
+from src.core.deadline import DeadlineExceeded, RequestCancelled, watch_disconnect
 from src.core.limiter import limiter
-from src.utils.validators import validate_image_file
-from src.utils.image_io import load_image_from_bytes, numpy_to_pil, image_to_bytes
-from src.core.background import remove_background
+from src.core.profiling import profiled
+from src.utils.validators import parse_deadline, validate_image_file
+from src.core.pipeline import remove_background_image
 
 router = APIRouter()
 
 
 @router.post("", response_class=Response)
 @limiter.limit("100/minute")
-async def remove_background_endpoint(request: Request, file: UploadFile = File(...)):
+async def remove_background_endpoint(
+    request: Request,
+    file: UploadFile = File(...),
+    method: str = Form("kmeans"),
+    deadline_ms: Optional[int] = Form(None),
+    degrade: bool = Form(False),
+):
     """
     Remove background from a JPEG or PNG image.
     
     Args:
         file: JPEG or PNG image file
+        method: "kmeans" (fast color clustering) or "grabcut" (slower,
+            better on photos)
+        deadline_ms: Optional time budget in milliseconds (or the
+            X-Deadline-Ms header); processing stops with 504 when it runs out
+        degrade: Fall back from GrabCut to K-means when the budget looks too
+            short; reported in X-Degraded
         
     Returns:
         PNG image with alpha channel as image/png
     """
     # Validate file type
     validate_image_file(file)
+    deadline = parse_deadline(request, deadline_ms, degrade)
+    if method not in BACKGROUND_METHODS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"method must be one of: {', '.join(BACKGROUND_METHODS)}"
+        )
     
     # Read file content
     file_content = await file.read()
     
     try:
-        # Load image
-        opencv_image, pil_image = load_image_from_bytes(file_content)
-        
-        # Remove background (returns BGRA image)
-        result_bgra = remove_background(opencv_image, method="kmeans")
-        
-        # Convert to PIL Image (RGBA)
-        result_rgba = cv2.cvtColor(result_bgra, cv2.COLOR_BGRA2RGBA)
-        result_pil = Image.fromarray(result_rgba)
-        
-        # Convert to PNG bytes
-        png_bytes = image_to_bytes(result_pil, format="PNG")
-        
-        # Return PNG as image/png
-        return Response(
-            content=png_bytes,
-            media_type="image/png",
-            headers={"Content-Disposition": "attachment; filename=no_background.png"}
+        # Remove background and encode as PNG with alpha
+        png_bytes = await watch_disconnect(
+            request,
+            run_in_threadpool(profiled(remove_background_image), file_content, method, deadline),
+            deadline.cancel,
         )
-        
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e)) from e
+    except RequestCancelled as e:
+        raise HTTPException(status_code=499, detail=str(e)) from e
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error removing background: {str(e)}"
         )
+    
+    headers = {"Content-Disposition": "attachment; filename=no_background.png"}
+    if deadline.degradations:
+        headers["X-Degraded"] = ",".join(deadline.degradations)
+    
+    # Return PNG as image/png
+    return Response(content=png_bytes, media_type="image/png", headers=headers)
@@ -2,45 +2,146 @@
 POST /vectorize endpoint: Convert PNG to SVG with color quantization.
 """
 
+import base64
+import json
+import math
+
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request
 from fastapi.responses import Response
-import math
-import re
-from typing import List, Tuple
-import numpy as np
+from typing import List, Optional, Tuple
 
+from fastapi.concurrency import run_in_threadpool
+
+from src.core.buffers import current_rss_bytes
+from src.core.deadline import Deadline, DeadlineExceeded, RequestCancelled, watch_disconnect
 from src.core.limiter import limiter
-from src.utils.validators import validate_png_file, validate_file_size
-from src.utils.image_io import load_image_from_bytes
-from src.core.quantize import quantize_colors, get_color_masks
-from src.core.trace import trace_mask
-from src.core.svg_builder import build_svg
+from src.utils.validators import parse_deadline, validate_png_file, validate_file_size
+from src.utils.mask_ops import DEFAULT_SPECKLE_AREA
+from src.core.quantize import AUTO_COLOR_ERROR
+from src.core.palette import format_palette, parse_palette
+from src.core.pipeline import TRACERS, vectorize_image
+from src.core.prefilter import PREFILTERS
+from src.core.profiling import profiled
+from src.core.result_cache import CachedResponse, result_cache
+from src.core.simplify import DEFAULT_DETAIL
+from src.core.single_flight import single_flight
 
 router = APIRouter()
 
+OUTPUTS = ("svg", "png", "both")
+
+# Preview long side limits in pixels
+MIN_PREVIEW_SIZE = 16
+MAX_PREVIEW_SIZE = 4096
+
+# Cache hits replay the stored headers (palette, detail, trace size, preview
+# size) except these, which describe work the hit did not do
+RUN_HEADERS = ("X-Palette-Source", "X-Buffer-Bytes")
+
 
 @router.post("", response_class=Response)
 @limiter.limit("100/minute")
 async def vectorize(
-    request: Request, file: UploadFile = File(...), colors: int = Form(...)
+    request: Request,
+    file: UploadFile = File(...),
+    colors: str = Form(...),
+    color_error: float = Form(AUTO_COLOR_ERROR),
+    palette: Optional[str] = Form(None),
+    detail: float = Form(DEFAULT_DETAIL),
+    max_bytes: Optional[int] = Form(None),
+    speckle_area: int = Form(DEFAULT_SPECKLE_AREA),
+    tracer: str = Form("shared"),
+    max_trace_pixels: Optional[int] = Form(None),
+    prefilter: str = Form("none"),
+    deadline_ms: Optional[int] = Form(None),
+    degrade: bool = Form(False),
+    output: str = Form("svg"),
+    preview_size: int = Form(512),
 ):
     """
     Vectorize a PNG image into an SVG with configurable color quantization.
 
     Args:
         file: PNG image file
-        colors: Number of colors (2-20)
+        colors: Number of colors (2-20), or "auto" to pick the smallest
+            palette that meets ``color_error``
+        color_error: Target RMS color error for ``colors=auto``
+        palette: Optional comma-separated hex colors (e.g. from a previous
+            response's X-Palette header); skips fitting and overrides ``colors``
+        detail: Path detail in [0, 1]; lower values simplify contours more
+        max_bytes: Optional SVG size budget; detail is lowered step by step
+            until the document fits (best effort)
+        speckle_area: Same-color regions smaller than this many pixels are
+            merged into their neighbours before tracing (0 disables)
+        tracer: "shared" traces all colors in one pass with common borders;
+            "layers" traces each color mask on its own (Potrace if available)
+        max_trace_pixels: Optional pixel budget; larger images are downscaled
+            before quantizing and tracing, and the SVG keeps the original size
+        prefilter: Edge-preserving smoothing before quantization: "none",
+            "median", "bilateral" or "meanshift"
+        deadline_ms: Optional time budget in milliseconds (or the
+            X-Deadline-Ms header); processing stops with 504 when it runs out
+        degrade: Lower quality (fewer colors, then a smaller working
+            resolution) when the budget looks too short; the steps taken are
+            reported in X-Degraded
+        output: "svg" for the SVG document, "png" for a PNG preview rendered
+            straight from the traced paths, or "both" for a JSON object with
+            the SVG and the base64 PNG
+        preview_size: Long side of the PNG preview in pixels (16-4096); the
+            aspect ratio is kept and the size reported in X-Preview-Size
 
     Returns:
-        SVG content as text/plain
+        SVG content as text/plain (or image/png, or JSON with "svg" and
+        "preview_png"), with the palette used in the X-Palette header.
+        With the result cache enabled, repeated uploads with the same options
+        are served from it (X-Result-Cache: hit)
     """
     # Validate file type
     validate_png_file(file)
+    deadline = parse_deadline(request, deadline_ms, degrade)
 
     # Validate colors parameter
-    if colors < 2 or colors > 20:
+    auto_colors = colors.strip().lower() == "auto"
+    n_colors = None if auto_colors else _parse_colors(colors)
+    if not (math.isfinite(color_error) and color_error > 0):
+        raise HTTPException(
+            status_code=400, detail="color_error parameter must be a positive number"
+        )
+
+    palette_colors = _parse_palette(palette) if palette else None
+
+    if detail < 0 or detail > 1:
+        raise HTTPException(
+            status_code=400, detail="detail parameter must be between 0 and 1"
+        )
+    if max_bytes is not None and max_bytes <= 0:
+        raise HTTPException(
+            status_code=400, detail="max_bytes parameter must be positive"
+        )
+    if speckle_area < 0:
+        raise HTTPException(
+            status_code=400, detail="speckle_area parameter must not be negative"
+        )
+    if max_trace_pixels is not None and max_trace_pixels <= 0:
+        raise HTTPException(
+            status_code=400, detail="max_trace_pixels parameter must be positive"
+        )
+    if prefilter not in PREFILTERS:
+        raise HTTPException(
+            status_code=400, detail=f"prefilter must be one of: {', '.join(PREFILTERS)}"
+        )
+    if tracer not in TRACERS:
+        raise HTTPException(
+            status_code=400, detail=f"tracer must be one of: {', '.join(TRACERS)}"
+        )
+    if output not in OUTPUTS:
+        raise HTTPException(
+            status_code=400, detail=f"output must be one of: {', '.join(OUTPUTS)}"
+        )
+    if preview_size < MIN_PREVIEW_SIZE or preview_size > MAX_PREVIEW_SIZE:
         raise HTTPException(
-            status_code=400, detail="colors parameter must be between 2 and 20"
+            status_code=400,
+            detail=f"preview_size parameter must be between {MIN_PREVIEW_SIZE} and {MAX_PREVIEW_SIZE}",
         )
 
     # Read file content
@@ -50,90 +151,135 @@ async def vectorize(
     file_size = len(file_content)
     validate_file_size(file_size, 100)
 
-    try:
-        # Load image
-        opencv_image, pil_image = load_image_from_bytes(file_content)
-
-        # Get image dimensions
-        width, height = pil_image.size
-
-        # Quantize colors
-        _, label_image, color_list = quantize_colors(opencv_image, colors)
-
-        # Get masks for each color
-        masks = get_color_masks(label_image, colors)
-
-        total_pixels = width * height
-        cluster_data = []
-        for i, mask in enumerate(masks):
-            area = int(np.count_nonzero(mask))
-            brightness = sum(color_list[i]) / (3 * 255)
-            cluster_data.append(
-                {
-                    "index": i,
-                    "mask": mask,
-                    "color": color_list[i],
-                    "area": area,
-                    "is_background": (area / total_pixels) >= 0.4 and brightness >= 0.9,
-                }
+    options = {
+        "colors": n_colors,
+        "color_error": color_error,
+        "palette": palette_colors,
+        "detail": detail,
+        "max_bytes": max_bytes,
+        "speckle_area": speckle_area,
+        "tracer": tracer,
+        "max_trace_pixels": max_trace_pixels,
+        "prefilter": prefilter,
+        "preview_size": None if output == "svg" else preview_size,
+    }
+    key = result_cache.key(file_content, {**options, "output": output})
+    cached = result_cache.get(key) if result_cache.enabled else None
+
+    if cached is None:
+        if deadline.expires_at is None:
+            # Identical uploads in flight at the same time share one
+            # pipeline run, stopped only once every client has gone away
+            work = single_flight.do(
+                key, profiled(_vectorize_response), file_content, options, output, deadline,
+                on_abandon=deadline.cancel,
+            )
+            on_disconnect = None
+        else:
+            # A deadline is this request's own budget: run it alone
+            work = run_in_threadpool(
+                profiled(_vectorize_response), file_content, options, output, deadline
             )
+            on_disconnect = deadline.cancel
+        try:
+            cached = await watch_disconnect(request, work, on_disconnect)
+        except DeadlineExceeded as e:
+            raise HTTPException(status_code=504, detail=str(e)) from e
+        except RequestCancelled as e:
+            raise HTTPException(status_code=499, detail=str(e)) from e
+        except Exception as e:
+            raise HTTPException(
+                status_code=500, detail=f"Error processing image: {str(e)}"
+            ) from e
+        if not deadline.degradations:
+            result_cache.put(key, cached)
+        cache_status = "miss"
+    else:
+        cache_status = "hit"
 
-        # Sort largest areas first so backgrounds are drawn before details
-        cluster_data.sort(key=lambda item: item["area"], reverse=True)
+    headers = {**cached.headers, "X-RSS-Bytes": str(current_rss_bytes())}
+    if cache_status == "hit":
+        for name in RUN_HEADERS:
+            headers.pop(name, None)
+    if not result_cache.enabled:
+        # Not cached: the compression middleware streams the body
+        return Response(content=cached.body, media_type=cached.media_type, headers=headers)
 
-        render_clusters = [c for c in cluster_data if not c["is_background"]]
-        if not render_clusters:
-            render_clusters = cluster_data
+    # Serve (and keep) the compressed form so hits never recompress; the
+    # first request per encoding compresses in the thread pool
+    accept_encoding = request.headers.get("accept-encoding")
+    if cached.is_ready(accept_encoding):
+        body, encoding = cached.body_for(accept_encoding)
+    else:
+        body, encoding = await run_in_threadpool(cached.body_for, accept_encoding)
+    headers["X-Result-Cache"] = cache_status
+    headers["Vary"] = "Accept-Encoding"
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=cached.media_type, headers=headers)
 
-        # Trace each mask to SVG paths
-        paths = []
-        for cluster in render_clusters:
-            path_list = trace_mask(cluster["mask"], prefer_potrace=True)
 
-            for path_str in path_list:
-                if path_str:
-                    paths.append((path_str, cluster["color"]))
+def _vectorize_response(
+    file_content: bytes, options: dict, output: str, deadline: Deadline
+) -> CachedResponse:
+    """
+    Run the pipeline and package the requested output with its headers.
+    """
+    result = vectorize_image(file_content, deadline=deadline, **options)
+    headers = {
+        "Content-Disposition": "attachment; filename=vectorized.svg",
+        "X-Colors": str(len(result.colors)),
+        "X-Palette": format_palette(result.colors),
+        "X-Palette-Source": result.palette_source,
+        "X-Detail": f"{result.detail:g}",
+        "X-Trace-Size": "{}x{}".format(*result.trace_size),
+        "X-Buffer-Bytes": str(result.buffer_bytes),
+    }
+    if deadline.degradations:
+        headers["X-Degraded"] = ",".join(deadline.degradations)
+    if output == "svg":
+        return CachedResponse(result.svg.encode("utf-8"), media_type="text/plain", headers=headers)
+
+    headers["X-Preview-Size"] = "{}x{}".format(*result.preview_size)
+    if output == "png":
+        headers["Content-Disposition"] = "attachment; filename=vectorized.png"
+        return CachedResponse(result.preview, media_type="image/png", headers=headers)
 
-        scale_factor = _determine_scale_factor(paths, width, height)
+    del headers["Content-Disposition"]
+    body = json.dumps(
+        {"svg": result.svg, "preview_png": base64.b64encode(result.preview).decode("ascii")}
+    )
+    return CachedResponse(body.encode("utf-8"), media_type="application/json", headers=headers)
 
-        # Build SVG
-        svg_content = build_svg(width, height, paths, scale_factor=scale_factor)
 
-        # Return SVG as text/plain
-        return Response(
-            content=svg_content,
-            media_type="text/plain",
-            headers={"Content-Disposition": "attachment; filename=vectorized.svg"},
-        )
+def _parse_colors(colors: str) -> int:
+    """
+    Parse and validate an explicit ``colors`` form value.
+    """
+    try:
+        value = int(colors)
+    except ValueError:
+        value = 0
 
-    except Exception as e:
+    if value < 2 or value > 20:
         raise HTTPException(
-            status_code=500, detail=f"Error processing image: {str(e)}"
-        ) from e
+            status_code=400,
+            detail="colors parameter must be between 2 and 20, or 'auto'",
+        )
+    return value
 
 
-def _determine_scale_factor(
-    paths: List[Tuple[str, Tuple[int, int, int]]], width: int, height: int
-) -> float:
+def _parse_palette(palette: str) -> List[Tuple[int, int, int]]:
     """
-    Infer a scale factor for the SVG viewport based on path coordinates.
+    Parse and validate the ``palette`` form value.
     """
-    if not paths:
-        return 1.0
-
-    number_pattern = re.compile(r"-?\d+(?:\.\d+)?")
-    max_coord = 0.0
-    for path_str, _ in paths:
-        for match in number_pattern.findall(path_str):
-            try:
-                value = abs(float(match))
-            except ValueError:
-                continue
-            max_coord = max(max_coord, value)
-
-    expected = max(width, height, 1)
-    ratio = max_coord / expected
-    if ratio <= 1.2:
-        return 1.0
-
-    return 10.0
+    try:
+        colors = parse_palette(palette)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    if len(colors) < 2 or len(colors) > 20:
+        raise HTTPException(
+            status_code=400, detail="palette must contain between 2 and 20 colors"
+        )
+    return colors
@@ -0,0 +1,344 @@
+"""
+Offline batch processing over files, directories and globs.
+
+Drives the same ``src.core`` pipelines as the API without FastAPI or the
+rate limiter, in a pool of worker processes. Every finished file is
+appended to a manifest in the output directory together with the SHA-256
+of its input and the options used, so a re-run (or a run resumed after an
+interruption) skips files whose content and options are unchanged.
+
+Usage:
+    python -m src.batch vectorize assets/ -o out/ --colors 8 --jobs 8
+    python -m src.batch rasterize "out/**/*.svg" -o png/
+    python -m src.batch remove-bg photos/ -o cutouts/
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from src.serve import limit_worker_threads, pin_thread_env, threads_per_worker
+
+MANIFEST_NAME = ".ektools-batch.jsonl"
+
+# Input extensions and output suffix per command
+COMMANDS = {
+    "vectorize": ((".png",), ".svg"),
+    "rasterize": ((".svg",), ".png"),
+    "remove-bg": ((".png", ".jpg", ".jpeg"), ".png"),
+}
+
+
+class Task(NamedTuple):
+    """One input file and where its result goes."""
+
+    command: str
+    source: str
+    target: str
+    options: Dict
+    known_hash: Optional[str]
+
+
+def find_inputs(patterns: List[str], extensions: Tuple[str, ...]) -> Iterator[Tuple[str, str]]:
+    """
+    Expand files, directories (recursively) and glob patterns.
+
+    Args:
+        patterns: Input arguments
+        extensions: Accepted lowercase file extensions
+
+    Yields:
+        (path, path relative to its input root) pairs, each path once
+    """
+    seen = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            root = pattern
+            paths = glob.iglob(os.path.join(glob.escape(pattern), "**", "*"), recursive=True)
+        elif glob.has_magic(pattern):
+            # Relative names start at the last directory before the first wildcard
+            prefix = pattern[: min(pattern.find(c) for c in "*?[" if c in pattern)]
+            root = os.path.dirname(prefix) or "."
+            paths = glob.iglob(pattern, recursive=True)
+        else:
+            root = os.path.dirname(pattern) or "."
+            paths = [pattern]
+
+        for path in sorted(paths):
+            if not path.lower().endswith(extensions) or not os.path.isfile(path):
+                continue
+            real = os.path.realpath(path)
+            if real not in seen:
+                seen.add(real)
+                yield path, os.path.relpath(path, root)
+
+
+def load_manifest(path: str) -> Dict[str, dict]:
+    """
+    Read the manifest of finished files, keyed by output path.
+
+    A truncated last line (interrupted write) is ignored.
+    """
+    entries: Dict[str, dict] = {}
+    try:
+        with open(path, encoding="utf-8") as manifest:
+            for line in manifest:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                entries[entry["output"]] = entry
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    partial = f"{path}.partial"
+    with open(partial, "wb") as out:
+        out.write(data)
+    os.replace(partial, path)
+
+
+def _image_megapixels(data: bytes) -> float:
+    """Pixel count of an encoded image in MP, read from its header."""
+    import io
+
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        width, height = image.size
+    return width * height / 1e6
+
+
+def _run(command: str, data: bytes, options: Dict) -> Tuple[bytes, float]:
+    """Process one input; returns the output bytes and megapixels processed."""
+    from src.core.pipeline import remove_background_image, vectorize_image
+
+    if command == "vectorize":
+        result = vectorize_image(data, **options)
+        return result.svg.encode("utf-8"), result.width * result.height / 1e6
+    if command == "rasterize":
+        from src.core.rasterizer import svg_to_png
+
+        png = svg_to_png(data)
+        return png, _image_megapixels(png)
+    return remove_background_image(data, **options), _image_megapixels(data)
+
+
+def process(task: Task) -> Dict:
+    """
+    Process one file in a worker.
+
+    Returns:
+        Manifest entry plus ``status`` ("done", "skipped" or "failed"),
+        ``megapixels``, ``seconds`` and ``error``
+    """
+    start = time.perf_counter()
+    entry = {"input": task.source, "output": task.target, "megapixels": 0.0, "error": None}
+    try:
+        with open(task.source, "rb") as source:
+            data = source.read()
+        entry["sha256"] = hashlib.sha256(data).hexdigest()
+
+        if entry["sha256"] == task.known_hash and os.path.exists(task.target):
+            entry["status"] = "skipped"
+        else:
+            output, entry["megapixels"] = _run(task.command, data, task.options)
+            _write_atomic(task.target, output)
+            entry["status"] = "done"
+    except Exception as e:  # noqa: BLE001 - one bad file must not stop the batch
+        entry["status"] = "failed"
+        entry["error"] = f"{type(e).__name__}: {e}"
+    entry["seconds"] = time.perf_counter() - start
+    return entry
+
+
+def _init_worker(threads: int) -> None:
+    limit_worker_threads(threads)
+
+
+def run_batch(
+    command: str,
+    patterns: List[str],
+    output_dir: str,
+    options: Dict,
+    jobs: int = 1,
+    force: bool = False,
+) -> Dict:
+    """
+    Process every matching input into ``output_dir``.
+
+    Args:
+        command: One of ``COMMANDS``
+        patterns: Files, directories or glob patterns
+        output_dir: Output root; relative input paths are mirrored below it
+        options: Keyword arguments for the pipeline function
+        jobs: Worker processes
+        force: Reprocess files even if the manifest says they are done
+
+    Returns:
+        Summary with counts, elapsed seconds, files/s and MP/s
+    """
+    extensions, suffix = COMMANDS[command]
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = {} if force else load_manifest(manifest_path)
+    options_key = json.dumps({"command": command, **options}, sort_keys=True)
+
+    tasks = []
+    for path, relative in find_inputs(patterns, extensions):
+        target = os.path.join(output_dir, os.path.splitext(relative)[0] + suffix)
+        known = manifest.get(target)
+        known_hash = known["sha256"] if known and known.get("options") == options_key else None
+        tasks.append(Task(command, path, target, options, known_hash))
+
+    counts = {"done": 0, "skipped": 0, "failed": 0}
+    megapixels = 0.0
+    start = time.perf_counter()
+    threads = threads_per_worker(jobs)
+    interrupted = False
+
+    with open(manifest_path, "a", encoding="utf-8") as manifest_file:
+        executor = ProcessPoolExecutor(
+            max_workers=jobs, initializer=_init_worker, initargs=(threads,)
+        )
+        try:
+            futures = [executor.submit(process, task) for task in tasks]
+            for future in as_completed(futures):
+                entry = future.result()
+                counts[entry["status"]] += 1
+                megapixels += entry["megapixels"]
+                if entry["status"] == "failed":
+                    print(f"failed: {entry['input']}: {entry['error']}", file=sys.stderr)
+                elif entry["status"] == "done":
+                    record = {key: entry[key] for key in ("input", "output", "sha256")}
+                    record["options"] = options_key
+                    manifest_file.write(json.dumps(record) + "\n")
+                    manifest_file.flush()
+        except KeyboardInterrupt:
+            interrupted = True
+        finally:
+            executor.shutdown(wait=not interrupted, cancel_futures=True)
+
+    elapsed = time.perf_counter() - start
+    processed = counts["done"] + counts["failed"]
+    return {
+        **counts,
+        "total": len(tasks),
+        "interrupted": interrupted,
+        "seconds": elapsed,
+        "files_per_second": processed / elapsed if elapsed > 0 else 0.0,
+        "megapixels_per_second": megapixels / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def format_summary(summary: Dict) -> str:
+    """One-line human readable throughput summary."""
+    text = (
+        f"{summary['done']} done, {summary['skipped']} skipped, {summary['failed']} failed "
+        f"of {summary['total']} in {summary['seconds']:.1f}s "
+        f"({summary['files_per_second']:.2f} files/s, "
+        f"{summary['megapixels_per_second']:.2f} MP/s)"
+    )
+    if summary["interrupted"]:
+        text += "; interrupted, re-run to resume"
+    return text
+
+
+def _vectorize_options(args: argparse.Namespace) -> Dict:
+    from src.core.palette import parse_palette
+
+    colors = None if args.colors.strip().lower() == "auto" else int(args.colors)
+    if colors is not None and not 2 <= colors <= 20:
+        raise SystemExit("--colors must be between 2 and 20, or 'auto'")
+    if not 0 <= args.detail <= 1:
+        raise SystemExit("--detail must be between 0 and 1")
+    if args.max_trace_pixels is not None and args.max_trace_pixels <= 0:
+        raise SystemExit("--max-trace-pixels must be positive")
+    options = {
+        "colors": colors,
+        "color_error": args.color_error,
+        "detail": args.detail,
+        "max_bytes": args.max_bytes,
+        "speckle_area": args.speckle_area,
+        "tracer": args.tracer,
+        "max_trace_pixels": args.max_trace_pixels,
+        "prefilter": args.prefilter,
+    }
+    if args.palette:
+        try:
+            options["palette"] = parse_palette(args.palette)
+        except ValueError as e:
+            raise SystemExit(f"--palette: {e}") from e
+    return options
+
+
+def _pin_threads(argv: Optional[List[str]]) -> int:
+    """Pin BLAS/OpenMP threads from ``--jobs`` before numpy is first imported."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1)
+    jobs = max(1, parser.parse_known_args(argv)[0].jobs)
+    pin_thread_env(threads_per_worker(jobs))
+    return jobs
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    jobs = _pin_threads(argv)
+
+    from src.core.pipeline import TRACERS
+    from src.core.prefilter import PREFILTERS
+    from src.core.quantize import AUTO_COLOR_ERROR
+    from src.core.simplify import DEFAULT_DETAIL
+    from src.utils.mask_ops import DEFAULT_SPECKLE_AREA
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("inputs", nargs="+", help="Files, directories or glob patterns")
+    common.add_argument("-o", "--output", required=True, help="Output directory")
+    common.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    common.add_argument("--force", action="store_true", help="Ignore the manifest and reprocess everything")
+    common.add_argument("--json", action="store_true", help="Print the summary as JSON")
+
+    vectorize = subparsers.add_parser("vectorize", parents=[common], help="PNG -> SVG")
+    vectorize.add_argument("--colors", default="8", help="2-20 or 'auto' (default: 8)")
+    vectorize.add_argument("--color-error", type=float, default=AUTO_COLOR_ERROR)
+    vectorize.add_argument("--palette", help="Comma-separated hex colors; skips fitting")
+    vectorize.add_argument("--detail", type=float, default=DEFAULT_DETAIL)
+    vectorize.add_argument("--max-bytes", type=int)
+    vectorize.add_argument("--speckle-area", type=int, default=DEFAULT_SPECKLE_AREA)
+    vectorize.add_argument("--tracer", choices=TRACERS, default="shared")
+    vectorize.add_argument("--max-trace-pixels", type=int, help="Downscale larger images before tracing")
+    vectorize.add_argument("--prefilter", choices=PREFILTERS, default="none")
+
+    subparsers.add_parser("rasterize", parents=[common], help="SVG -> PNG")
+
+    remove_bg = subparsers.add_parser("remove-bg", parents=[common], help="PNG/JPEG -> PNG with alpha")
+    remove_bg.add_argument("--method", choices=["kmeans", "grabcut"], default="kmeans")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "vectorize":
+        options = _vectorize_options(args)
+    elif args.command == "remove-bg":
+        options = {"method": args.method}
+    else:
+        options = {}
+
+    summary = run_batch(args.command, args.inputs, args.output, options, jobs=jobs, force=args.force)
+    print(json.dumps(summary) if args.json else format_summary(summary))
+    if summary["interrupted"]:
+        return 130
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,24 @@
 """
 Background removal using K-means or GrabCut.
 """
+import os
+
 import numpy as np
-import cv2
-from typing import Tuple
+from typing import Iterator, Tuple
+from src.core.sandbox import RenderSandbox
+from src.core.shared_arrays import SharedHandle, attach
 from src.utils.mask_ops import get_bounding_box, apply_mask
 
+BACKGROUND_METHODS = ("kmeans", "grabcut")
+
+# Worker processes segmenting images (EKTOOLS_SEGMENT_WORKERS overrides);
+# 0 segments in the request's own thread
+DEFAULT_SEGMENT_WORKERS = 0
+
+# Wall-clock budget per segmentation in a worker, in seconds
+# (EKTOOLS_SEGMENT_TIMEOUT overrides)
+DEFAULT_SEGMENT_TIMEOUT = 300.0
+
 
 def remove_background_kmeans(image: np.ndarray, n_clusters: int = 3) -> np.ndarray:
     """
@@ -20,23 +33,15 @@ def remove_background_kmeans(image: np.ndarray, n_clusters: int = 3) -> np.ndarr
     Returns:
         Image with alpha channel (BGRA)
     """
-    # Reshape to pixels
-    h, w, c = image.shape
-    pixels = image.reshape(-1, 3)
-    
-    # Convert to float for K-means
-    pixels_float = pixels.astype(np.float32)
-    
-    # Apply K-means
-    from sklearn.cluster import KMeans
-    kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-    labels = kmeans.fit_predict(pixels_float)
-    
-    # Reshape labels
-    label_image = labels.reshape(h, w)
+    import cv2
+
+    from src.core.quantize import quantize_colors
+
+    # K-means over the color histogram, pixels labeled by lookup table
+    _, label_image, _ = quantize_colors(image, n_clusters, quantized=False)
     
     # Find largest cluster (assumed to be background)
-    cluster_sizes = [np.sum(label_image == i) for i in range(n_clusters)]
+    cluster_sizes = np.bincount(label_image.ravel(), minlength=n_clusters)
     background_cluster = np.argmax(cluster_sizes)
     
     # Create mask (1 for foreground, 0 for background)
@@ -63,6 +68,8 @@ def remove_background_grabcut(image: np.ndarray) -> np.ndarray:
     Returns:
         Image with alpha channel (BGRA)
     """
+    import cv2
+
     h, w = image.shape[:2]
     
     # Initialize mask
@@ -109,3 +116,30 @@ def remove_background(image: np.ndarray, method: str = "kmeans") -> np.ndarray:
     else:
         return remove_background_kmeans(image)
 
+
+
+def remove_background_shared(
+    image: SharedHandle, result: SharedHandle, method: str = "kmeans"
+) -> Iterator[bytes]:
+    """
+    Worker entry point: segment a shared BGR image into a shared BGRA array.
+
+    Both arrays live in the caller's shared memory, so neither is pickled;
+    the result is written in place and nothing is yielded.
+
+    Args:
+        image: Handle of the (H, W, 3) uint8 BGR input
+        result: Handle of the (H, W, 4) uint8 output
+        method: Method to use ("kmeans" or "grabcut")
+    """
+    with attach(image) as bgr, attach(result) as bgra:
+        bgra[...] = remove_background(bgr, method)
+    return iter(())
+
+
+segment_workers = int(os.environ.get("EKTOOLS_SEGMENT_WORKERS", DEFAULT_SEGMENT_WORKERS))
+segment_sandbox = RenderSandbox(
+    remove_background_shared,
+    workers=max(1, segment_workers),
+    timeout=float(os.environ.get("EKTOOLS_SEGMENT_TIMEOUT", DEFAULT_SEGMENT_TIMEOUT)),
+)
@@ -0,0 +1,170 @@
+"""
+Per-process pool of reusable full-frame arrays.
+
+Every request needs the same handful of image-sized arrays (decoded pixels,
+labels, masks). Allocating them fresh each time makes glibc hand large
+blocks back and forth and fragments the heap until RSS only ever grows.
+Instead, a request leases an ``Arena`` from the pool; arrays taken from the
+arena come from buffers of the same shape and dtype left by earlier
+requests, and all of them go back to the pool when the lease ends.
+
+The pool keeps at most ``max_bytes`` of idle buffers, dropping the least
+recently used shapes first, so an unusually large image does not pin its
+memory for the life of the worker.
+"""
+import os
+import resource
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Idle buffers kept per worker process (EKTOOLS_BUFFER_POOL_MB overrides)
+DEFAULT_POOL_MB = 256
+
+_Key = Tuple[Tuple[int, ...], str]
+
+
+class Arena:
+    """
+    Arrays borrowed from a ``BufferPool`` for the duration of one lease.
+
+    Contents of arrays from ``empty`` are undefined, like ``np.empty``.
+    Nothing taken from an arena may be kept after the lease ends.
+    """
+
+    def __init__(self, pool: "BufferPool"):
+        self._pool = pool
+        self._arrays: List[np.ndarray] = []
+        self.nbytes = 0
+        self.reused_bytes = 0
+
+    def empty(self, shape, dtype=np.float64) -> np.ndarray:
+        """
+        Borrow an uninitialized array.
+
+        Args:
+            shape: Array shape
+            dtype: Array dtype
+
+        Returns:
+            Array of the requested shape and dtype
+        """
+        array, reused = self._pool._take(shape, dtype)
+        self._arrays.append(array)
+        self.nbytes += array.nbytes
+        if reused:
+            self.reused_bytes += array.nbytes
+        return array
+
+    def zeros(self, shape, dtype=np.float64) -> np.ndarray:
+        """Borrow an array filled with zeros."""
+        array = self.empty(shape, dtype)
+        array.fill(0)
+        return array
+
+    def release(self) -> None:
+        """Return every borrowed array to the pool."""
+        arrays, self._arrays = self._arrays, []
+        for array in arrays:
+            self._pool._give(array)
+
+
+class BufferPool:
+    """
+    Bounded pool of idle arrays keyed by shape and dtype.
+
+    Args:
+        max_bytes: Largest total size of idle buffers kept
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        if max_bytes is None:
+            max_bytes = int(os.environ.get("EKTOOLS_BUFFER_POOL_MB", DEFAULT_POOL_MB)) * 1024 * 1024
+        self.max_bytes = max_bytes
+        self._idle: "OrderedDict[_Key, List[np.ndarray]]" = OrderedDict()
+        self._idle_bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(shape, dtype) -> _Key:
+        if isinstance(shape, int):
+            shape = (shape,)
+        return tuple(int(n) for n in shape), np.dtype(dtype).str
+
+    def _take(self, shape, dtype) -> Tuple[np.ndarray, bool]:
+        key = self._key(shape, dtype)
+        with self._lock:
+            stack = self._idle.get(key)
+            if stack:
+                array = stack.pop()
+                self._idle_bytes -= array.nbytes
+                self._idle.move_to_end(key)
+                return array, True
+        return np.empty(key[0], dtype=key[1]), False
+
+    def _give(self, array: np.ndarray) -> None:
+        if array.nbytes > self.max_bytes:
+            return
+        key = self._key(array.shape, array.dtype)
+        with self._lock:
+            self._idle.setdefault(key, []).append(array)
+            self._idle.move_to_end(key)
+            self._idle_bytes += array.nbytes
+            # Evict least recently used shapes until within budget
+            while self._idle_bytes > self.max_bytes:
+                oldest, stack = next(iter(self._idle.items()))
+                self._idle_bytes -= stack.pop(0).nbytes
+                if not stack:
+                    del self._idle[oldest]
+
+    @contextmanager
+    def lease(self) -> Iterator[Arena]:
+        """Borrow arrays for one request; they are returned on exit."""
+        arena = Arena(self)
+        try:
+            yield arena
+        finally:
+            arena.release()
+
+    def stats(self) -> Dict[str, int]:
+        """Idle buffer count and size."""
+        with self._lock:
+            return {
+                "buffers": sum(len(stack) for stack in self._idle.values()),
+                "bytes": self._idle_bytes,
+            }
+
+    def clear(self) -> None:
+        """Drop all idle buffers."""
+        with self._lock:
+            self._idle.clear()
+            self._idle_bytes = 0
+
+
+def allocator(arena: Optional[Arena]):
+    """``arena.empty`` when leasing, otherwise ``np.empty``."""
+    return arena.empty if arena is not None else np.empty
+
+
+def current_rss_bytes() -> int:
+    """
+    Resident set size of this process in bytes.
+
+    Reads ``/proc/self/statm`` where available; elsewhere falls back to the
+    peak RSS reported by ``getrusage``.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS reports bytes
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+buffer_pool = BufferPool()
@@ -0,0 +1,244 @@
+"""
+HTTP response compression with Content-Encoding negotiation.
+
+SVG documents are long runs of similar path text and compress well.
+``CompressionMiddleware`` compresses text, SVG and JSON responses with the
+best encoding the client accepts: zstd and brotli when their modules are
+installed, gzip always. Bodies are compressed as they stream, so a large
+response is never held twice; large chunks are compressed in the thread
+pool. Responses that already carry a Content-Encoding (e.g. precompressed
+cache entries) pass through untouched.
+"""
+import zlib
+from typing import Callable, Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+# Bodies smaller than this are sent as is
+MIN_COMPRESS_SIZE = 1024
+
+# Chunks at least this large are compressed in the thread pool, so a
+# multi-megabyte body does not stall every other request on the event loop
+OFFLOAD_SIZE = 16 * 1024
+
+# Content types worth compressing (prefix match)
+COMPRESSIBLE_TYPES = ("text/", "application/json", "image/svg+xml")
+
+# Server preference when the client accepts several encodings equally
+_PREFERENCE = ("zstd", "br", "gzip")
+
+
+class _Compressor:
+    """Streaming compressor: ``compress`` chunks, then ``flush`` once."""
+
+    def __init__(self, compress: Callable[[bytes], bytes], flush: Callable[[], bytes]):
+        self.compress = compress
+        self.flush = flush
+
+
+def _gzip() -> _Compressor:
+    engine = zlib.compressobj(6, zlib.DEFLATED, 31)
+    return _Compressor(engine.compress, engine.flush)
+
+
+def _brotli() -> _Compressor:
+    import brotli
+
+    engine = brotli.Compressor(quality=5)
+    return _Compressor(engine.process, engine.finish)
+
+
+def _zstd() -> _Compressor:
+    try:
+        from compression import zstd  # Python 3.14+
+
+        engine = zstd.ZstdCompressor(level=3)
+        return _Compressor(engine.compress, engine.flush)
+    except ImportError:
+        import zstandard
+
+        engine = zstandard.ZstdCompressor(level=3).compressobj()
+        return _Compressor(engine.compress, engine.flush)
+
+
+def _module_available(*names: str) -> bool:
+    import importlib.util
+
+    for name in names:
+        try:
+            if importlib.util.find_spec(name) is not None:
+                return True
+        except ImportError:
+            continue
+    return False
+
+
+_FACTORIES: Dict[str, Callable[[], _Compressor]] = {"gzip": _gzip}
+if _module_available("brotli"):
+    _FACTORIES["br"] = _brotli
+if _module_available("compression.zstd", "zstandard"):
+    _FACTORIES["zstd"] = _zstd
+
+
+def available_encodings() -> List[str]:
+    """Encodings this process can produce, most preferred first."""
+    return [name for name in _PREFERENCE if name in _FACTORIES]
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Pick a response encoding from an Accept-Encoding header.
+
+    Args:
+        accept_encoding: Header value, e.g. ``"gzip, br;q=0.9"``
+
+    Returns:
+        The accepted encoding with the highest q-value (server preference
+        breaks ties), or None to send the body uncompressed
+    """
+    if not accept_encoding:
+        return None
+
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name:
+            weights[name] = q
+
+    best, best_q = None, 0.0
+    for name in available_encodings():
+        q = weights.get(name, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def compressor(encoding: str) -> _Compressor:
+    """New streaming compressor for ``encoding``."""
+    return _FACTORIES[encoding]()
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """Compress a whole body with ``encoding``."""
+    engine = compressor(encoding)
+    return engine.compress(data) + engine.flush()
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    """Whether responses of this content type are compressed."""
+    return bool(content_type) and content_type.lower().startswith(COMPRESSIBLE_TYPES)
+
+
+def _varies_on_encoding(headers: Headers) -> bool:
+    """Whether Vary already lists Accept-Encoding (e.g. set by a handler)."""
+    vary = headers.get("vary", "")
+    return "accept-encoding" in (token.strip().lower() for token in vary.split(","))
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing eligible responses.
+
+    Args:
+        app: Wrapped ASGI application
+        minimum_size: Complete bodies smaller than this are not compressed;
+            streamed bodies are compressed regardless
+    """
+
+    def __init__(self, app, minimum_size: int = MIN_COMPRESS_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressingResponder(self.app, encoding, self.minimum_size)(scope, receive, send)
+
+
+class _CompressingResponder:
+    """Per-request state: holds the response start until the body decides."""
+
+    def __init__(self, app, encoding: str, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start_message = None
+        self.engine: Optional[_Compressor] = None
+        self.passthrough = False
+
+    async def __call__(self, scope, receive, send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_wrapper)
+
+    async def send_wrapper(self, message) -> None:
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        if self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.engine is None:
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            content_type = headers.get("content-type")
+            if is_compressible(content_type) and not _varies_on_encoding(headers):
+                headers.add_vary_header("Accept-Encoding")
+            if (
+                "content-encoding" in headers
+                or not is_compressible(content_type)
+                or (not more_body and len(body) < self.minimum_size)
+            ):
+                self.passthrough = True
+                await self.send(self.start_message)
+                await self.send(message)
+                return
+
+            headers["Content-Encoding"] = self.encoding
+            self.engine = compressor(self.encoding)
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                body = await self._compress(body, final=True)
+                headers["Content-Length"] = str(len(body))
+                await self.send(self.start_message)
+                await self.send({"type": "http.response.body", "body": body})
+                return
+            await self.send(self.start_message)
+
+        chunk = await self._compress(body, final=not more_body)
+        if chunk or not more_body:
+            await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+    async def _compress(self, body: bytes, final: bool) -> bytes:
+        """Feed a chunk to the engine, off the event loop if it is large."""
+        if len(body) >= OFFLOAD_SIZE:
+            return await run_in_threadpool(self._compress_sync, body, final)
+        return self._compress_sync(body, final)
+
+    def _compress_sync(self, body: bytes, final: bool) -> bytes:
+        data = self.engine.compress(body)
+        if final:
+            data += self.engine.flush()
+        return data
@@ -0,0 +1,437 @@
+"""
+Contour tracing for binary masks in pure NumPy.
+
+Boundaries are followed along the pixel cracks rather than by interpolating a
+scalar field: every edge between a foreground and a background pixel becomes
+a directed edge with the foreground on its right, each edge is linked to its
+successor at the edge's end corner, and the resulting permutation is split
+into cycles with pointer jumping. Everything is whole-array work; there is
+no per-pixel Python and no float conversion of the mask.
+
+Outer boundaries run clockwise on screen and holes counter-clockwise, so all
+contours of a mask can go into one SVG path and holes are cut out under the
+nonzero fill rule.
+"""
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# Edge directions, clockwise on screen (rows grow downwards)
+EAST, SOUTH, WEST, NORTH = 0, 1, 2, 3
+
+# (drow, dcol) step of each direction
+_STEPS = np.array([[0, 1], [1, 0], [0, -1], [-1, 0]], dtype=np.int64)
+
+
+def _as_bool_mask(mask: np.ndarray, width: Optional[int]) -> np.ndarray:
+    if width is not None:
+        # Rows packed with np.packbits(..., axis=1)
+        return np.unpackbits(mask, axis=1, count=width).view(bool)
+    if mask.dtype == bool:
+        return mask
+    return mask != 0
+
+
+def _boundary_edges(padded: np.ndarray) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Directed crack edges of a padded boolean mask.
+
+    Horizontal edges come first in row-major order, vertical edges after them
+    in column-major order, so consecutive edges of a straight run are
+    neighbours in the arrays.
+
+    Returns:
+        Tuple of (start corner flat index, direction, corner grid width)
+    """
+    rows, cols = padded.shape
+    corner_cols = cols + 1
+
+    # Horizontal cracks between pixel rows r-1 and r, spanning columns c..c+1:
+    # east with the foreground below, west with it above
+    flat = np.flatnonzero(padded[:-1] != padded[1:])
+    r, c = np.divmod(flat, cols)
+    east = padded[r + 1, c]
+    h_start = (r + 1) * corner_cols + c + ~east
+    h_dir = np.where(east, EAST, WEST).astype(np.int8)
+
+    # Vertical cracks between pixel columns c-1 and c, spanning rows r..r+1:
+    # south with the foreground on the left, north with it on the right
+    transposed = np.ascontiguousarray(padded.T)
+    flat = np.flatnonzero(transposed[:-1] != transposed[1:])
+    c, r = np.divmod(flat, rows)
+    south = transposed[c, r]
+    v_start = (r + ~south) * corner_cols + c + 1
+    v_dir = np.where(south, SOUTH, NORTH).astype(np.int8)
+
+    return np.concatenate([h_start, v_start]), np.concatenate([h_dir, v_dir]), corner_cols
+
+
+def _link_edges(start: np.ndarray, direction: np.ndarray, corner_cols: int, n_corners: int) -> np.ndarray:
+    """
+    Successor of every edge: the edge leaving its end corner.
+
+    At a saddle corner (two diagonal foreground pixels) there are two
+    candidates; turning right keeps the pixels apart, i.e. the foreground is
+    4-connected.
+    """
+    n = start.size
+    index_type = np.int32 if n < 2**31 else np.int64
+    step = _STEPS[direction]
+    end = start + step[:, 0] * corner_cols + step[:, 1]
+
+    # Every corner but a saddle has exactly one outgoing edge
+    outgoing = np.empty(n_corners, dtype=index_type)
+    edges = np.arange(n, dtype=index_type)
+    outgoing[start] = edges
+    successor = outgoing[end]
+
+    # At saddles the scatter kept one of two edges; resolve those by key
+    shadowed = outgoing[start] != edges
+    if shadowed.any():
+        saddle_corners = np.unique(start[shadowed])
+        arriving = np.flatnonzero(np.isin(end, saddle_corners))
+        candidates = np.flatnonzero(np.isin(start, saddle_corners))
+        keys = start[candidates] * 4 + direction[candidates]
+        order = np.argsort(keys)
+        sorted_keys = keys[order]
+        # Right turn if that edge exists, otherwise left (never straight on)
+        wanted = end[arriving] * 4 + (direction[arriving] + 1) % 4
+        pos = np.minimum(np.searchsorted(sorted_keys, wanted), sorted_keys.size - 1)
+        right = sorted_keys[pos] == wanted
+        wanted = end[arriving] * 4 + (direction[arriving] + 3) % 4
+        pos_left = np.minimum(np.searchsorted(sorted_keys, wanted), sorted_keys.size - 1)
+        successor[arriving] = candidates[order[np.where(right, pos, pos_left)]]
+
+    return successor
+
+
+def _run_ends(successor: np.ndarray, direction: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Contract straight runs of edges.
+
+    Returns:
+        Tuple of (first edge of every run, last edge of the same run)
+    """
+    return _runs_from_breaks(successor, direction[successor] != direction, direction)
+
+
+def _runs_from_breaks(
+    successor: np.ndarray, breaks: np.ndarray, direction: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Contract runs of edges that end wherever ``breaks`` is set.
+
+    Runs must be contiguous in the edge arrays: east/south runs going
+    forward, west/north runs backward.
+    """
+    n = successor.size
+    index = np.arange(n, dtype=successor.dtype)
+    predecessor = np.empty_like(successor)
+    predecessor[successor] = index
+    firsts = np.flatnonzero(breaks[predecessor])
+
+    forward = np.minimum.accumulate(np.where(breaks, index, n)[::-1])[::-1]
+    backward = np.maximum.accumulate(np.where(breaks, index, -1))
+    heading = direction[firsts]
+    lasts = np.where((heading == EAST) | (heading == SOUTH), forward[firsts], backward[firsts])
+    return firsts, lasts
+
+
+def _order_cycles(successor: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Decompose a permutation into cycles with pointer jumping.
+
+    Returns:
+        Tuple of (element order, cycle start offsets into that order).
+        Elements of a cycle are contiguous and in traversal order starting at
+        the cycle's smallest index.
+    """
+    n = successor.size
+    identity = np.arange(n, dtype=successor.dtype)
+
+    # Label every element with the smallest index on its cycle
+    label = identity
+    jump = successor
+    while True:
+        updated = np.minimum(label, label[jump])
+        if np.array_equal(updated, label):
+            break
+        label = updated
+        jump = jump[jump]
+
+    # Cut each cycle before its smallest element and rank by distance to the cut
+    tail = successor == label[successor]
+    jump = np.where(tail, identity, successor)
+    distance = (~tail).astype(successor.dtype)
+    while True:
+        advanced = jump[jump]
+        if np.array_equal(advanced, jump):
+            break
+        distance += distance[jump]
+        jump = advanced
+
+    order = np.lexsort((-distance, label))
+    sorted_labels = label[order]
+    starts = np.flatnonzero(np.r_[True, sorted_labels[1:] != sorted_labels[:-1]])
+    return order, starts
+
+
+def find_binary_contours(
+    mask: np.ndarray, width: Optional[int] = None, midpoints: bool = True
+) -> Tuple[List[np.ndarray], np.ndarray]:
+    """
+    Trace the boundaries of a binary mask.
+
+    Args:
+        mask: Mask (H, W) where non-zero is foreground (uint8 or bool), or
+            rows packed with ``np.packbits(..., axis=1)`` when ``width`` is given
+        width: Unpacked width of a packed mask
+        midpoints: Emit crack midpoints (the same points marching squares
+            gives for a binary mask) instead of integer pixel corners
+
+    Returns:
+        Tuple of (contours, is_hole). Each contour is an (N, 2) float array
+        of (x, y) in pixel-corner coordinates with y pointing down, without a
+        repeated closing point; only the ends of straight runs are kept.
+        ``is_hole`` flags the contours that bound holes.
+    """
+    binary = _as_bool_mask(mask, width)
+    padded = np.pad(binary, 1)
+
+    start, direction, corner_cols = _boundary_edges(padded)
+    if start.size == 0:
+        return [], np.zeros(0, dtype=bool)
+
+    successor = _link_edges(start, direction, corner_cols, (padded.shape[0] + 1) * corner_cols)
+
+    # Only runs between turns need ordering; link each run to the next
+    firsts, lasts = _run_ends(successor, direction)
+    run_of = np.empty(start.size, dtype=successor.dtype)
+    run_of[firsts] = np.arange(firsts.size, dtype=successor.dtype)
+    order, cycle_starts = _order_cycles(run_of[successor[lasts]])
+    firsts = firsts[order]
+    lasts = lasts[order]
+
+    # Turn vertices: corner coordinates without the padding
+    row, col = np.divmod(start[firsts], corner_cols)
+    row -= 1
+    col -= 1
+
+    # Signed area: positive for clockwise (outer) boundaries
+    n = firsts.size
+    cycle_ends = np.r_[cycle_starts[1:], n]
+    following = np.arange(1, n + 1)
+    following[cycle_ends - 1] = cycle_starts
+    cross = col * row[following] - col[following] * row
+    is_hole = np.add.reduceat(cross, cycle_starts) < 0
+
+    if midpoints:
+        # Midpoints of the first and (if different) last edge of each run
+        first_step = _STEPS[direction[firsts]]
+        run_length = np.abs(start[lasts] - start[firsts]) // np.where(np.abs(first_step[:, 0]) > 0, corner_cols, 1)
+        ends = np.empty((n, 2, 2))
+        ends[:, 0, 0] = col + 0.5 * first_step[:, 1]
+        ends[:, 0, 1] = row + 0.5 * first_step[:, 0]
+        ends[:, 1, 0] = ends[:, 0, 0] + run_length * first_step[:, 1]
+        ends[:, 1, 1] = ends[:, 0, 1] + run_length * first_step[:, 0]
+        keep = np.column_stack([np.ones(n, dtype=bool), run_length > 0])
+        points = ends[keep]
+        counts = np.add.reduceat(keep.sum(axis=1), cycle_starts)
+    else:
+        points = np.column_stack([col, row]).astype(np.float64)
+        counts = np.diff(cycle_ends, prepend=0)
+
+    contours = np.split(points, np.cumsum(counts)[:-1])
+    return contours, is_hole
+
+
+class LabelBoundaries(NamedTuple):
+    """
+    Boundaries of the regions of a label image, split into shared chains.
+
+    Every closed boundary (cycle) of a region is cut at junction corners,
+    where three or more regions meet, into pieces. A piece runs from one
+    junction to the next along the border of exactly two regions; the region
+    on the other side walks the same chain backwards, and both pieces carry
+    the same ``piece_keys`` entry. Cycles without junctions are a single
+    closed piece.
+
+    Attributes:
+        points: (N, 2) (x, y) pixel-corner coordinates, y pointing down, of
+            all pieces back to back. Open pieces include both junction
+            corners; closed pieces do not repeat their first point.
+        piece_offsets: Start of every piece in ``points``, plus a final end
+        piece_keys: Chain id shared by the two sides of a chain
+        piece_closed: Whether the piece is a junction-free closed loop
+        cycle_labels: Region label of every cycle
+        cycle_offsets: First piece of every cycle, plus a final end
+    """
+
+    points: np.ndarray
+    piece_offsets: np.ndarray
+    piece_keys: np.ndarray
+    piece_closed: np.ndarray
+    cycle_labels: np.ndarray
+    cycle_offsets: np.ndarray
+
+
+def find_label_boundaries(
+    label_image: np.ndarray, labels: Optional[List[int]] = None
+) -> LabelBoundaries:
+    """
+    Trace every region boundary of a label image in one pass.
+
+    Each crack between two differently labelled pixels is visited once per
+    side, linked with the same right-turn rule as ``find_binary_contours``
+    (regions are 4-connected), and chains between junctions are identified
+    so that callers can simplify each shared border once.
+
+    Args:
+        label_image: (H, W) integer labels, all >= 0
+        labels: Labels whose boundaries are wanted (default: all)
+
+    Returns:
+        ``LabelBoundaries`` with crack-midpoint coordinates
+    """
+    # Labels are >= 0, so the padding frame never matches a requested label,
+    # even one that has no pixels
+    outside = -1
+    padded = np.pad(label_image.astype(np.int32, copy=False), 1, constant_values=outside)
+    rows, cols = padded.shape
+    corner_cols = cols + 1
+
+    # Crack ids: horizontal cracks row-major, then vertical cracks column-major,
+    # so the cracks of any straight run have consecutive ids
+    h_cracks = padded[:-1] != padded[1:]
+    h_flat = np.flatnonzero(h_cracks)
+    transposed = np.ascontiguousarray(padded.T)
+    v_cracks = transposed[:-1] != transposed[1:]
+    v_flat = np.flatnonzero(v_cracks)
+    n_h = h_flat.size
+    n_cracks = n_h + v_flat.size
+    if n_cracks == 0:
+        return LabelBoundaries(
+            np.zeros((0, 2)), np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int64),
+            np.zeros(0, dtype=bool), np.zeros(0, dtype=np.int64), np.zeros(1, dtype=np.int64),
+        )
+
+    index_type = np.int32 if 2 * n_cracks < 2**31 else np.int64
+    h_ids = np.empty(h_cracks.size, dtype=index_type)
+    h_ids[h_flat] = np.arange(n_h, dtype=index_type)
+    v_ids = np.empty(v_cracks.size, dtype=index_type)
+    v_ids[v_flat] = np.arange(n_h, n_cracks, dtype=index_type)
+
+    # Half-edges: forward (east/south) sides of all cracks, then backward
+    # (west/north) sides, each with the region on its right
+    a, c = np.divmod(h_flat, cols)
+    b, r = np.divmod(v_flat, rows)
+    row = np.concatenate([a + 1, r, a + 1, r + 1])
+    col = np.concatenate([c, b + 1, c + 1, b + 1])
+    direction = np.concatenate([
+        np.full(n_h, EAST, dtype=np.int8), np.full(v_flat.size, SOUTH, dtype=np.int8),
+        np.full(n_h, WEST, dtype=np.int8), np.full(v_flat.size, NORTH, dtype=np.int8),
+    ])
+    region = np.concatenate([
+        padded[a + 1, c], padded[r, b], padded[a, c], padded[r, b + 1],
+    ])
+
+    # Arms at the end corner of every half-edge
+    end_row = row + _STEPS[direction, 0]
+    end_col = col + _STEPS[direction, 1]
+    arm_east = h_cracks[end_row - 1, end_col]
+    arm_south = v_cracks[end_col - 1, end_row]
+    arm_west = h_cracks[end_row - 1, end_col - 1]
+    arm_north = v_cracks[end_col - 1, end_row - 1]
+    arms = np.stack([arm_east, arm_south, arm_west, arm_north], axis=1)
+    junction = arms.sum(axis=1) != 2
+
+    # Right turn, straight on, left turn: the first arm that exists
+    n = direction.size
+    index = np.arange(n)
+    turn = np.where(arms[index, (direction + 1) % 4], 1, np.where(arms[index, direction], 0, 3))
+    heading = (direction + turn) % 4
+    successor = np.empty(n, dtype=index_type)
+    for d, lookup, backward in (
+        (EAST, lambda i, j: h_ids[(i - 1) * cols + j], False),
+        (SOUTH, lambda i, j: v_ids[(j - 1) * rows + i], False),
+        (WEST, lambda i, j: h_ids[(i - 1) * cols + j - 1], True),
+        (NORTH, lambda i, j: v_ids[(j - 1) * rows + i - 1], True),
+    ):
+        going = np.flatnonzero(heading == d)
+        successor[going] = lookup(end_row[going], end_col[going]) + (n_cracks if backward else 0)
+
+    # Keep the wanted regions; their cycles are closed under the successor
+    wanted = region != outside if labels is None else np.isin(region, labels)
+    kept = np.flatnonzero(wanted)
+    renumber = np.empty(n, dtype=index_type)
+    renumber[kept] = np.arange(kept.size, dtype=index_type)
+    successor = renumber[successor[kept]]
+    row, col, direction, region, junction = row[kept], col[kept], direction[kept], region[kept], junction[kept]
+    crack = kept % n_cracks
+
+    # Contract straight runs that do not pass a junction
+    turning = (direction[successor] != direction) | junction
+    firsts, lasts = _runs_from_breaks(successor, turning, direction)
+    run_of = np.empty(successor.size, dtype=index_type)
+    run_of[firsts] = np.arange(firsts.size, dtype=index_type)
+    order, cycle_starts = _order_cycles(run_of[successor[lasts]])
+    firsts, lasts = firsts[order], lasts[order]
+
+    predecessor = np.empty_like(successor)
+    predecessor[successor] = np.arange(successor.size, dtype=index_type)
+    starts_at_junction = junction[predecessor[firsts]]
+
+    # Rotate every cycle to begin at a junction, if it has one
+    n_runs = firsts.size
+    lengths = np.diff(np.r_[cycle_starts, n_runs])
+    cycle_id = np.repeat(np.arange(cycle_starts.size), lengths)
+    position = np.arange(n_runs) - cycle_starts[cycle_id]
+    first_junction = np.minimum.reduceat(np.where(starts_at_junction, position, n_runs), cycle_starts)
+    shift = np.where(first_junction < n_runs, first_junction, 0)
+    rotated = np.empty(n_runs, dtype=np.int64)
+    rotated[cycle_starts[cycle_id] + (position - shift[cycle_id]) % lengths[cycle_id]] = np.arange(n_runs)
+    firsts, lasts, starts_at_junction = firsts[rotated], lasts[rotated], starts_at_junction[rotated]
+
+    # Pieces start at junctions and at the start of junction-free cycles
+    piece_start = starts_at_junction.copy()
+    piece_start[cycle_starts] = True
+    piece_first_run = np.flatnonzero(piece_start)
+    n_pieces = piece_first_run.size
+    run_key = np.minimum(crack[firsts], crack[lasts])
+    piece_keys = np.minimum.reduceat(run_key, piece_first_run).astype(np.int64)
+    piece_closed = ~starts_at_junction[piece_first_run]
+    cycle_offsets = np.r_[np.searchsorted(piece_first_run, cycle_starts), n_pieces]
+
+    # Points per run: the junction corner it starts at (if any), then the
+    # midpoints of its first and last crack
+    step = _STEPS[direction[firsts]][:, ::-1]
+    run_length = np.maximum(np.abs(row[lasts] - row[firsts]), np.abs(col[lasts] - col[firsts]))
+    corner = np.column_stack([col[firsts], row[firsts]]).astype(np.float64) - 1
+    first_mid = corner + 0.5 * step
+    last_mid = first_mid + run_length[:, None] * step
+    slots = np.stack([corner, first_mid, last_mid], axis=1)
+    keep = np.column_stack([starts_at_junction, np.ones(n_runs, dtype=bool), run_length > 0])
+    run_points = slots[keep]
+    run_offsets = np.r_[0, np.cumsum(keep.sum(axis=1))]
+
+    # Open pieces also end on the junction corner where the next piece starts
+    piece_begin = run_offsets[piece_first_run]
+    piece_end = np.r_[piece_begin[1:], run_offsets[-1]]
+    piece_cycle = np.repeat(np.arange(cycle_starts.size), np.diff(cycle_offsets))
+    next_piece = np.arange(1, n_pieces + 1)
+    wraps = next_piece == cycle_offsets[piece_cycle + 1]
+    next_piece[wraps] = cycle_offsets[piece_cycle[wraps]]
+
+    counts = piece_end - piece_begin + ~piece_closed
+    offsets = np.r_[0, np.cumsum(counts)]
+    source = np.arange(offsets[-1]) + np.repeat(piece_begin - offsets[:-1], counts)
+    source[offsets[1:][~piece_closed] - 1] = piece_begin[next_piece[~piece_closed]]
+
+    return LabelBoundaries(
+        points=run_points[source],
+        piece_offsets=offsets,
+        piece_keys=piece_keys,
+        piece_closed=piece_closed,
+        cycle_labels=region[firsts[cycle_starts]].astype(np.int64),
+        cycle_offsets=cycle_offsets,
+    )
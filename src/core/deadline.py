@@ -0,0 +1,117 @@
+"""
+Per-request deadlines and cancellation for the processing pipelines.
+
+A ``Deadline`` travels with one request into the worker thread. Pipelines
+call ``check`` between stages (decode, quantize, each trace layer, build)
+and stop there once the client has gone away or the time budget is spent.
+With ``degrade`` set, pipelines may instead trade quality for time and
+record what they gave up in ``degradations``.
+"""
+import asyncio
+import threading
+import time
+from typing import Awaitable, Callable, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Seconds between client disconnect checks while a request is processing
+DISCONNECT_POLL_INTERVAL = 0.1
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's time budget ran out before the pipeline finished."""
+
+
+class RequestCancelled(Exception):
+    """The client went away; the result would never be delivered."""
+
+
+class Deadline:
+    """
+    Time budget and cancellation flag for one request.
+
+    Args:
+        timeout: Seconds from now until the deadline (None for no deadline)
+        degrade: Let pipelines lower quality to finish in time
+    """
+
+    def __init__(self, timeout: Optional[float] = None, degrade: bool = False):
+        self.timeout = timeout
+        self.expires_at = None if timeout is None else time.monotonic() + timeout
+        self.degrade = degrade
+        self.degradations: List[str] = []
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        """Stop the pipeline at its next check."""
+        self._cancelled.set()
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left (may be negative), or None without a deadline."""
+        if self.expires_at is None:
+            return None
+        return self.expires_at - time.monotonic()
+
+    def should_degrade(self, estimate: float) -> bool:
+        """
+        Whether work estimated at ``estimate`` seconds should be made cheaper.
+
+        Always False unless degradation was requested and a deadline is set.
+        """
+        remaining = self.remaining()
+        return self.degrade and remaining is not None and estimate > remaining
+
+    def check(self, stage: str) -> None:
+        """
+        Raise if the pipeline should stop before ``stage``.
+
+        Raises:
+            RequestCancelled: The request was cancelled
+            DeadlineExceeded: The deadline has passed
+        """
+        if self.cancelled:
+            raise RequestCancelled(f"Cancelled before {stage}")
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded(f"Deadline of {self.timeout:g} s exceeded before {stage}")
+
+
+async def watch_disconnect(
+    request,
+    work: Awaitable[T],
+    on_disconnect: Optional[Callable[[], None]] = None,
+    interval: float = DISCONNECT_POLL_INTERVAL,
+) -> T:
+    """
+    Await ``work`` while polling whether the client is still connected.
+
+    Args:
+        request: Starlette request whose body has been read
+        work: Awaitable producing the response data
+        on_disconnect: Called when the client goes away, e.g.
+            ``Deadline.cancel`` to stop a worker thread
+        interval: Seconds between checks
+
+    Returns:
+        The result of ``work``
+
+    Raises:
+        RequestCancelled: The client disconnected first; ``work`` is cancelled
+    """
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                if on_disconnect is not None:
+                    on_disconnect()
+                raise RequestCancelled("Client disconnected")
+    finally:
+        if not task.done():
+            task.cancel()
@@ -1,5 +1,10 @@
+import os
+
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
-limiter = Limiter(key_func=get_remote_address)
-
+# EKTOOLS_RATE_LIMITS=0 turns the per-client limits off (load testing)
+limiter = Limiter(
+    key_func=get_remote_address,
+    enabled=os.environ.get("EKTOOLS_RATE_LIMITS", "1").lower() not in ("0", "false", "no"),
+)
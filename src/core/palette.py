@@ -0,0 +1,175 @@
+"""
+Palette reuse: parsing client palettes, nearest-color assignment and a
+perceptual-hash keyed cache of fitted palettes for K-means warm starts.
+"""
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from src.core.buffers import Arena, allocator
+from src.core.color_lut import lut_cache
+
+# Maximum Hamming distance between fingerprints treated as the same artwork
+MAX_HASH_DISTANCE = 6
+
+_HEX_COLOR = re.compile(r"^#?([0-9a-fA-F]{6})$")
+
+
+def parse_palette(value: str) -> List[Tuple[int, int, int]]:
+    """
+    Parse a comma-separated list of hex colors.
+    
+    Args:
+        value: Palette such as "#ff0000,#00ff00" (the "#" is optional)
+        
+    Returns:
+        List of RGB color tuples
+        
+    Raises:
+        ValueError: If any entry is not a 6-digit hex color
+    """
+    colors = []
+    for entry in value.split(","):
+        match = _HEX_COLOR.match(entry.strip())
+        if not match:
+            raise ValueError(f"Invalid palette color: '{entry.strip()}'")
+        hex_value = match.group(1)
+        colors.append(tuple(int(hex_value[i : i + 2], 16) for i in (0, 2, 4)))
+    return colors
+
+
+def format_palette(colors: List[Tuple[int, int, int]]) -> str:
+    """
+    Format RGB colors as a comma-separated hex palette.
+    
+    Args:
+        colors: List of RGB color tuples
+        
+    Returns:
+        Palette string accepted by ``parse_palette``
+    """
+    return ",".join(f"#{int(r):02x}{int(g):02x}{int(b):02x}" for r, g, b in colors)
+
+
+def assign_palette(
+    image: np.ndarray,
+    colors: List[Tuple[int, int, int]],
+    quantized: bool = True,
+    arena: Optional[Arena] = None,
+) -> Tuple[Optional[np.ndarray], np.ndarray, List[Tuple[int, int, int]]]:
+    """
+    Map every pixel to its nearest palette color without fitting.
+    
+    Pixels are labeled through the palette's cached lookup table; only
+    pixels near a boundary between two palette colors get real distances.
+    
+    Args:
+        image: Input image in BGR format (H, W, 3)
+        colors: Palette as RGB tuples
+        quantized: Whether to build the quantized image (see ``quantize_colors``)
+        arena: Optional buffer arena to take the label image from
+        
+    Returns:
+        Same tuple as ``quantize_colors``
+    """
+    h, w = image.shape[:2]
+    centers_rgb = np.asarray(colors, dtype=np.uint8)
+    
+    labels = allocator(arena)(h * w, np.int32)
+    label_image = lut_cache.get(centers_rgb).assign(image, out=labels).reshape(h, w)
+    quantized_image = centers_rgb[:, ::-1][label_image] if quantized else None
+    color_list = [tuple(int(v) for v in center) for center in centers_rgb]
+    
+    return quantized_image, label_image, color_list
+
+
+def image_fingerprint(image: np.ndarray) -> int:
+    """
+    Compute a 64-bit difference hash (dHash) of an image.
+    
+    Visually similar images (recolored backgrounds, small edits, different
+    export sizes) produce fingerprints within a few bits of each other.
+    
+    Args:
+        image: Input image in BGR format
+        
+    Returns:
+        Fingerprint as an integer
+    """
+    import cv2
+
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+class PaletteCache:
+    """
+    Bounded LRU cache of fitted palettes keyed by image fingerprint.
+    
+    Lookups match the closest stored fingerprint within ``max_distance`` bits
+    so variants of the same artwork share a warm start.
+    """
+
+    def __init__(self, max_entries: int = 256, max_distance: int = MAX_HASH_DISTANCE):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self._entries: "OrderedDict[Tuple[int, int], List[Tuple[int, int, int]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, fingerprint: int, n_colors: int) -> Optional[np.ndarray]:
+        """
+        Find a cached palette for a similar image.
+        
+        Args:
+            fingerprint: Image fingerprint from ``image_fingerprint``
+            n_colors: Palette size the caller needs
+            
+        Returns:
+            Palette as a float array (n_colors, 3) in RGB order, or None
+        """
+        with self._lock:
+            best_key = None
+            best_distance = self.max_distance + 1
+            for key in self._entries:
+                cached_fingerprint, cached_colors = key
+                if cached_colors != n_colors:
+                    continue
+                distance = bin(cached_fingerprint ^ fingerprint).count("1")
+                if distance < best_distance:
+                    best_key, best_distance = key, distance
+                    if distance == 0:
+                        break
+            
+            if best_key is None:
+                return None
+            
+            self._entries.move_to_end(best_key)
+            return np.asarray(self._entries[best_key], dtype=np.float64)
+
+    def put(self, fingerprint: int, colors: List[Tuple[int, int, int]]) -> None:
+        """
+        Store a fitted palette.
+        
+        Args:
+            fingerprint: Image fingerprint from ``image_fingerprint``
+            colors: Fitted palette as RGB tuples
+        """
+        key = (fingerprint, len(colors))
+        with self._lock:
+            self._entries[key] = list(colors)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached palettes."""
+        with self._lock:
+            self._entries.clear()
+
+
+palette_cache = PaletteCache()
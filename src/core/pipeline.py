@@ -0,0 +1,484 @@
+"""
+End-to-end processing pipelines shared by the HTTP API and the batch CLI.
+
+Each function takes encoded input bytes and returns the encoded result.
+Parameter validation, rate limiting and response headers stay in
+``src.api``; callers here are trusted to pass valid options.
+"""
+import math
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from src.core.buffers import buffer_pool
+from src.core.deadline import Deadline, DeadlineExceeded
+from src.core.palette import assign_palette, image_fingerprint, palette_cache
+from src.core.prefilter import prefilter_image
+from src.core.preview import preview_png
+from src.core.quantize import (
+    AUTO_COLOR_ERROR,
+    get_color_masks,
+    quantize_colors,
+    quantize_colors_auto,
+)
+from src.core.sandbox import RenderTimeout
+from src.core.shared_arrays import SharedArena
+from src.core.simplify import DEFAULT_DETAIL
+from src.core.svg_builder import build_svg, view_box_size
+from src.core.trace import trace_label_image, trace_mask
+from src.utils.image_io import image_to_bytes, load_image_from_bytes
+from src.utils.mask_ops import DEFAULT_SPECKLE_AREA, filter_speckles
+
+TRACERS = ("shared", "layers")
+
+# Largest palette considered when the color count is picked automatically
+MAX_AUTO_COLORS = 20
+
+# Rough cost model for deadline degradation, measured on the benchmark
+# fixtures (photos, the slowest): quantizing and tracing at 8 colors, and
+# GrabCut
+VECTORIZE_SECONDS_PER_MEGAPIXEL = 1.2
+GRABCUT_SECONDS_PER_MEGAPIXEL = 20.0
+
+# Palette size and smallest working resolution quality degrades to
+DEGRADED_COLORS = 8
+MIN_DEGRADED_PIXELS = 256 * 256
+
+
+class VectorizeResult(NamedTuple):
+    """
+    Output of ``vectorize_image``.
+
+    Attributes:
+        svg: SVG document
+        colors: Palette used, as RGB tuples
+        palette_source: "supplied", "auto", "warm" or "cold"
+        detail: Detail level of the returned document
+        width: Image width in pixels
+        height: Image height in pixels
+        trace_size: (width, height) the image was quantized and traced at
+        buffer_bytes: Size of the pooled working arrays used
+        preview: PNG preview rendered from the paths, if requested
+        preview_size: (width, height) of the preview, if rendered
+    """
+
+    svg: str
+    colors: List[Tuple[int, int, int]]
+    palette_source: str
+    detail: float
+    width: int
+    height: int
+    trace_size: Tuple[int, int]
+    buffer_bytes: int
+    preview: Optional[bytes] = None
+    preview_size: Optional[Tuple[int, int]] = None
+
+
+def trace_size_for(width: int, height: int, max_pixels: Optional[int]) -> Tuple[int, int]:
+    """
+    Working resolution for an image under a pixel budget.
+
+    Args:
+        width: Image width
+        height: Image height
+        max_pixels: Largest width * height to process (None for no limit)
+
+    Returns:
+        (width, height) with the aspect ratio kept; the input size if it
+        already fits
+    """
+    if max_pixels is None or width * height <= max_pixels:
+        return width, height
+    scale = math.sqrt(max_pixels / (width * height))
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+def estimate_vectorize_seconds(pixels: int, colors: Optional[int]) -> float:
+    """
+    Rough time to quantize and trace ``pixels`` at a palette size.
+
+    Args:
+        pixels: Working resolution width * height
+        colors: Palette size; None (automatic) is costed like
+            ``MAX_AUTO_COLORS``
+
+    Returns:
+        Estimated seconds
+    """
+    n_colors = MAX_AUTO_COLORS if colors is None else colors
+    return pixels / 1e6 * VECTORIZE_SECONDS_PER_MEGAPIXEL * (0.5 + n_colors / 16)
+
+
+def vectorize_image(
+    image_bytes: bytes,
+    colors: Optional[int] = None,
+    color_error: float = AUTO_COLOR_ERROR,
+    palette: Optional[List[Tuple[int, int, int]]] = None,
+    detail: float = DEFAULT_DETAIL,
+    max_bytes: Optional[int] = None,
+    speckle_area: int = DEFAULT_SPECKLE_AREA,
+    tracer: str = "shared",
+    max_trace_pixels: Optional[int] = None,
+    prefilter: str = "none",
+    deadline: Optional[Deadline] = None,
+    preview_size: Optional[int] = None,
+) -> VectorizeResult:
+    """
+    Vectorize an image into an SVG with color quantization.
+
+    Args:
+        image_bytes: Encoded image (PNG)
+        colors: Number of colors (2-20); None picks the smallest palette
+            that meets ``color_error``
+        color_error: Target RMS color error when ``colors`` is None
+        palette: Optional palette as RGB tuples; skips fitting and overrides
+            ``colors``
+        detail: Path detail in [0, 1]; lower values simplify contours more
+        max_bytes: Optional SVG size budget; detail is lowered step by step
+            until the document fits (best effort)
+        speckle_area: Same-color regions smaller than this many pixels are
+            merged into their neighbours before tracing (0 disables)
+        tracer: One of ``TRACERS``
+        max_trace_pixels: Optional pixel budget; larger images are
+            downscaled with area interpolation, quantized and traced at that
+            size, and the SVG viewBox maps the result back to the original
+            dimensions. ``speckle_area`` applies at the working resolution
+        prefilter: Edge-preserving smoothing before quantization, one of
+            ``PREFILTERS`` (runs at the working resolution)
+        deadline: Optional deadline checked between stages. With
+            ``deadline.degrade`` the palette is capped at ``DEGRADED_COLORS``
+            and then the working resolution lowered when the estimated cost
+            exceeds the time left; applied steps go to
+            ``deadline.degradations``
+        preview_size: Optional long side in pixels of a PNG preview rendered
+            directly from the final paths (no SVG rasterizer involved)
+
+    Returns:
+        VectorizeResult with the SVG document and the palette used
+
+    Raises:
+        DeadlineExceeded: The deadline passed between stages
+        RequestCancelled: The deadline was cancelled
+    """
+    if deadline is None:
+        deadline = Deadline()
+
+    with buffer_pool.lease() as arena:
+        # Load image
+        deadline.check("decode")
+        opencv_image, pil_image = load_image_from_bytes(image_bytes, arena=arena)
+
+        # Get image dimensions; the RGB copy is not needed after decoding
+        width, height = pil_image.size
+        del pil_image
+
+        # Work at a bounded resolution; the viewBox scales the paths back
+        trace_width, trace_height = trace_size_for(width, height, max_trace_pixels)
+        if palette is None:
+            colors = _degrade_colors(deadline, trace_width * trace_height, colors)
+        trace_width, trace_height = _degrade_trace_size(
+            deadline, trace_width, trace_height, len(palette) if palette is not None else colors
+        )
+        downscaled = (trace_width, trace_height) != (width, height)
+        if downscaled:
+            import cv2
+
+            opencv_image = cv2.resize(
+                opencv_image,
+                (trace_width, trace_height),
+                dst=arena.empty((trace_height, trace_width, 3), np.uint8),
+                interpolation=cv2.INTER_AREA,
+            )
+
+        deadline.check("prefilter")
+        opencv_image = prefilter_image(opencv_image, prefilter, arena=arena)
+
+        # Quantize colors
+        deadline.check("quantize")
+        fingerprint = image_fingerprint(opencv_image)
+        if palette is not None:
+            # Client-supplied palette: nearest-color assignment only
+            _, label_image, color_list = assign_palette(
+                opencv_image, palette, quantized=False, arena=arena
+            )
+            palette_source = "supplied"
+        elif colors is None:
+            _, label_image, color_list = quantize_colors_auto(
+                opencv_image,
+                max_colors=MAX_AUTO_COLORS,
+                max_error=color_error,
+                quantized=False,
+                arena=arena,
+            )
+            palette_source = "auto"
+        else:
+            # Warm-start from the palette of a previously seen similar image
+            init = palette_cache.get(fingerprint, colors)
+            _, label_image, color_list = quantize_colors(
+                opencv_image, colors, init=init, quantized=False, arena=arena
+            )
+            palette_source = "warm" if init is not None else "cold"
+        n_colors = len(color_list)
+
+        if palette is None:
+            palette_cache.put(fingerprint, color_list)
+
+        # Merge specks into their neighbours so they never become paths
+        label_image = filter_speckles(label_image, speckle_area, n_colors, arena=arena)
+
+        # Per-color masks are only needed when tracing layer by layer
+        masks = (
+            get_color_masks(label_image, n_colors, arena=arena)
+            if tracer == "layers"
+            else None
+        )
+        areas = np.bincount(label_image.ravel(), minlength=n_colors)
+
+        total_pixels = trace_width * trace_height
+        cluster_data = []
+        for i in range(n_colors):
+            area = int(areas[i])
+            brightness = sum(color_list[i]) / (3 * 255)
+            cluster_data.append(
+                {
+                    "index": i,
+                    "mask": masks[i] if masks is not None else None,
+                    "color": color_list[i],
+                    "area": area,
+                    "is_background": (area / total_pixels) >= 0.4 and brightness >= 0.9,
+                }
+            )
+
+        # Sort largest areas first so backgrounds are drawn before details;
+        # clusters the speckle filter or quantizer left empty have nothing to trace
+        cluster_data = [c for c in cluster_data if c["area"] > 0]
+        cluster_data.sort(key=lambda item: item["area"], reverse=True)
+
+        render_clusters = [c for c in cluster_data if not c["is_background"]]
+        if not render_clusters:
+            render_clusters = cluster_data
+
+        # Trace and build, lowering detail until the size budget is met
+        for level in _detail_levels(detail, max_bytes):
+            deadline.check("trace")
+            if tracer == "shared":
+                paths = _trace_shared(label_image, render_clusters, level)
+            else:
+                paths = _trace_clusters(render_clusters, level, deadline)
+            scale_factor = _determine_scale_factor(paths, trace_width, trace_height)
+
+            # Build SVG
+            deadline.check("build")
+            svg_content = build_svg(
+                width,
+                height,
+                paths,
+                scale_factor=scale_factor,
+                trace_size=(trace_width, trace_height) if downscaled else None,
+            )
+            if max_bytes is None or len(svg_content.encode("utf-8")) <= max_bytes:
+                break
+
+        preview = rendered_size = None
+        if preview_size is not None:
+            deadline.check("preview")
+            view_size = view_box_size(
+                width,
+                height,
+                scale_factor,
+                (trace_width, trace_height) if downscaled else None,
+            )
+            preview, rendered_size = preview_png(paths, view_size, (width, height), preview_size)
+
+        return VectorizeResult(
+            svg=svg_content,
+            colors=color_list,
+            palette_source=palette_source,
+            detail=level,
+            width=width,
+            height=height,
+            trace_size=(trace_width, trace_height),
+            buffer_bytes=arena.nbytes,
+            preview=preview,
+            preview_size=rendered_size,
+        )
+
+
+def remove_background_image(
+    image_bytes: bytes, method: str = "kmeans", deadline: Optional[Deadline] = None
+) -> bytes:
+    """
+    Remove the background of an image.
+
+    Args:
+        image_bytes: Encoded image (JPEG or PNG)
+        method: Background removal method (see ``remove_background``)
+        deadline: Optional deadline checked between stages. With
+            ``deadline.degrade``, GrabCut falls back to K-means when its
+            estimated cost exceeds the time left
+
+    Returns:
+        PNG bytes with an alpha channel
+
+    Raises:
+        DeadlineExceeded: The deadline passed between stages
+        RequestCancelled: The deadline was cancelled
+    """
+    from src.core.background import segment_workers
+
+    if deadline is None:
+        deadline = Deadline()
+
+    if not segment_workers:
+        return _remove_background(image_bytes, method, deadline)
+    # Decode into shared memory; the worker segments it in place
+    with SharedArena() as shared:
+        return _remove_background(image_bytes, method, deadline, shared)
+
+
+def _remove_background(
+    image_bytes: bytes, method: str, deadline: Deadline, shared: Optional[SharedArena] = None
+) -> bytes:
+    """
+    Decode, segment (in a worker process when ``shared`` is given) and encode.
+
+    No array outlives this call, so ``shared`` can be unmapped right after.
+    """
+    import cv2
+    from PIL import Image
+
+    from src.core.background import remove_background, segment_sandbox
+
+    deadline.check("decode")
+    opencv_image, _ = load_image_from_bytes(image_bytes, arena=shared)
+
+    pixels = opencv_image.shape[0] * opencv_image.shape[1]
+    if method == "grabcut" and deadline.should_degrade(
+        pixels / 1e6 * GRABCUT_SECONDS_PER_MEGAPIXEL
+    ):
+        method = "kmeans"
+        deadline.degradations.append("method=kmeans")
+
+    # Remove background (returns BGRA image)
+    deadline.check("segment")
+    if shared is None:
+        result_bgra = remove_background(opencv_image, method=method)
+    else:
+        result_bgra = shared.empty(opencv_image.shape[:2] + (4,), np.uint8)
+        try:
+            # Only the handles are pickled; the worker is killed if it overruns
+            segment_sandbox.render(
+                shared.handle(opencv_image),
+                shared.handle(result_bgra),
+                method,
+                timeout=deadline.remaining(),
+            )
+        except RenderTimeout as e:
+            if deadline.expires_at is None:
+                raise
+            raise DeadlineExceeded(
+                f"Deadline of {deadline.timeout:g} s exceeded during segment"
+            ) from e
+    deadline.check("encode")
+
+    # Convert to PIL Image (RGBA) and encode
+    result_rgba = cv2.cvtColor(result_bgra, cv2.COLOR_BGRA2RGBA)
+    return image_to_bytes(Image.fromarray(result_rgba), format="PNG")
+
+
+def _degrade_colors(deadline: Deadline, pixels: int, colors: Optional[int]) -> Optional[int]:
+    """
+    Cap the palette at ``DEGRADED_COLORS`` if the deadline is at risk.
+    """
+    if (colors is None or colors > DEGRADED_COLORS) and deadline.should_degrade(
+        estimate_vectorize_seconds(pixels, colors)
+    ):
+        deadline.degradations.append(f"colors={DEGRADED_COLORS}")
+        return DEGRADED_COLORS
+    return colors
+
+
+def _degrade_trace_size(
+    deadline: Deadline, width: int, height: int, colors: Optional[int]
+) -> Tuple[int, int]:
+    """
+    Lower the working resolution until the estimate fits the time left,
+    but not below ``MIN_DEGRADED_PIXELS``.
+    """
+    pixels = width * height
+    estimate = estimate_vectorize_seconds(pixels, colors)
+    if pixels <= MIN_DEGRADED_PIXELS or not deadline.should_degrade(estimate):
+        return width, height
+    budget = max(MIN_DEGRADED_PIXELS, int(pixels * max(deadline.remaining(), 0.0) / estimate))
+    width, height = trace_size_for(width, height, budget)
+    deadline.degradations.append(f"trace_size={width}x{height}")
+    return width, height
+
+
+def _trace_clusters(
+    clusters: List[dict], detail: float, deadline: Deadline
+) -> List[Tuple[str, Tuple[int, int, int]]]:
+    """
+    Trace each cluster mask to SVG paths at the given detail level.
+    """
+    paths = []
+    for cluster in clusters:
+        deadline.check("trace layer")
+        path_list = trace_mask(cluster["mask"], prefer_potrace=True, detail=detail)
+
+        for path_str in path_list:
+            if path_str:
+                paths.append((path_str, cluster["color"]))
+    return paths
+
+
+def _trace_shared(
+    label_image: np.ndarray, clusters: List[dict], detail: float
+) -> List[Tuple[str, Tuple[int, int, int]]]:
+    """
+    Trace the clusters from the label image in one pass with shared borders.
+    """
+    traced = trace_label_image(
+        label_image, detail=detail, labels=[c["index"] for c in clusters]
+    )
+    return [
+        (traced[c["index"]], c["color"]) for c in clusters if traced.get(c["index"])
+    ]
+
+
+def _detail_levels(detail: float, max_bytes: Optional[int]) -> List[float]:
+    """
+    Detail levels to try in order: just ``detail`` without a size budget,
+    otherwise ``detail`` followed by coarser steps down to 0.
+    """
+    if max_bytes is None:
+        return [detail]
+    return [detail] + [level for level in (0.35, 0.2, 0.0) if level < detail]
+
+
+def _determine_scale_factor(
+    paths: List[Tuple[str, Tuple[int, int, int]]], width: int, height: int
+) -> float:
+    """
+    Infer a scale factor for the SVG viewport based on path coordinates.
+    """
+    if not paths:
+        return 1.0
+
+    number_pattern = re.compile(r"-?\d+(?:\.\d+)?")
+    max_coord = 0.0
+    for path_str, _ in paths:
+        for match in number_pattern.findall(path_str):
+            try:
+                value = abs(float(match))
+            except ValueError:
+                continue
+            max_coord = max(max_coord, value)
+
+    expected = max(width, height, 1)
+    ratio = max_coord / expected
+    if ratio <= 1.2:
+        return 1.0
+
+    return 10.0
@@ -0,0 +1,237 @@
+"""
+Potrace backends: in-process bindings when installed, otherwise the CLI.
+
+The bindings (``pypotrace``, imported as ``potrace``) trace a mask without
+leaving the process. The command-line tool is fed a packed PBM over stdin and
+answers on stdout, so no temporary files are involved; its health is tracked
+and a failing binary is taken out of rotation and re-probed later instead of
+being retried on every layer.
+"""
+import re
+import shutil
+import subprocess
+import threading
+import time
+from functools import lru_cache
+from typing import List, Optional
+
+import numpy as np
+
+from src.core.simplify import DEFAULT_DETAIL, encode_segments
+
+_PATH_PATTERN = re.compile(r'<path[^>]*d="([^"]+)"')
+
+# Potrace's own default for discarding tiny regions
+POTRACE_TURDSIZE = 2
+
+
+def potrace_params(detail: Optional[float]) -> dict:
+    """
+    Map a detail level to Potrace tracing parameters.
+
+    Lower detail raises the curve optimization tolerance (fewer, longer
+    curves); the top of the range disables curve optimization entirely.
+
+    Returns:
+        Dict with ``opticurve`` and ``opttolerance``; empty for Potrace defaults
+    """
+    if detail is None:
+        return {}
+    return {
+        "opticurve": detail < 0.9,
+        "opttolerance": 0.2 + max(0.0, DEFAULT_DETAIL - detail) * 1.6,
+    }
+
+
+def encode_pbm(mask: np.ndarray) -> bytes:
+    """
+    Encode a mask as binary PBM (P4); non-zero pixels are foreground.
+
+    Args:
+        mask: Binary mask (H, W)
+
+    Returns:
+        PBM file contents
+    """
+    height, width = mask.shape
+    bits = np.packbits(mask > 0, axis=1)
+    return f"P4\n{width} {height}\n".encode() + bits.tobytes()
+
+
+@lru_cache(maxsize=1)
+def load_bindings():
+    """Return the Potrace bindings module, or None if not installed."""
+    try:
+        import potrace  # type: ignore[import-not-found]
+    except ImportError:
+        return None
+    return potrace if hasattr(potrace, "Bitmap") else None
+
+
+def _xy(point) -> np.ndarray:
+    if hasattr(point, "x"):
+        return np.array([point.x, point.y], dtype=np.float64)
+    return np.array([point[0], point[1]], dtype=np.float64)
+
+
+def trace_with_bindings(bindings, mask: np.ndarray, detail: Optional[float] = None) -> List[str]:
+    """
+    Trace a mask in-process with the Potrace bindings.
+
+    Bitmap rows map to y, so coordinates are flipped to the y-up pixel-corner
+    convention used by the other backends. All curves go into one path so
+    holes cut out of their outlines under the nonzero fill rule.
+
+    Args:
+        bindings: The ``potrace`` module
+        mask: Binary mask (0 or 255)
+        detail: Optional detail level in [0, 1]
+
+    Returns:
+        List with one SVG path string, or empty if nothing was traced
+    """
+    height = mask.shape[0]
+    flip = np.array([1.0, -1.0])
+    offset = np.array([0.0, float(height)])
+
+    def convert(point) -> np.ndarray:
+        return _xy(point) * flip + offset
+
+    path = bindings.Bitmap(mask > 0).trace(turdsize=POTRACE_TURDSIZE, **potrace_params(detail))
+
+    parts = []
+    for curve in getattr(path, "curves", path):
+        start = convert(curve.start_point)
+        segments = []
+        for segment in curve.segments:
+            end = convert(segment.end_point)
+            if segment.is_corner:
+                segments.append(("L", convert(segment.c)))
+                segments.append(("L", end))
+            else:
+                segments.append(("C", np.vstack([convert(segment.c1), convert(segment.c2), end])))
+        # The closing "z" already returns to the start
+        if segments and segments[-1][0] == "L" and np.allclose(segments[-1][1], start):
+            segments.pop()
+        if segments:
+            parts.append(encode_segments(start, segments, precision=1))
+
+    return ["".join(parts)] if parts else []
+
+
+class PotraceCLI:
+    """
+    The ``potrace`` executable with health tracking.
+
+    After ``max_failures`` consecutive failures (crash, timeout, garbage
+    output) the backend reports itself unavailable for ``retry_interval``
+    seconds; the next use after that first traces a probe bitmap and only
+    returns to service if the probe succeeds.
+
+    Args:
+        executable: Command name or path
+        timeout: Per-call timeout in seconds
+        max_failures: Consecutive failures before the backend is disabled
+        retry_interval: Seconds before a disabled backend is probed again
+    """
+
+    def __init__(
+        self,
+        executable: str = "potrace",
+        timeout: float = 30.0,
+        max_failures: int = 3,
+        retry_interval: float = 30.0,
+    ):
+        self.executable = executable
+        self.timeout = timeout
+        self.max_failures = max_failures
+        self.retry_interval = retry_interval
+        self._path: Optional[str] = None
+        self._failures = 0
+        self._disabled_until = 0.0
+        self._lock = threading.Lock()
+
+    def _resolve(self) -> Optional[str]:
+        if self._path is None:
+            self._path = shutil.which(self.executable)
+            if self._path is None:
+                # Not installed: do not look it up again on every layer
+                self._disabled_until = time.monotonic() + self.retry_interval
+        return self._path
+
+    def available(self) -> bool:
+        """Whether the executable exists and is not disabled."""
+        with self._lock:
+            if time.monotonic() < self._disabled_until:
+                return False
+            if self._resolve() is None:
+                return False
+            needs_probe = self._failures >= self.max_failures
+
+        if needs_probe:
+            probe = np.zeros((8, 8), dtype=np.uint8)
+            probe[2:6, 2:6] = 255
+            return self.trace(probe) is not None
+        return True
+
+    def _record(self, ok: bool) -> None:
+        with self._lock:
+            if ok:
+                self._failures = 0
+                return
+            self._failures += 1
+            if self._failures >= self.max_failures:
+                self._disabled_until = time.monotonic() + self.retry_interval
+
+    def reset(self) -> None:
+        """Forget the resolved path and failure history."""
+        with self._lock:
+            self._path = None
+            self._failures = 0
+            self._disabled_until = 0.0
+
+    def trace(self, mask: np.ndarray, detail: Optional[float] = None) -> Optional[List[str]]:
+        """
+        Trace a mask with the executable.
+
+        Args:
+            mask: Binary mask (0 or 255)
+            detail: Optional detail level in [0, 1]
+
+        Returns:
+            SVG path strings in Potrace's y-up coordinates scaled by 10, or
+            None if the call failed
+        """
+        path = self._path or self._resolve()
+        if path is None:
+            return None
+
+        options = ["-s"]
+        params = potrace_params(detail)
+        if params:
+            options += ["-O", f"{params['opttolerance']:.2f}"]
+            if not params["opticurve"]:
+                options.append("-n")
+
+        try:
+            result = subprocess.run(
+                [path, *options, "-o", "-", "-"],
+                input=encode_pbm(mask),
+                check=True,
+                capture_output=True,
+                timeout=self.timeout,
+            )
+            svg_content = result.stdout.decode("utf-8")
+        except (subprocess.SubprocessError, OSError, UnicodeDecodeError):
+            self._record(False)
+            return None
+
+        if "<svg" not in svg_content:
+            self._record(False)
+            return None
+
+        self._record(True)
+        return _PATH_PATTERN.findall(svg_content)
+
+
+potrace_cli = PotraceCLI()
@@ -0,0 +1,48 @@
+"""
+Edge-preserving smoothing applied before color quantization.
+
+Anti-aliasing and compression noise spread an image over many
+barely-different colors. Smoothing flat areas while keeping edges sharp
+shrinks the color histogram K-means works on and leaves fewer ragged
+single-pixel steps along region borders for the tracer.
+"""
+from typing import Optional
+
+import numpy as np
+
+from src.core.buffers import Arena
+
+PREFILTERS = ("none", "median", "bilateral", "meanshift")
+
+
+def prefilter_image(image: np.ndarray, method: str, arena: Optional[Arena] = None) -> np.ndarray:
+    """
+    Smooth an image while preserving edges.
+
+    Methods:
+        - ``median``: 3x3 median; removes isolated noisy pixels, cheapest
+        - ``bilateral``: 5px bilateral filter; averages only similar colors
+        - ``meanshift``: mean-shift segmentation; flattens regions the most
+          and is the slowest
+
+    Args:
+        image: Input image in BGR format (H, W, 3)
+        method: One of ``PREFILTERS``; "none" returns the input unchanged
+        arena: Optional buffer arena to take the output from
+
+    Returns:
+        Filtered image (H, W, 3)
+    """
+    if method == "none":
+        return image
+
+    import cv2
+
+    dst = arena.empty(image.shape, image.dtype) if arena is not None else None
+    if method == "median":
+        return cv2.medianBlur(image, 3, dst=dst)
+    if method == "bilateral":
+        return cv2.bilateralFilter(image, 5, 25, 5, dst=dst)
+    if method == "meanshift":
+        return cv2.pyrMeanShiftFiltering(image, 5, 16, dst=dst)
+    raise ValueError(f"Unknown prefilter: {method}")
@@ -0,0 +1,348 @@
+"""
+On-demand profiling of individual production requests.
+
+Profiling is off unless ``EKTOOLS_PROFILE_TOKEN`` is set; the middleware is
+then installed and a request carrying ``X-Profile-Token: <token>`` (or one
+picked by ``profile_sampler`` after an admin armed it) is profiled. Nothing
+runs per request otherwise. The pipeline work, which runs in the thread
+pool, is wrapped by ``profiled``:
+
+- ``cprofile`` mode runs it under ``cProfile`` and stores the pstats report;
+  one request at a time per process, others are sampled instead
+- ``sample`` mode samples the worker thread's stack every millisecond and
+  stores collapsed stacks (``frame;frame;frame count`` lines), the input
+  format of flamegraph.pl and speedscope
+
+Reports go to ``EKTOOLS_PROFILE_DIR`` (default: a directory under the system
+temp dir), shared by all workers and capped at ``EKTOOLS_PROFILE_KEEP`` files.
+"""
+import contextvars
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+PROFILE_MODES = ("cprofile", "sample")
+
+# Seconds between stack samples in "sample" mode
+SAMPLE_INTERVAL = 0.001
+
+# Rows of the pstats report kept per profile
+PSTATS_ROWS = 60
+
+_EXTENSIONS = {"cprofile": ".pstats.txt", "sample": ".collapsed"}
+
+
+def profile_token() -> Optional[str]:
+    """Shared secret enabling profiling, or None when profiling is off."""
+    return os.environ.get("EKTOOLS_PROFILE_TOKEN") or None
+
+
+def check_token(token: Optional[str]) -> bool:
+    """Whether ``token`` matches the configured profiling token."""
+    expected = profile_token()
+    return bool(expected and token) and hmac.compare_digest(token, expected)
+
+
+class _StackSampler:
+    """Collects collapsed stacks of one thread on a background thread."""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def __enter__(self) -> "_StackSampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+
+# cProfile hooks the whole interpreter: from Python 3.12 only one profiler can
+# be active per process, and it records every thread. Requests take turns.
+_cprofile_lock = threading.Lock()
+
+
+class RequestProfile:
+    """
+    Profile of one request, filled in by every ``profiled`` call it makes.
+
+    A ``cprofile`` call that finds another request's cProfile running (or
+    cannot start one) is stack-sampled instead; the report header says so.
+    Profiling never fails the profiled call.
+
+    Args:
+        mode: One of ``PROFILE_MODES``
+        label: Request description stored in the report header
+    """
+
+    def __init__(self, mode: str, label: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.mode = mode
+        self.label = label
+        self.started = time.time()
+        self.notes: List[str] = []
+        self._lock = threading.Lock()
+        self._stats: Optional[pstats.Stats] = None
+        self._stacks: Counter = Counter()
+
+    def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Call ``fn`` under this profile's profiler."""
+        if self.mode == "sample":
+            return self._run_sampled(fn, *args, **kwargs)
+        if not _cprofile_lock.acquire(blocking=False):
+            self._note("cprofile busy with another request; sampled instead")
+            return self._run_sampled(fn, *args, **kwargs)
+        try:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except Exception as e:  # noqa: BLE001 - e.g. another profiling tool is active
+                self._note(f"cprofile unavailable ({e}); sampled instead")
+                return self._run_sampled(fn, *args, **kwargs)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._add_stats(profiler)
+        finally:
+            _cprofile_lock.release()
+
+    def _run_sampled(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        sampler = _StackSampler(threading.get_ident())
+        try:
+            sampler.__enter__()
+        except Exception as e:  # noqa: BLE001 - e.g. no thread could be started
+            self._note(f"sampler unavailable ({e}); not profiled")
+            return fn(*args, **kwargs)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            sampler.__exit__(None, None, None)
+            # The sampler thread has been joined by now
+            with self._lock:
+                self._stacks.update(sampler.stacks)
+
+    def _add_stats(self, profiler: cProfile.Profile) -> None:
+        try:
+            profiler.disable()
+            with self._lock:
+                if self._stats is None:
+                    self._stats = pstats.Stats(profiler)
+                else:
+                    self._stats.add(profiler)
+        except Exception as e:  # noqa: BLE001 - e.g. nothing was recorded
+            self._note(f"cprofile stats dropped ({e})")
+
+    def _note(self, note: str) -> None:
+        with self._lock:
+            if note not in self.notes:
+                self.notes.append(note)
+
+    def report(self, duration: float) -> str:
+        """Text report: a header, then pstats output and/or collapsed stacks."""
+        lines = [f"# {self.label}", f"# mode={self.mode} wall={duration * 1000:.1f}ms"]
+        if self.mode == "cprofile" and sys.version_info >= (3, 12):
+            lines.append("# note: cprofile records every thread in the process")
+        lines += [f"# note: {note}" for note in self.notes]
+        text = "\n".join(lines) + "\n"
+        if self._stats is not None:
+            out = io.StringIO()
+            self._stats.stream = out
+            self._stats.sort_stats("cumulative").print_stats(PSTATS_ROWS)
+            text += out.getvalue()
+        elif self.mode == "cprofile" and not self._stacks:
+            text += "# no pipeline work was profiled\n"
+        text += "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common())
+        return text
+
+
+_active: contextvars.ContextVar[Optional[RequestProfile]] = contextvars.ContextVar(
+    "ektools_profile", default=None
+)
+
+
+def profiled(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    ``fn`` wrapped to run under the current request's profile, if any.
+
+    Call it in the request's context (before handing work to the thread
+    pool); without an active profile ``fn`` itself is returned.
+    """
+    profile = _active.get()
+    if profile is None:
+        return fn
+
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return profile.run(fn, *args, **kwargs)
+
+    return wrapper
+
+
+class ProfileStore:
+    """
+    Directory of profile reports, newest ``keep`` kept.
+
+    Args:
+        directory: Report directory; None reads ``EKTOOLS_PROFILE_DIR``
+        keep: Reports kept; None reads ``EKTOOLS_PROFILE_KEEP`` (default 100)
+    """
+
+    def __init__(self, directory: Optional[str] = None, keep: Optional[int] = None):
+        if directory is None:
+            directory = os.environ.get(
+                "EKTOOLS_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "ektools-profiles")
+            )
+        if keep is None:
+            keep = int(os.environ.get("EKTOOLS_PROFILE_KEEP", 100))
+        self.directory = directory
+        self.keep = keep
+
+    def save(self, profile: RequestProfile, duration: float) -> str:
+        """Write a report and drop the oldest beyond ``keep``; returns its path."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, profile.id + _EXTENSIONS[profile.mode])
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(profile.report(duration))
+        for entry in self.list()[self.keep :]:
+            try:
+                os.remove(os.path.join(self.directory, entry["file"]))
+            except OSError:
+                pass
+        return path
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Stored reports, newest first."""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        entries = []
+        for name in names:
+            profile_id, _, extension = name.partition(".")
+            if "." + extension not in _EXTENSIONS.values():
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append(
+                {"id": profile_id, "file": name, "created": stat.st_mtime, "bytes": stat.st_size}
+            )
+        entries.sort(key=lambda entry: entry["created"], reverse=True)
+        return entries
+
+    def read(self, profile_id: str) -> Optional[str]:
+        """Report text for an id, or None."""
+        for entry in self.list():
+            if entry["id"] == profile_id:
+                with open(os.path.join(self.directory, entry["file"]), encoding="utf-8") as f:
+                    return f.read()
+        return None
+
+
+class ProfileSampler:
+    """
+    Profiles up to ``remaining`` randomly chosen requests in this worker.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.remaining = 0
+        self.rate = 0.0
+        self.mode = "sample"
+
+    def arm(self, count: int, rate: float, mode: str) -> None:
+        """Profile the next ``count`` requests picked with probability ``rate``."""
+        with self._lock:
+            self.remaining = count
+            self.rate = rate
+            self.mode = mode
+
+    def pick(self) -> Optional[str]:
+        """Mode to profile the current request with, or None."""
+        if not self.remaining:
+            return None
+        with self._lock:
+            if self.remaining and random.random() < self.rate:
+                self.remaining -= 1
+                return self.mode
+        return None
+
+
+profile_store = ProfileStore()
+profile_sampler = ProfileSampler()
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware starting request profiles.
+
+    A request is profiled when it carries a valid ``X-Profile-Token``
+    (``X-Profile`` picks the mode, default ``cprofile``) or when
+    ``profile_sampler`` picks it. The response gets ``X-Profile-Id`` and the
+    report is saved to ``profile_store`` once the response is sent. Admin
+    paths are never profiled.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith("/admin"):
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        mode = None
+        if check_token(headers.get("x-profile-token")):
+            mode = headers.get("x-profile", "cprofile").lower()
+            if mode not in PROFILE_MODES:
+                mode = "cprofile"
+        else:
+            mode = profile_sampler.pick()
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(mode, f"{scope['method']} {scope['path']}")
+
+        async def send_with_id(message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(raw=message["headers"])["X-Profile-Id"] = profile.id
+            await send(message)
+
+        token = _active.set(profile)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _active.reset(token)
+            await run_in_threadpool(profile_store.save, profile, time.perf_counter() - start)
@@ -2,68 +2,238 @@
 Color quantization using K-means clustering.
 """
 import numpy as np
-from sklearn.cluster import KMeans
-from typing import Tuple, List
+from typing import Tuple, List, Optional
 
+from src.core.buffers import Arena, allocator
+from src.core.color_lut import DEFAULT_LUT_BITS, cell_histogram, cell_index, lut_cache
 
-def quantize_colors(image: np.ndarray, n_colors: int) -> Tuple[np.ndarray, np.ndarray, List[Tuple[int, int, int]]]:
+# Target RMS color error (Euclidean RGB distance) for automatic palette sizing
+AUTO_COLOR_ERROR = 12.0
+
+# Upper bound on histogram entries fed to K-means when sizing the palette
+MAX_HISTOGRAM_COLORS = 32768
+
+
+def quantize_colors(
+    image: np.ndarray,
+    n_colors: int,
+    init: Optional[np.ndarray] = None,
+    quantized: bool = True,
+    arena: Optional[Arena] = None,
+) -> Tuple[Optional[np.ndarray], np.ndarray, List[Tuple[int, int, int]]]:
     """
     Quantize image colors using K-means clustering.
     
+    K-means runs over the mean colors of the occupied cells of a 64^3 RGB
+    grid, weighted by pixel count, instead of every pixel. Pixels are then
+    labeled through a cached lookup table for the fitted palette, with
+    exact refinement, so labels are the true nearest palette colors.
+    
     Args:
         image: Input image in BGR format (H, W, 3)
         n_colors: Number of color clusters (2-20)
+        init: Optional (n_colors, 3) RGB centroids to warm-start from; a single
+            K-means run is made from them instead of 10 random restarts
+        quantized: Whether to build the quantized image; callers that only
+            need labels pass False and get None in its place
+        arena: Optional buffer arena to take the cell index and labels from
         
     Returns:
         Tuple of:
-        - Quantized image (same shape as input)
+        - Quantized image (same shape as input), or None
         - Label image (H, W) with cluster indices
-        - List of RGB color tuples (centroids)
+        - List of RGB color tuples (centroids); fewer than ``n_colors``
+          when the image has fewer distinct colors
     """
-    # Reshape image to (N, 3) where N = H * W
     h, w, c = image.shape
+    index = cell_index(image, DEFAULT_LUT_BITS, arena=arena)
+    samples, weights = cell_histogram(image, index, DEFAULT_LUT_BITS)
+    if len(samples) < n_colors:
+        # Too few cells to fit: fall back to the exact distinct colors
+        colors, counts, _ = color_histogram(image)
+        samples, weights = colors.astype(np.float64), counts.astype(np.float64)
+    
+    if len(samples) <= n_colors:
+        # Every color is its own centroid; the palette is just these colors
+        centers = samples
+    else:
+        from sklearn.cluster import KMeans
+        if init is not None:
+            kmeans = KMeans(n_clusters=n_colors, init=init, n_init=1, random_state=42)
+        else:
+            kmeans = KMeans(n_clusters=n_colors, random_state=42, n_init=10)
+        kmeans.fit(samples, sample_weight=weights)
+        centers = kmeans.cluster_centers_
+    
+    # Get cluster centers (RGB)
+    centers_rgb = centers.astype(np.uint8)
+    
+    # Nearest palette color per pixel through the palette's lookup table
+    labels = lut_cache.get(centers_rgb).assign(
+        image, index=index, out=allocator(arena)(h * w, np.int32)
+    )
+    label_image = labels.reshape(h, w)
+    
+    # Reconstruct quantized image (BGR)
+    quantized_image = centers_rgb[:, ::-1][label_image] if quantized else None
+    
+    # Convert centers to list of RGB tuples
+    color_list = [tuple(int(v) for v in center) for center in centers_rgb]
+    
+    return quantized_image, label_image, color_list
+
+
+def color_histogram(image: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Build the distinct-color histogram of an image.
+    
+    Args:
+        image: Input image in BGR format (H, W, 3)
+        
+    Returns:
+        Tuple of:
+        - Distinct RGB colors (M, 3) as uint8
+        - Pixel count for each distinct color (M,)
+        - Index into the distinct colors for every pixel (H * W,)
+    """
     pixels = image.reshape(-1, 3)
     
-    # Convert BGR to RGB for better color representation
-    pixels_rgb = pixels[:, ::-1]
+    # Pack BGR into a single 24-bit RGB key per pixel
+    packed = (
+        (pixels[:, 2].astype(np.uint32) << 16)
+        | (pixels[:, 1].astype(np.uint32) << 8)
+        | pixels[:, 0].astype(np.uint32)
+    )
+    keys, inverse, counts = np.unique(packed, return_inverse=True, return_counts=True)
     
-    # Apply K-means
-    kmeans = KMeans(n_clusters=n_colors, random_state=42, n_init=10)
-    labels = kmeans.fit_predict(pixels_rgb)
+    colors = np.stack(
+        [(keys >> 16) & 0xFF, (keys >> 8) & 0xFF, keys & 0xFF], axis=1
+    ).astype(np.uint8)
     
-    # Get cluster centers (RGB)
-    centers_rgb = kmeans.cluster_centers_.astype(np.uint8)
+    return colors, counts, inverse.reshape(-1)
+
+
+def _coarsen_histogram(
+    colors: np.ndarray, counts: np.ndarray, max_colors: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Merge histogram entries into coarser RGB bins until at most ``max_colors`` remain.
     
-    # Convert centers back to BGR for image reconstruction
-    centers_bgr = centers_rgb[:, ::-1]
+    Each bin is represented by the count-weighted mean of its member colors.
+    """
+    if len(colors) <= max_colors:
+        return colors.astype(np.float64), counts.astype(np.float64)
     
-    # Reconstruct quantized image
-    quantized_pixels = centers_bgr[labels]
-    quantized_image = quantized_pixels.reshape(h, w, c)
+    for shift in range(1, 8):
+        binned = colors >> shift
+        keys = (
+            (binned[:, 0].astype(np.uint32) << 16)
+            | (binned[:, 1].astype(np.uint32) << 8)
+            | binned[:, 2].astype(np.uint32)
+        )
+        bin_keys, bin_index = np.unique(keys, return_inverse=True)
+        if len(bin_keys) <= max_colors:
+            break
     
-    # Reshape labels to image shape
-    label_image = labels.reshape(h, w)
+    bin_index = bin_index.reshape(-1)
+    weights = np.bincount(bin_index, weights=counts)
+    means = np.stack(
+        [np.bincount(bin_index, weights=colors[:, ch] * counts) for ch in range(3)],
+        axis=1,
+    ) / weights[:, None]
+    return means, weights
+
+
+def quantize_colors_auto(
+    image: np.ndarray,
+    max_colors: int = 20,
+    max_error: float = AUTO_COLOR_ERROR,
+    min_colors: int = 2,
+    quantized: bool = True,
+    arena: Optional[Arena] = None,
+) -> Tuple[Optional[np.ndarray], np.ndarray, List[Tuple[int, int, int]]]:
+    """
+    Quantize image colors with the smallest palette that meets an error target.
     
-    # Convert centers to list of RGB tuples
-    color_list = [tuple(center) for center in centers_rgb]
+    K-means runs over the distinct-color histogram (weighted by pixel count)
+    instead of every pixel. Each step adds one centroid at the color with the
+    largest error contribution and warm-starts from the previous centroids,
+    stopping as soon as the RMS color error drops to ``max_error``.
+    
+    Args:
+        image: Input image in BGR format (H, W, 3)
+        max_colors: Largest palette to consider
+        max_error: Target RMS distance between pixels and their centroid (RGB units)
+        min_colors: Smallest palette to consider
+        quantized: Whether to build the quantized image (see ``quantize_colors``)
+        arena: Optional buffer arena to take the label image from
+        
+    Returns:
+        Same tuple as ``quantize_colors``; the palette size is ``len(color_list)``
+    """
+    h, w = image.shape[:2]
+    colors, counts, inverse = color_histogram(image)
+    
+    if len(colors) <= min_colors:
+        # Few enough distinct colors to use them verbatim
+        centers = colors.astype(np.float64)
+        color_labels = np.arange(len(colors), dtype=np.int32)
+    else:
+        samples, weights = _coarsen_histogram(colors, counts, MAX_HISTOGRAM_COLORS)
+        total = weights.sum()
+        
+        from sklearn.cluster import KMeans
+        n_clusters = min(min_colors, len(samples))
+        init = "k-means++"
+        while True:
+            kmeans = KMeans(n_clusters=n_clusters, init=init, n_init=1, random_state=42)
+            kmeans.fit(samples, sample_weight=weights)
+            rms_error = float(np.sqrt(kmeans.inertia_ / total))
+            
+            if rms_error <= max_error or n_clusters >= min(max_colors, len(samples)):
+                break
+            
+            # Warm start: keep the fitted centroids and seed the next one at the
+            # histogram entry contributing the most squared error
+            distances = kmeans.transform(samples).min(axis=1)
+            worst = int(np.argmax(weights * distances**2))
+            init = np.vstack([kmeans.cluster_centers_, samples[worst]])
+            n_clusters += 1
+        
+        centers = kmeans.cluster_centers_
+        # Assign every exact distinct color
+        color_labels = kmeans.predict(colors.astype(np.float64)).astype(np.int32)
+    
+    # Broadcast to pixels ("clip" lets np.take write straight into ``out``)
+    labels = allocator(arena)(h * w, np.int32)
+    label_image = np.take(color_labels, inverse, out=labels, mode="clip").reshape(h, w)
+    
+    centers_rgb = centers.astype(np.uint8)
+    quantized_image = centers_rgb[:, ::-1][label_image] if quantized else None
+    color_list = [tuple(int(v) for v in center) for center in centers_rgb]
     
     return quantized_image, label_image, color_list
 
 
-def get_color_masks(label_image: np.ndarray, n_colors: int) -> List[np.ndarray]:
+def get_color_masks(
+    label_image: np.ndarray, n_colors: int, arena: Optional[Arena] = None
+) -> List[np.ndarray]:
     """
     Generate binary masks for each color cluster.
     
     Args:
         label_image: Image with cluster labels (H, W)
         n_colors: Number of clusters
+        arena: Optional buffer arena to take the masks from
         
     Returns:
         List of binary masks, one per color
     """
+    empty = allocator(arena)
     masks = []
     for i in range(n_colors):
-        mask = (label_image == i).astype(np.uint8) * 255
+        mask = empty(label_image.shape, np.uint8)
+        np.equal(label_image, i, out=mask.view(bool))
+        mask *= 255
         masks.append(mask)
     return masks
-
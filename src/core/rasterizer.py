@@ -1,29 +1,344 @@
 """
 SVG to PNG rasterization using CairoSVG.
+
+CairoSVG renders into a single surface of whatever size the document
+declares, 4 bytes per pixel, and the PNG writer then needs the whole
+surface at once. The output size is therefore estimated from the root
+element before anything is drawn: documents over the pixel budget are
+rejected, and large ones are rendered in horizontal strips that are
+encoded as they are produced, so peak memory is bounded by the strip size
+rather than by the output size.
 """
-import io
-import cairosvg
-from typing import Optional
+import os
+import re
+from typing import Iterator, Optional, Tuple
+from xml.etree.ElementTree import ParseError, XMLPullParser
+
+import numpy as np
+
+from src.core.sandbox import RenderSandbox
+from src.core.svg_scan import check_svg_complexity
+from src.utils.image_io import PNGStreamEncoder
+
+# Largest output rendered (EKTOOLS_RASTER_MAX_PIXELS overrides)
+DEFAULT_MAX_PIXELS = 100_000_000
+
+# Outputs up to this size render in one surface; larger ones in strips of
+# about this many pixels (64 MB of ARGB each)
+STRIP_PIXELS = 16_000_000
+
+MAX_PIXELS = int(os.environ.get("EKTOOLS_RASTER_MAX_PIXELS", DEFAULT_MAX_PIXELS))
+
+# CSS pixels per unit at CairoSVG's defaults (96 dpi, 12pt = 16px font size)
+_UNITS = {
+    "": 1.0,
+    "px": 1.0,
+    "in": 96.0,
+    "cm": 96 / 2.54,
+    "mm": 96 / 25.4,
+    "pt": 96 / 72,
+    "pc": 16.0,
+    "em": 16.0,
+    "ex": 8.0,
+    "ch": 8.0,
+}
+_LENGTH = re.compile(r"^\s*([+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)\s*([a-zA-Z%]*)\s*$")
+
+
+class RenderTooLarge(ValueError):
+    """The output would exceed the rasterizer's pixel budget."""
+
+
+class RenderSizeMismatch(ValueError):
+    """CairoSVG sized the output differently from the streamed PNG header."""
+
+
+def _length(value: Optional[str]) -> float:
+    """
+    Resolve a root ``width``/``height`` attribute to pixels.
+
+    Percentages and unknown units resolve to 0, like CairoSVG does for the
+    root element, so the viewBox size is used instead.
+    """
+    match = _LENGTH.match(value or "")
+    if not match:
+        return 0.0
+    number, unit = match.groups()
+    return float(number) * _UNITS.get(unit.lower(), 0.0)
+
+
+def svg_output_size(
+    svg_content: bytes, width: Optional[int] = None, height: Optional[int] = None
+) -> Tuple[int, int]:
+    """
+    Estimate the PNG size CairoSVG will render, without rendering.
+
+    Only the document up to the root start tag is parsed.
+
+    Args:
+        svg_content: SVG file content as bytes
+        width: Optional output width, as passed to ``svg_to_png``
+        height: Optional output height, as passed to ``svg_to_png``
+
+    Returns:
+        (width, height) in pixels; 0 where the document does not define a size
+
+    Raises:
+        ValueError: If the content is not XML with an ``<svg>`` root
+    """
+    parser = XMLPullParser(events=("start",))
+    root = None
+    try:
+        for offset in range(0, len(svg_content), 65536):
+            parser.feed(svg_content[offset : offset + 65536])
+            for _, root in parser.read_events():
+                break
+            if root is not None:
+                break
+    except ParseError as e:
+        raise ValueError(f"Invalid SVG: {e}") from e
+    if root is None or root.tag.rsplit("}", 1)[-1] != "svg":
+        raise ValueError("Invalid SVG: root element is not <svg>")
+
+    doc_width = _length(root.get("width"))
+    doc_height = _length(root.get("height"))
+    viewbox = root.get("viewBox")
+    if viewbox:
+        try:
+            box = [float(v) for v in re.split(r"[\s,]+", viewbox.strip())]
+        except ValueError:
+            box = []
+        if len(box) == 4:
+            doc_width = doc_width or box[2]
+            doc_height = doc_height or box[3]
+
+    # Same precedence and aspect handling as cairosvg.surface.Surface
+    if width and height:
+        doc_width, doc_height = width, height
+    elif width:
+        if doc_width:
+            doc_height *= width / doc_width
+        doc_width = width
+    elif height:
+        if doc_height:
+            doc_width *= height / doc_height
+        doc_height = height
+
+    return int(round(doc_width)), int(round(doc_height))
+
+
+def check_output_size(
+    svg_content: bytes,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    max_pixels: Optional[int] = None,
+) -> Tuple[int, int]:
+    """
+    Estimate the output size and enforce the pixel budget.
+
+    Args:
+        svg_content: SVG file content as bytes
+        width: Optional output width
+        height: Optional output height
+        max_pixels: Pixel budget (None uses ``MAX_PIXELS``)
+
+    Returns:
+        (width, height) of the output
+
+    Raises:
+        RenderTooLarge: If width * height exceeds the budget
+        ValueError: If the content is not an SVG document
+    """
+    if max_pixels is None:
+        max_pixels = MAX_PIXELS
+    out_width, out_height = svg_output_size(svg_content, width, height)
+    if out_width * out_height > max_pixels:
+        raise RenderTooLarge(
+            f"Output of {out_width}x{out_height} pixels exceeds the "
+            f"{max_pixels} pixel budget"
+        )
+    return out_width, out_height
+
 
+def svg_to_png_stream(
+    svg_content: bytes,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    max_pixels: Optional[int] = None,
+) -> Iterator[bytes]:
+    """
+    Convert SVG content to PNG, yielding the file in pieces.
+
+    Outputs up to ``STRIP_PIXELS`` render in one piece. Larger ones render
+    strip by strip into a streaming PNG encoder; only one strip surface is
+    alive at a time. The size and complexity checks, and for strips the
+    first strip, run before the first piece is yielded.
 
-def svg_to_png(svg_content: bytes, width: Optional[int] = None, height: Optional[int] = None) -> bytes:
+    Args:
+        svg_content: SVG file content as bytes
+        width: Optional output width (if None, uses SVG's natural size)
+        height: Optional output height (if None, uses SVG's natural size)
+        max_pixels: Pixel budget (None uses ``MAX_PIXELS``)
+
+    Returns:
+        Iterator over PNG bytes
+
+    Raises:
+        RenderTooLarge: If the output exceeds the pixel budget
+        SvgTooComplex: If the document exceeds a complexity budget
+        RenderSizeMismatch: If strips are rendered and CairoSVG sizes the
+            output differently from the estimate
+    """
+    out_width, out_height = check_output_size(svg_content, width, height, max_pixels)
+    check_svg_complexity(svg_content)
+    if out_width * out_height <= STRIP_PIXELS:
+        return iter([_render_whole(svg_content, width, height)])
+    return _render_strips(svg_content, width, height, out_width, out_height)
+
+
+def svg_to_png(
+    svg_content: bytes,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    max_pixels: Optional[int] = None,
+) -> bytes:
     """
     Convert SVG content to PNG bytes.
-    
+
     Args:
         svg_content: SVG file content as bytes
         width: Optional output width (if None, uses SVG's natural size)
         height: Optional output height (if None, uses SVG's natural size)
-        
+        max_pixels: Pixel budget (None uses ``MAX_PIXELS``)
+
     Returns:
         PNG image bytes
+
+    Raises:
+        RenderTooLarge: If the output exceeds the pixel budget
+        SvgTooComplex: If the document exceeds a complexity budget
     """
-    # Convert SVG to PNG
-    png_bytes = cairosvg.svg2png(
-        bytestring=svg_content,
-        output_width=width,
-        output_height=height
+    return b"".join(svg_to_png_stream(svg_content, width, height, max_pixels))
+
+
+def _render_whole(svg_content: bytes, width: Optional[int], height: Optional[int]) -> bytes:
+    import cairosvg
+
+    return cairosvg.svg2png(
+        bytestring=svg_content, output_width=width, output_height=height
     )
-    
-    return png_bytes
 
+
+def _render_strips(
+    svg_content: bytes,
+    width: Optional[int],
+    height: Optional[int],
+    out_width: int,
+    out_height: int,
+) -> Iterator[bytes]:
+    """
+    Render horizontal strips and stream them through a PNG encoder.
+
+    The first strip is rendered, and CairoSVG's output size checked against
+    the estimate the PNG header is written with, before anything is yielded.
+    """
+    strip_rows = max(1, STRIP_PIXELS // out_width)
+    tops = range(0, out_height, strip_rows)
+    first = _render_strip(svg_content, width, height, 0, strip_rows, out_width, out_height)
+
+    encoder = PNGStreamEncoder(out_width, out_height)
+    yield encoder.header()
+    chunk = encoder.encode(first)
+    del first
+    if chunk:
+        yield chunk
+
+    for top in tops[1:]:
+        rgba = _render_strip(
+            svg_content, width, height, top, min(strip_rows, out_height - top), out_width, out_height
+        )
+        chunk = encoder.encode(rgba)
+        del rgba
+        if chunk:
+            yield chunk
+
+    yield encoder.finish()
+
+
+def _render_strip(
+    svg_content: bytes,
+    width: Optional[int],
+    height: Optional[int],
+    top: int,
+    rows: int,
+    out_width: int,
+    out_height: int,
+) -> np.ndarray:
+    """
+    Render rows [top, top + rows) of the output as straight RGBA.
+
+    Raises:
+        RenderSizeMismatch: If CairoSVG sizes the output differently from
+            ``svg_output_size``
+    """
+    import cairocffi as cairo
+    from cairosvg.parser import Tree
+    from cairosvg.surface import PNGSurface
+
+    class StripSurface(PNGSurface):
+        """PNG surface covering rows [top, top + rows) of the full output."""
+
+        def _create_surface(self, surface_width, surface_height):
+            # Report the full size so viewport and percentages resolve as usual
+            surface_width = int(round(surface_width))
+            surface_height = int(round(surface_height))
+            strip_rows = max(1, min(rows, surface_height - top))
+            strip = cairo.ImageSurface(cairo.FORMAT_ARGB32, max(surface_width, 1), strip_rows)
+            return strip, surface_width, surface_height
+
+        def set_context_size(self, context_width, context_height, viewbox, tree):
+            # Shift the document up so this strip's rows land on the surface
+            self.context.translate(0, -top)
+            super().set_context_size(context_width, context_height, viewbox, tree)
+
+    # Parse per strip: drawing rewrites mask and pattern nodes in place
+    tree = Tree(bytestring=svg_content)
+    surface = StripSurface(tree, None, 96, output_width=width, output_height=height)
+    try:
+        if (surface.width, surface.height) != (out_width, out_height):
+            raise RenderSizeMismatch(
+                f"Renderer sized the output {surface.width}x{surface.height}, "
+                f"expected {out_width}x{out_height}"
+            )
+        image = surface.cairo
+        image.flush()
+        return _unpremultiply(
+            image.get_data(), image.get_stride(), image.get_width(), image.get_height()
+        )
+    finally:
+        surface.finish()
+
+
+def _unpremultiply(data, stride: int, width: int, rows: int) -> np.ndarray:
+    """
+    Convert Cairo's native-endian premultiplied ARGB32 to straight RGBA.
+    """
+    pixels = np.frombuffer(data, dtype=np.uint8).reshape(rows, stride)[:, : width * 4]
+    pixels = pixels.reshape(rows, width, 4)
+    if np.little_endian:
+        bgr, alpha = pixels[..., :3], pixels[..., 3]
+        rgb = bgr[..., ::-1]
+    else:
+        alpha, rgb = pixels[..., 0], pixels[..., 1:]
+
+    rgba = np.empty((rows, width, 4), dtype=np.uint8)
+    rgba[..., 3] = alpha
+    a = alpha.astype(np.uint32)[..., None]
+    # Same rounding as Cairo's own PNG writer
+    straight = (rgb.astype(np.uint32) * 255 + a // 2) // np.maximum(a, 1)
+    rgba[..., :3] = np.where(a > 0, straight, 0)
+    return rgba
+
+
+# Renders for the API run here, in killable worker processes
+render_sandbox = RenderSandbox(svg_to_png_stream)
@@ -0,0 +1,178 @@
+"""
+Cache of finished responses keyed by input content and options.
+
+Identical uploads with identical options (retries, re-exports, several
+users converting the same asset) are answered from memory. Every entry
+keeps its compressed forms next to the plain body, so a hit is served
+without running the pipeline or the compressor again. Disabled unless
+``EKTOOLS_RESULT_CACHE_MB`` is set.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from src.core.compression import MIN_COMPRESS_SIZE, compress, is_compressible, negotiate
+
+
+class CachedResponse:
+    """
+    A response body with its headers and any compressed forms made so far.
+
+    Args:
+        body: Uncompressed body
+        media_type: Response content type
+        headers: Response headers to replay
+    """
+
+    def __init__(self, body: bytes, media_type: str, headers: Dict[str, str]):
+        self.body = body
+        self.media_type = media_type
+        self.headers = dict(headers)
+        self.encoded: Dict[str, bytes] = {}
+        self.cache: Optional["ResultCache"] = None
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the body and its compressed forms."""
+        return len(self.body) + sum(len(data) for data in self.encoded.values())
+
+    def is_ready(self, accept_encoding: Optional[str]) -> bool:
+        """Whether ``body_for`` can answer without compressing."""
+        encoding = negotiate(accept_encoding)
+        return (
+            encoding is None
+            or len(self.body) < MIN_COMPRESS_SIZE
+            or not is_compressible(self.media_type)
+            or encoding in self.encoded
+        )
+
+    def body_for(self, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        """
+        Body to send for a request's Accept-Encoding.
+
+        The first request for an encoding compresses the body and stores the
+        result; later ones reuse it. Already compressed content types (PNG)
+        are always sent plain. Unless ``is_ready``, call it off the event
+        loop.
+
+        Args:
+            accept_encoding: Request header value
+
+        Returns:
+            (body, content encoding or None for the plain body)
+        """
+        encoding = negotiate(accept_encoding)
+        if (
+            encoding is None
+            or len(self.body) < MIN_COMPRESS_SIZE
+            or not is_compressible(self.media_type)
+        ):
+            return self.body, None
+        data = self.encoded.get(encoding)
+        if data is None:
+            data = compress(self.body, encoding)
+            self.encoded[encoding] = data
+            if self.cache is not None:
+                self.cache.resized()
+        return data, encoding
+
+
+class ResultCache:
+    """
+    Bounded LRU cache of ``CachedResponse`` objects.
+
+    Args:
+        max_bytes: Memory budget for bodies and their compressed forms;
+            0 disables the cache. None reads ``EKTOOLS_RESULT_CACHE_MB``
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        if max_bytes is None:
+            max_bytes = int(float(os.environ.get("EKTOOLS_RESULT_CACHE_MB", 0)) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def key(data: bytes, options: Dict[str, Any]) -> str:
+        """
+        Cache key for an input and the options it was processed with.
+
+        Args:
+            data: Uploaded file content
+            options: JSON-serializable processing options
+
+        Returns:
+            Hex digest
+        """
+        digest = hashlib.sha256(data)
+        digest.update(json.dumps(options, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Look up a response, marking it recently used."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, entry: CachedResponse) -> None:
+        """Store a response; entries larger than the whole budget are skipped."""
+        if not self.enabled or entry.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+                old.cache = None
+            entry.cache = self
+            self._entries[key] = entry
+            self.nbytes += entry.nbytes
+            self._evict()
+
+    def resized(self) -> None:
+        """Account for a compressed form added to a stored entry."""
+        with self._lock:
+            self.nbytes = sum(item.nbytes for item in self._entries.values())
+            self._evict()
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for the metrics endpoint."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.nbytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        with self._lock:
+            for entry in self._entries.values():
+                entry.cache = None
+            self._entries.clear()
+            self.nbytes = 0
+
+    def _evict(self) -> None:
+        while self.nbytes > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            entry.cache = None
+            self.nbytes -= entry.nbytes
+
+
+result_cache = ResultCache()
@@ -0,0 +1,187 @@
+"""
+Killable worker processes for SVG rendering.
+
+CairoSVG runs in C and cannot be interrupted from Python, so a render that
+runs away would pin a core (and a thread of the API) until it finishes.
+Renders therefore run in separate worker processes. The caller waits with a
+deadline and the worker is killed, and replaced on the next render, when the
+deadline passes. Workers are started lazily with ``spawn`` so they never
+inherit the parent's threads or locks, and stay up between renders so each
+render does not pay for interpreter start-up and imports.
+"""
+import multiprocessing
+import os
+import pickle
+import queue
+import signal
+import threading
+import time
+from typing import Callable, Iterator, Optional
+
+# Concurrent renders per API process (EKTOOLS_RENDER_WORKERS overrides)
+DEFAULT_WORKERS = 2
+
+# Wall-clock budget per render in seconds (EKTOOLS_RENDER_TIMEOUT overrides)
+DEFAULT_TIMEOUT = 30.0
+
+
+class RenderTimeout(TimeoutError):
+    """A render did not finish within its time budget."""
+
+
+def _serve(conn, render: Callable[..., Iterator[bytes]]) -> None:
+    """Worker loop: render jobs and send back chunks, errors or done."""
+    # Ctrl-C is for the parent; it kills or closes the workers itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        try:
+            args = conn.recv()
+        except EOFError:
+            return
+        try:
+            for chunk in render(*args):
+                conn.send(("chunk", chunk))
+        except Exception as e:  # noqa: BLE001 - re-raised in the caller
+            try:
+                pickle.dumps(e)
+            except Exception:  # noqa: BLE001 - unpicklable exception types
+                e = RuntimeError(f"{type(e).__name__}: {e}")
+            conn.send(("error", e))
+        else:
+            conn.send(("done", None))
+
+
+class _Worker:
+    """One worker process and the parent's end of its pipe."""
+
+    def __init__(self, context, render: Callable[..., Iterator[bytes]]):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child_conn, render), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class RenderSandbox:
+    """
+    Run a render function in worker processes with a deadline.
+
+    Args:
+        render: Module-level function returning an iterator of bytes; it is
+            imported by name in the workers
+        workers: Maximum concurrent renders (None reads
+            ``EKTOOLS_RENDER_WORKERS``)
+        timeout: Default time budget per render in seconds (None reads
+            ``EKTOOLS_RENDER_TIMEOUT``)
+    """
+
+    def __init__(
+        self,
+        render: Callable[..., Iterator[bytes]],
+        workers: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ):
+        if workers is None:
+            workers = int(os.environ.get("EKTOOLS_RENDER_WORKERS", DEFAULT_WORKERS))
+        if timeout is None:
+            timeout = float(os.environ.get("EKTOOLS_RENDER_TIMEOUT", DEFAULT_TIMEOUT))
+        self.render_function = render
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self._context = multiprocessing.get_context("spawn")
+        self._slots = threading.BoundedSemaphore(self.workers)
+        self._idle: "queue.LifoQueue[_Worker]" = queue.LifoQueue()
+        self.killed = 0
+
+    def render_stream(self, *args, timeout: Optional[float] = None) -> Iterator[bytes]:
+        """
+        Render in a worker, yielding its output as it arrives.
+
+        The budget covers waiting for a free worker and for the worker's
+        output, but not the time a chunk spends with the consumer, so a slow
+        reader cannot run a finished render out of time. Closing the
+        iterator early kills the worker.
+
+        Args:
+            *args: Arguments for the render function
+            timeout: Time budget in seconds (None uses ``self.timeout``)
+
+        Yields:
+            Output chunks
+
+        Raises:
+            RenderTimeout: If the budget runs out; the worker is killed
+            Exception: Whatever the render function raised in the worker
+        """
+        budget = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        if not self._slots.acquire(timeout=budget):
+            raise RenderTimeout(f"No render worker became free within {budget:g} s")
+        remaining = budget - (time.monotonic() - start)
+
+        worker = None
+        reusable = False
+        try:
+            worker = self._checkout()
+            worker.conn.send(args)
+            while True:
+                # Only time spent waiting on the worker is charged
+                waited = time.monotonic()
+                if remaining <= 0 or not worker.conn.poll(remaining):
+                    raise RenderTimeout(f"Rendering exceeded the {budget:g} s time budget")
+                try:
+                    kind, value = worker.conn.recv()
+                except EOFError as e:
+                    raise RuntimeError("Render worker exited unexpectedly") from e
+                remaining -= time.monotonic() - waited
+                if kind == "chunk":
+                    yield value
+                    continue
+                reusable = True
+                if kind == "error":
+                    raise value
+                return
+        finally:
+            if worker is not None:
+                if reusable:
+                    self._idle.put(worker)
+                else:
+                    self.killed += 1
+                    worker.kill()
+            self._slots.release()
+
+    def render(self, *args, timeout: Optional[float] = None) -> bytes:
+        """
+        Render in a worker and return the whole output.
+
+        Args:
+            *args: Arguments for the render function
+            timeout: Time budget in seconds (None uses ``self.timeout``)
+
+        Returns:
+            Output bytes
+        """
+        return b"".join(self.render_stream(*args, timeout=timeout))
+
+    def close(self) -> None:
+        """Stop the idle workers."""
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            worker.kill()
+
+    def _checkout(self) -> _Worker:
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                return _Worker(self._context, self.render_function)
+            if worker.process.is_alive():
+                return worker
+            worker.kill()
@@ -0,0 +1,153 @@
+"""
+NumPy arrays in shared memory for handing frames to worker processes.
+
+Sending an array through a pipe pickles it, copies it into the pipe and
+copies it out again on the other side; for a 12 MP frame that is 36 MB each
+way. Instead, the requesting process allocates its arrays in
+``multiprocessing.shared_memory`` segments (decoding straight into them, as
+``SharedArena`` has the same ``empty`` method as a buffer ``Arena``) and
+sends only a ``SharedHandle``. The worker maps the segment and works on a
+NumPy view of the same pages, writing its result into a segment the caller
+allocated as well.
+
+The requesting process owns every segment: it unlinks them when the arena
+closes, whether the worker finished, failed or was killed, so a crashed
+worker cannot leak them. If the requesting process itself dies, the
+resource tracker unlinks what it left behind.
+"""
+import threading
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Dict, Iterator, List, NamedTuple, Tuple
+
+import numpy as np
+
+
+# Segments whose mapping could not be closed yet because views still existed
+_deferred: List[shared_memory.SharedMemory] = []
+_deferred_lock = threading.Lock()
+
+
+def _close(segment: shared_memory.SharedMemory) -> None:
+    """
+    Unmap a segment, or defer it while NumPy views of it are alive.
+
+    Deferred segments are retried on every later close, so a view kept a
+    little too long (e.g. by a traceback) delays the unmap instead of
+    failing it.
+    """
+    with _deferred_lock:
+        _deferred.append(segment)
+        pending = []
+        for item in _deferred:
+            try:
+                item.close()
+            except BufferError:
+                pending.append(item)
+        _deferred[:] = pending
+
+
+class SharedHandle(NamedTuple):
+    """Picklable reference to an array in a shared memory segment."""
+
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+class SharedArena:
+    """
+    Shared memory arrays owned by the current process for one task.
+
+    Use as a context manager; closing unlinks every segment. Arrays taken
+    from the arena must not be used after it closes.
+    """
+
+    def __init__(self):
+        self._segments: List[shared_memory.SharedMemory] = []
+        self._handles: Dict[int, SharedHandle] = {}
+        self._arrays: List[np.ndarray] = []
+        self.nbytes = 0
+
+    def __enter__(self) -> "SharedArena":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def empty(self, shape, dtype=np.float64) -> np.ndarray:
+        """
+        Allocate an uninitialized array in a new segment.
+
+        Args:
+            shape: Array shape
+            dtype: Array dtype
+
+        Returns:
+            Array backed by shared memory
+        """
+        shape = tuple(int(n) for n in np.atleast_1d(shape))
+        dtype = np.dtype(dtype)
+        nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        segment = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+        self._segments.append(segment)
+        array = np.ndarray(shape, dtype=dtype, buffer=segment.buf)
+        self._arrays.append(array)
+        self._handles[id(array)] = SharedHandle(segment.name, shape, dtype.str)
+        self.nbytes += nbytes
+        return array
+
+    def handle(self, array: np.ndarray) -> SharedHandle:
+        """
+        Handle to send to a worker for an array from ``empty``.
+
+        Raises:
+            ValueError: If the array was not allocated by this arena
+        """
+        try:
+            return self._handles[id(array)]
+        except KeyError:
+            raise ValueError("Array was not allocated by this arena") from None
+
+    def close(self) -> None:
+        """Unlink every segment and unmap it once no views are left."""
+        self._arrays.clear()
+        self._handles.clear()
+        for segment in self._segments:
+            try:
+                segment.unlink()
+            except FileNotFoundError:
+                pass
+            _close(segment)
+        self._segments.clear()
+
+
+def _open(name: str) -> shared_memory.SharedMemory:
+    """Map an existing segment without taking ownership of it."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 attachments are registered too; workers share the
+        # owner's resource tracker, which records each name once, so the
+        # owner's unlink still clears it
+        return shared_memory.SharedMemory(name=name)
+
+
+@contextmanager
+def attach(handle: SharedHandle) -> Iterator[np.ndarray]:
+    """
+    View of a shared array in a worker process.
+
+    Args:
+        handle: Handle from ``SharedArena.handle``
+
+    Yields:
+        Array over the shared pages; writes are seen by the owner
+    """
+    segment = _open(handle.name)
+    array = np.ndarray(handle.shape, dtype=np.dtype(handle.dtype), buffer=segment.buf)
+    try:
+        yield array
+    finally:
+        del array
+        _close(segment)
@@ -0,0 +1,495 @@
+"""
+Contour simplification, cubic Bezier fitting and compact path encoding.
+
+Closed contours are reduced with Douglas-Peucker, split at sharp corners and
+the smooth runs between corners are fitted with cubic Beziers (Schneider's
+algorithm). Paths are written with relative commands and the coarsest
+coordinate precision the detail level allows.
+"""
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Detail level used when the caller does not ask for one (tolerance 1.25 px)
+DEFAULT_DETAIL = 0.5
+
+# Turn angle (degrees) above which a vertex is kept as a sharp corner
+CORNER_ANGLE = 55.0
+
+# Contours with fewer simplified vertices than this are written as polygons
+_MIN_CURVE_VERTICES = 5
+
+_MAX_REPARAMETERIZE = 4
+
+Segment = Tuple[str, np.ndarray]
+
+
+def detail_to_tolerance(detail: float) -> float:
+    """
+    Map a detail level in [0, 1] to a simplification tolerance in pixels.
+
+    Args:
+        detail: 1.0 keeps every pixel step, 0.0 simplifies aggressively
+
+    Returns:
+        Maximum allowed deviation from the traced contour in pixels
+    """
+    detail = min(max(detail, 0.0), 1.0)
+    return 2.5 * (1.0 - detail)
+
+
+def detail_to_precision(detail: float) -> int:
+    """
+    Number of decimals written for coordinates at a given detail level.
+    """
+    return 1 if detail >= 0.75 else 0
+
+
+def douglas_peucker(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Simplify an open polyline with the Douglas-Peucker algorithm.
+
+    Distances for each range are computed in a single vectorized step.
+
+    Args:
+        points: Polyline vertices (N, 2)
+        tolerance: Maximum perpendicular deviation
+
+    Returns:
+        Sorted indices of the vertices to keep (always includes both ends)
+    """
+    n = len(points)
+    if n < 3:
+        return np.arange(n)
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        chord = points[end] - points[start]
+        inner = points[start + 1 : end] - points[start]
+        chord_len = np.hypot(chord[0], chord[1])
+        if chord_len > 0:
+            distances = np.abs(inner[:, 0] * chord[1] - inner[:, 1] * chord[0]) / chord_len
+        else:
+            distances = np.hypot(inner[:, 0], inner[:, 1])
+
+        split = int(np.argmax(distances))
+        if distances[split] > tolerance:
+            split += start + 1
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+
+    return np.flatnonzero(keep)
+
+
+def simplify_closed(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Simplify a closed contour with Douglas-Peucker.
+
+    The ring is split at its first vertex and the vertex farthest from it so
+    that both halves are simplified as open polylines.
+
+    Args:
+        points: Contour vertices (N, 2) without a repeated closing vertex
+        tolerance: Maximum perpendicular deviation
+
+    Returns:
+        Sorted indices of the vertices to keep
+    """
+    n = len(points)
+    if n < 4:
+        return np.arange(n)
+
+    far = int(np.argmax(((points - points[0]) ** 2).sum(axis=1)))
+    if far == 0:
+        return np.array([0])
+
+    ring = np.vstack([points, points[:1]])
+    first = douglas_peucker(ring[: far + 1], tolerance)
+    second = douglas_peucker(ring[far:], tolerance) + far
+    indices = np.concatenate([first, second[1:-1]])
+    return indices
+
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    length = np.hypot(vector[0], vector[1])
+    return vector / length if length > 0 else vector
+
+
+def _bezier(ctrl: np.ndarray, t: np.ndarray) -> np.ndarray:
+    mt = 1.0 - t
+    return (
+        (mt**3)[:, None] * ctrl[0]
+        + (3 * mt**2 * t)[:, None] * ctrl[1]
+        + (3 * mt * t**2)[:, None] * ctrl[2]
+        + (t**3)[:, None] * ctrl[3]
+    )
+
+
+def _bezier_d1(ctrl: np.ndarray, t: np.ndarray) -> np.ndarray:
+    mt = 1.0 - t
+    return 3 * (
+        (mt**2)[:, None] * (ctrl[1] - ctrl[0])
+        + (2 * mt * t)[:, None] * (ctrl[2] - ctrl[1])
+        + (t**2)[:, None] * (ctrl[3] - ctrl[2])
+    )
+
+
+def _bezier_d2(ctrl: np.ndarray, t: np.ndarray) -> np.ndarray:
+    mt = 1.0 - t
+    return 6 * (
+        mt[:, None] * (ctrl[2] - 2 * ctrl[1] + ctrl[0])
+        + t[:, None] * (ctrl[3] - 2 * ctrl[2] + ctrl[1])
+    )
+
+
+def _chord_parameters(points: np.ndarray) -> np.ndarray:
+    lengths = np.hypot(*np.diff(points, axis=0).T)
+    u = np.concatenate([[0.0], np.cumsum(lengths)])
+    return u / u[-1] if u[-1] > 0 else np.linspace(0.0, 1.0, len(points))
+
+
+def _generate_bezier(
+    points: np.ndarray, u: np.ndarray, tan1: np.ndarray, tan2: np.ndarray
+) -> np.ndarray:
+    """Least-squares cubic through ``points`` with fixed end tangent directions."""
+    first, last = points[0], points[-1]
+    mt = 1.0 - u
+    b0, b1, b2, b3 = mt**3, 3 * mt**2 * u, 3 * mt * u**2, u**3
+
+    a1 = b1[:, None] * tan1
+    a2 = b2[:, None] * tan2
+    c00 = (a1 * a1).sum()
+    c01 = (a1 * a2).sum()
+    c11 = (a2 * a2).sum()
+    rest = points - ((b0 + b1)[:, None] * first + (b2 + b3)[:, None] * last)
+    x0 = (a1 * rest).sum()
+    x1 = (a2 * rest).sum()
+
+    seg_len = np.hypot(*(last - first))
+    det = c00 * c11 - c01 * c01
+    alpha1 = alpha2 = 0.0
+    if abs(det) > 1e-12:
+        alpha1 = (x0 * c11 - x1 * c01) / det
+        alpha2 = (c00 * x1 - c01 * x0) / det
+
+    epsilon = 1e-6 * seg_len
+    if alpha1 < epsilon or alpha2 < epsilon:
+        alpha1 = alpha2 = seg_len / 3.0
+
+    return np.array([first, first + tan1 * alpha1, last + tan2 * alpha2, last])
+
+
+def _reparameterize(points: np.ndarray, ctrl: np.ndarray, u: np.ndarray) -> np.ndarray:
+    """One Newton-Raphson step towards the closest curve parameter per point."""
+    diff = _bezier(ctrl, u) - points
+    d1 = _bezier_d1(ctrl, u)
+    d2 = _bezier_d2(ctrl, u)
+    numerator = (diff * d1).sum(axis=1)
+    denominator = (d1 * d1).sum(axis=1) + (diff * d2).sum(axis=1)
+    step = np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator != 0)
+    return np.clip(u - step, 0.0, 1.0)
+
+
+def fit_cubic(
+    points: np.ndarray, tan1: np.ndarray, tan2: np.ndarray, tolerance: float, depth: int = 0
+) -> List[np.ndarray]:
+    """
+    Fit a run of points with cubic Beziers (Schneider's algorithm).
+
+    Args:
+        points: Dense points along the run (N, 2), N >= 2
+        tan1: Unit tangent leaving the first point
+        tan2: Unit tangent entering the last point, pointing backwards
+        tolerance: Maximum distance between points and the fitted curve
+        depth: Recursion depth (internal)
+
+    Returns:
+        List of (4, 2) control-point arrays
+    """
+    if len(points) == 2:
+        dist = np.hypot(*(points[1] - points[0])) / 3.0
+        return [np.array([points[0], points[0] + tan1 * dist, points[1] + tan2 * dist, points[1]])]
+
+    u = _chord_parameters(points)
+    ctrl = _generate_bezier(points, u, tan1, tan2)
+    errors = ((_bezier(ctrl, u) - points) ** 2).sum(axis=1)
+    split = int(np.argmax(errors))
+    tolerance_sq = tolerance * tolerance
+    if errors[split] <= tolerance_sq:
+        return [ctrl]
+
+    if errors[split] <= 4 * tolerance_sq:
+        for _ in range(_MAX_REPARAMETERIZE):
+            u = _reparameterize(points, ctrl, u)
+            ctrl = _generate_bezier(points, u, tan1, tan2)
+            errors = ((_bezier(ctrl, u) - points) ** 2).sum(axis=1)
+            split = int(np.argmax(errors))
+            if errors[split] <= tolerance_sq:
+                return [ctrl]
+
+    split = min(max(split, 1), len(points) - 2)
+    if depth > 32:
+        return [ctrl]
+
+    center = _normalize(points[split - 1] - points[split + 1])
+    left = fit_cubic(points[: split + 1], tan1, center, tolerance, depth + 1)
+    right = fit_cubic(points[split:], -center, tan2, tolerance, depth + 1)
+    return left + right
+
+
+def _corner_mask(vertices: np.ndarray, corner_angle: float) -> np.ndarray:
+    """Flag closed-polygon vertices whose turn angle exceeds ``corner_angle``."""
+    incoming = vertices - np.roll(vertices, 1, axis=0)
+    outgoing = np.roll(vertices, -1, axis=0) - vertices
+    norms = np.hypot(*incoming.T) * np.hypot(*outgoing.T)
+    cos_turn = np.divide(
+        (incoming * outgoing).sum(axis=1), norms, out=np.ones(len(vertices)), where=norms > 0
+    )
+    return cos_turn < np.cos(np.radians(corner_angle))
+
+
+def _fit_runs(
+    points: np.ndarray,
+    keep: np.ndarray,
+    corners: np.ndarray,
+    tolerance: float,
+    closed: bool,
+    smooth_breaks: bool = False,
+) -> List[Segment]:
+    """
+    Fit the runs between consecutive corners with Beziers or straight lines.
+
+    Args:
+        points: Dense input points (N, 2)
+        keep: Indices of the simplified vertices into ``points``
+        corners: Indices into ``keep`` where runs start and end
+        tolerance: Maximum deviation from the input points
+        closed: Whether the last corner connects back to the first
+        smooth_breaks: Corners are artificial breaks on a smooth loop
+
+    Returns:
+        Segments from ``points[keep[corners[0]]]`` onwards
+    """
+    vertices = points[keep]
+    n_vertices = len(keep)
+    segments: List[Segment] = []
+
+    n_runs = len(corners) if closed else len(corners) - 1
+    for i in range(n_runs):
+        corner = corners[i]
+        next_corner = corners[(i + 1) % len(corners)]
+        span = (next_corner - corner) % n_vertices or n_vertices
+        run_vertices = [(corner + k) % n_vertices for k in range(span + 1)]
+        polyline = [("L", vertices[v]) for v in run_vertices[1:]]
+
+        if span < 2:
+            segments.extend(polyline)
+            continue
+
+        first_idx = keep[run_vertices[0]]
+        last_idx = keep[run_vertices[-1]]
+        if last_idx > first_idx:
+            run = points[first_idx : last_idx + 1]
+        else:
+            run = np.vstack([points[first_idx:], points[: last_idx + 1]])
+
+        if smooth_breaks:
+            prev_v = vertices[(run_vertices[0] - 1) % n_vertices]
+            next_v = vertices[(run_vertices[-1] + 1) % n_vertices]
+            tan1 = _normalize(vertices[run_vertices[1]] - prev_v)
+            tan2 = _normalize(vertices[run_vertices[-2]] - next_v)
+        else:
+            tan1 = _normalize(vertices[run_vertices[1]] - vertices[run_vertices[0]])
+            tan2 = _normalize(vertices[run_vertices[-2]] - vertices[run_vertices[-1]])
+
+        beziers = fit_cubic(run, tan1, tan2, tolerance)
+        if len(beziers) * 3 < span:
+            segments.extend(("C", ctrl[1:]) for ctrl in beziers)
+        else:
+            segments.extend(polyline)
+
+    return segments
+
+
+def fit_closed_contour(
+    points: np.ndarray, tolerance: float, curves: bool = True, corner_angle: float = CORNER_ANGLE
+) -> Tuple[np.ndarray, List[Segment]]:
+    """
+    Simplify a closed contour and fit its smooth runs with cubic Beziers.
+
+    Runs between sharp corners are fitted against the dense input points;
+    a run falls back to straight lines whenever that needs fewer numbers.
+
+    Args:
+        points: Contour vertices (N, 2) without a repeated closing vertex
+        tolerance: Maximum deviation from the input contour
+        curves: Whether to fit Beziers at all
+        corner_angle: Turn angle in degrees that marks a corner
+
+    Returns:
+        Tuple of (start point, segments). Each segment is ("L", end point) or
+        ("C", (3, 2) array of control point 1, control point 2 and end point);
+        segments are empty when the contour collapses below the tolerance
+    """
+    keep = simplify_closed(points, max(tolerance, 0.5) if curves else tolerance)
+    vertices = points[keep]
+    if len(keep) < 3:
+        # Collapsed below the tolerance (specks, hairlines)
+        return vertices[0], []
+
+    if not curves or len(keep) < _MIN_CURVE_VERTICES or tolerance <= 0:
+        return vertices[0], [("L", v) for v in vertices[1:]]
+
+    corners = np.flatnonzero(_corner_mask(vertices, corner_angle))
+    smooth_breaks = len(corners) == 0
+    if smooth_breaks:
+        # Smooth loop: break it at two opposite vertices
+        corners = np.array([0, len(keep) // 2])
+
+    segments = _fit_runs(points, keep, corners, tolerance, closed=True, smooth_breaks=smooth_breaks)
+    return vertices[corners[0]], segments
+
+
+def fit_open_chain(
+    points: np.ndarray, tolerance: float, curves: bool = True, corner_angle: float = CORNER_ANGLE
+) -> List[Segment]:
+    """
+    Simplify an open polyline with fixed end points and fit it like a contour.
+
+    Used for borders shared by two regions: the chain is fitted once and
+    both regions use the same segments, so their edges coincide exactly.
+
+    Args:
+        points: Polyline vertices (N, 2), N >= 2
+        tolerance: Maximum deviation from the input polyline
+        curves: Whether to fit Beziers at all
+        corner_angle: Turn angle in degrees that marks a corner
+
+    Returns:
+        Segments from ``points[0]`` to ``points[-1]``
+    """
+    keep = douglas_peucker(points, max(tolerance, 0.5) if curves else tolerance)
+    vertices = points[keep]
+    if not curves or len(keep) < _MIN_CURVE_VERTICES or tolerance <= 0:
+        return [("L", v) for v in vertices[1:]]
+
+    inner = _corner_mask(vertices, corner_angle)
+    inner[0] = inner[-1] = True
+    corners = np.flatnonzero(inner)
+    return _fit_runs(points, keep, corners, tolerance, closed=False)
+
+
+def reverse_segments(start: np.ndarray, segments: List[Segment]) -> Tuple[np.ndarray, List[Segment]]:
+    """
+    Reverse a segment list so it is walked from its end back to ``start``.
+
+    Args:
+        start: Start point of the segments
+        segments: ("L", end) / ("C", (3, 2)) segments
+
+    Returns:
+        Tuple of (new start point, reversed segments)
+    """
+    if not segments:
+        return start, []
+
+    ends = [start] + [np.asarray(data).reshape(-1, 2)[-1] for _, data in segments]
+    reversed_segments: List[Segment] = []
+    for i in range(len(segments) - 1, -1, -1):
+        kind, data = segments[i]
+        if kind == "L":
+            reversed_segments.append(("L", ends[i]))
+        else:
+            reversed_segments.append(("C", np.vstack([data[1], data[0], ends[i]])))
+    return ends[-1], reversed_segments
+
+
+def _format_numbers(values: np.ndarray, precision: int) -> List[str]:
+    """Format coordinates with minimal characters ("0.5" -> ".5", "2.0" -> "2")."""
+    if precision <= 0:
+        return [str(int(v)) for v in np.rint(values).astype(np.int64)]
+
+    formatted = []
+    for v in np.round(values, precision):
+        text = f"{v:.{precision}f}".rstrip("0").rstrip(".")
+        if text.startswith("0."):
+            text = text[1:]
+        elif text.startswith("-0."):
+            text = "-" + text[2:]
+        formatted.append("0" if text in ("", "-0", "-") else text)
+    return formatted
+
+
+def _join_numbers(numbers: List[str]) -> str:
+    # A minus sign or a leading dot after a decimal number already separates
+    text = " ".join(numbers)
+    return text.replace(" -", "-")
+
+
+def encode_segments(start: np.ndarray, segments: List[Segment], precision: int = 0) -> str:
+    """
+    Encode a closed contour as compact SVG path data with relative commands.
+
+    Coordinates are rounded as absolute values before differencing so that
+    rounding errors never accumulate along the path.
+
+    Args:
+        start: Start point (2,)
+        segments: Output of ``fit_closed_contour``
+        precision: Decimals written per coordinate
+
+    Returns:
+        Path data such as "M10 20l5 0c1 2 3 4 5 6z"
+    """
+    scale = 10**precision
+    current = np.round(np.asarray(start, dtype=np.float64) * scale)
+    parts = ["M" + _join_numbers(_format_numbers(current / scale, precision))]
+
+    command = None
+    numbers: List[str] = []
+    for kind, data in segments:
+        absolute = np.round(np.asarray(data, dtype=np.float64).reshape(-1, 2) * scale)
+        relative = (absolute - current).reshape(-1) / scale
+        current = absolute[-1]
+
+        if kind == "L" and not relative.any():
+            continue
+
+        letter = "l" if kind == "L" else "c"
+        if letter != command:
+            if numbers:
+                parts.append(command + _join_numbers(numbers))
+            command, numbers = letter, []
+        numbers.extend(_format_numbers(relative, precision))
+
+    if numbers:
+        parts.append(command + _join_numbers(numbers))
+    parts.append("z")
+    return "".join(parts)
+
+
+def contour_to_path(points: np.ndarray, detail: Optional[float] = None) -> str:
+    """
+    Simplify, curve-fit and encode a closed contour at a detail level.
+
+    Args:
+        points: Contour vertices (N, 2) in output coordinates
+        detail: Detail level in [0, 1] (default ``DEFAULT_DETAIL``)
+
+    Returns:
+        Compact SVG path data, or an empty string if nothing survives
+    """
+    if detail is None:
+        detail = DEFAULT_DETAIL
+    tolerance = detail_to_tolerance(detail)
+    start, segments = fit_closed_contour(points, tolerance, curves=detail < 1.0)
+    if not segments:
+        return ""
+    return encode_segments(start, segments, detail_to_precision(detail))
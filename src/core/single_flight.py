@@ -0,0 +1,116 @@
+"""
+Coalescing of identical in-flight requests.
+
+When many clients upload the same artwork with the same options at once,
+only the first request runs the pipeline; the others await its result and
+answer with the same bytes. Unlike the result cache this needs no memory
+budget: a result is shared only while it is being computed.
+"""
+import asyncio
+from typing import Any, Callable, Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+
+class _Call:
+    """One run in flight and the callers waiting for it."""
+
+    def __init__(self, task: asyncio.Future, on_abandon: Optional[Callable[[], None]]):
+        self.task = task
+        self.on_abandon = on_abandon
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Run at most one call per key at a time and share its outcome.
+
+    Attributes:
+        leaders: Calls that ran the work
+        coalesced: Calls that awaited another call's work
+        abandoned: Runs whose callers all went away before it finished
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.abandoned = 0
+
+    @property
+    def in_flight(self) -> int:
+        """Keys currently being computed."""
+        return len(self._calls)
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[..., Any],
+        *args: Any,
+        on_abandon: Optional[Callable[[], None]] = None,
+    ) -> Any:
+        """
+        Run ``fn(*args)`` in the thread pool, or join the run already in
+        flight for ``key``.
+
+        Exceptions are shared the same way as results. A caller that is
+        cancelled (client disconnect) does not cancel the work for the
+        others; once every caller is gone the run is forgotten and
+        ``on_abandon`` (given by the caller that started it) is called so
+        the work can stop early.
+
+        Args:
+            key: Identity of the work, e.g. input hash plus options
+            fn: Blocking function to run
+            *args: Arguments for ``fn``
+            on_abandon: Called when no caller waits for the result any more
+
+        Returns:
+            The value returned by ``fn``
+        """
+        call = self._calls.get(key)
+        if call is not None:
+            self.coalesced += 1
+        else:
+            self.leaders += 1
+            call = _Call(asyncio.ensure_future(run_in_threadpool(fn, *args)), on_abandon)
+            self._calls[key] = call
+            call.task.add_done_callback(lambda done: self._finished(key, call))
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                self._abandon(key, call)
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _abandon(self, key: str, call: _Call) -> None:
+        # Later identical requests start a fresh run instead of joining
+        # one that is being stopped
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        self.abandoned += 1
+        if call.on_abandon is not None:
+            call.on_abandon()
+
+    def _finished(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.task.cancelled():
+            # Mark the exception retrieved even if every caller went away
+            call.task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for the metrics endpoint."""
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "abandoned": self.abandoned,
+            "in_flight": self.in_flight,
+        }
+
+
+single_flight = SingleFlight()
@@ -1,6 +1,48 @@
 """SVG builder for creating multi-layer SVG files."""
 
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+
+def format_color(rgb_color: Tuple[int, int, int]) -> str:
+    """
+    Format an RGB color as the shortest equivalent hex notation.
+
+    Args:
+        rgb_color: (r, g, b) tuple with 0-255 components
+
+    Returns:
+        ``#rgb`` when every component repeats its nibble, otherwise ``#rrggbb``
+    """
+    hex_color = "{:02x}{:02x}{:02x}".format(*(int(c) for c in rgb_color))
+    if hex_color[0::2] == hex_color[1::2]:
+        return "#" + hex_color[0::2]
+    return "#" + hex_color
+
+
+def view_box_size(
+    width: int,
+    height: int,
+    scale_factor: float = 1.0,
+    trace_size: Optional[Tuple[int, int]] = None,
+) -> Tuple[int, int]:
+    """
+    Size of the path coordinate space, i.e. the viewBox of ``build_svg``.
+
+    Args:
+        width: Image width
+        height: Image height
+        scale_factor: Multiplier matching path coordinates
+        trace_size: (width, height) the paths were traced at, if not ``width``
+            and ``height``
+
+    Returns:
+        (width, height) of the viewBox
+    """
+    view_width, view_height = trace_size or (width, height)
+    return (
+        max(int(round(view_width * scale_factor)), 1),
+        max(int(round(view_height * scale_factor)), 1),
+    )
 
 
 def build_svg(
@@ -8,43 +50,53 @@ def build_svg(
     height: int,
     paths: List[Tuple[str, Tuple[int, int, int]]],
     scale_factor: float = 1.0,
+    trace_size: Optional[Tuple[int, int]] = None,
 ) -> str:
     """
     Build a complete SVG document from paths and colors.
 
+    Path coordinates are y-up (Potrace's convention), so the document is
+    flipped once by a single root group. All paths of one color are merged
+    into one ``<path>`` element; every path string starts with an absolute
+    moveto and holes run opposite to outlines, so concatenating them keeps
+    the nonzero fill unchanged. Colors are painted in order of first
+    appearance in ``paths``.
+
+    Paths traced from a downscaled copy of the image keep their working
+    coordinates: the viewBox covers ``trace_size`` and the document's
+    ``width``/``height`` stretch it back to the original size.
+
     Args:
         width: Image width
         height: Image height
         paths: List of (path_string, rgb_color) tuples
         scale_factor: Multiplier for width/height/viewBox to match path coordinates
+        trace_size: (width, height) the paths were traced at, if not ``width``
+            and ``height``
 
     Returns:
         Complete SVG document as string
     """
-    scaled_width = max(int(round(width * scale_factor)), 1)
-    scaled_height = max(int(round(height * scale_factor)), 1)
+    scaled_width, scaled_height = view_box_size(width, height, scale_factor, trace_size)
+    # Working sizes are rounded, so the aspect ratio may be off by a fraction
+    # of a pixel; stretch exactly instead of letterboxing
+    aspect = ' preserveAspectRatio="none"' if trace_size is not None else ""
+
+    # Dicts keep insertion order, i.e. the paint order of the first path
+    by_color: Dict[Tuple[int, int, int], List[str]] = {}
+    for path_str, rgb_color in paths:
+        if path_str:  # Skip empty paths
+            by_color.setdefault(tuple(rgb_color), []).append(path_str)
 
     svg_parts = [
         '<?xml version="1.0" encoding="UTF-8"?>',
-        f'<svg xmlns="http://www.w3.org/2000/svg"',
-        f'     width="{width}" height="{height}"',
-        f'     viewBox="0 0 {scaled_width} {scaled_height}">',
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {scaled_width} {scaled_height}"{aspect}>',
+        f'<g transform="matrix(1 0 0 -1 0 {scaled_height})">',
     ]
-
-    # Add each path as a group with its color
-    for path_str, rgb_color in paths:
-        if not path_str:  # Skip empty paths
-            continue
-
-        r, g, b = rgb_color
-        # Flip vertically to correct mirroring issue
-        svg_parts.append(
-            f'  <g transform="translate(0, {scaled_height}) scale(1, -1)" '
-            f'fill="rgb({r},{g},{b})" stroke="rgb({r},{g},{b})" stroke-width="0">'
-        )
-        svg_parts.append(f'    <path d="{path_str}"/>')
-        svg_parts.append("  </g>")
-
+    for rgb_color, path_strs in by_color.items():
+        svg_parts.append(f'<path fill="{format_color(rgb_color)}" d="{"".join(path_strs)}"/>')
+    svg_parts.append("</g>")
     svg_parts.append("</svg>")
 
     return "\n".join(svg_parts)
@@ -1,144 +1,95 @@
 """Tracing binary masks to SVG paths using Potrace or marching squares."""
 
-import os
-import re
-import subprocess
-import tempfile
-from typing import List, Optional
-
-try:  # pragma: no cover - handled at runtime
-    from skimage import measure  # type: ignore[import-not-found]
-except ImportError as exc:  # pragma: no cover
-    measure = None  # type: ignore[assignment]
-    _MEASURE_IMPORT_ERROR = exc
-else:
-    _MEASURE_IMPORT_ERROR = None
+from typing import Dict, List, Optional, Sequence
 
 import numpy as np
 
-
-def trace_mask_potrace(mask: np.ndarray) -> Optional[List[str]]:
+from src.core.contours import find_binary_contours, find_label_boundaries
+from src.core.potrace_backend import load_bindings, potrace_cli, trace_with_bindings
+from src.core.simplify import (
+    DEFAULT_DETAIL,
+    contour_to_path,
+    detail_to_precision,
+    detail_to_tolerance,
+    encode_segments,
+    fit_closed_contour,
+    fit_open_chain,
+    reverse_segments,
+)
+
+
+def trace_mask_potrace(
+    mask: np.ndarray, detail: Optional[float] = None
+) -> Optional[List[str]]:
     """
     Trace a binary mask to SVG path using Potrace.
 
+    Uses the in-process Potrace bindings when installed, otherwise the
+    ``potrace`` executable over a pipe.
+
     Args:
         mask: Binary mask (0 or 255)
+        detail: Optional detail level in [0, 1] mapped to Potrace options
 
     Returns:
         SVG path string or None if Potrace is not available
     """
-    try:
-        # Create temporary PBM file
-        with tempfile.NamedTemporaryFile(suffix=".pbm", delete=False) as tmp_pbm:
-            pbm_path = tmp_pbm.name
-            # Write PBM format
-            height, width = mask.shape
-            with open(pbm_path, "wb") as f:
-                f.write(f"P4\n{width} {height}\n".encode())
-                # Convert mask to PBM format (1 bit per pixel)
-                # PBM P4 format: packed binary
-                for y in range(height):
-                    row = mask[y]
-                    byte_row = bytearray()
-                    for x in range(0, width, 8):
-                        byte_val = 0
-                        for bit in range(8):
-                            if x + bit < width:
-                                # Potrace treats bits set to 1 as foreground (black)
-                                if row[x + bit] > 0:
-                                    byte_val |= 1 << (7 - bit)
-                        byte_row.append(byte_val)
-                    f.write(bytes(byte_row))
-
-        # Create temporary SVG file
-        with tempfile.NamedTemporaryFile(
-            suffix=".svg", delete=False, mode="w"
-        ) as tmp_svg:
-            svg_path = tmp_svg.name
-
-        # Run Potrace
+    bindings = load_bindings()
+    if bindings is not None:
         try:
-            subprocess.run(
-                ["potrace", "-s", "-o", svg_path, pbm_path],
-                check=True,
-                capture_output=True,
-                timeout=30,
-            )
-
-            # Read SVG content
-            with open(svg_path, "r", encoding="utf-8") as f:
-                svg_content = f.read()
-
-            # Extract all <path> elements
-            paths = re.findall(r'<path[^>]*d="([^"]+)"', svg_content)
-            return paths or None
-
-        except (
-            subprocess.CalledProcessError,
-            FileNotFoundError,
-            subprocess.TimeoutExpired,
-        ):
-            # Potrace not available or failed
+            return trace_with_bindings(bindings, mask, detail=detail) or None
+        except (RuntimeError, ValueError, MemoryError):
             return None
-        finally:
-            # Cleanup
-            if os.path.exists(pbm_path):
-                os.unlink(pbm_path)
-            if os.path.exists(svg_path):
-                os.unlink(svg_path)
-
-    except (OSError, ValueError, RuntimeError):
+
+    if not potrace_cli.available():
         return None
+    return potrace_cli.trace(mask, detail=detail) or None
 
 
 def trace_mask_marching_squares(
-    mask: np.ndarray, tolerance: float = 1.25, level: float = 0.5
+    mask: np.ndarray, detail: Optional[float] = None, level: float = 0.5
 ) -> List[str]:
     """
-    Trace a binary mask to SVG path using marching squares algorithm.
+    Trace a binary mask to SVG path without Potrace.
 
-    This is a Python implementation that doesn't require Potrace.
+    Boundaries are followed along pixel edges by ``find_binary_contours``,
+    which gives the same points marching squares does for a binary mask but
+    works on the mask directly. Contours are simplified and curve-fitted
+    according to ``detail`` and written in the same y-up pixel-corner
+    coordinates Potrace uses, so ``build_svg`` treats both backends alike.
+    All contours go into one path, so holes are cut out of their outlines.
 
     Args:
         mask: Binary mask (0 or 255)
+        detail: Detail level in [0, 1] (default ``DEFAULT_DETAIL``)
+        level: Foreground threshold as a fraction of 255
 
     Returns:
         SVG path string
     """
-    if measure is None:
-        raise RuntimeError(
-            "scikit-image is required for marching squares tracing"
-        ) from _MEASURE_IMPORT_ERROR
-
-    # Normalize mask to [0, 1] floats for skimage
-    normalized = (mask.astype(np.float32) / 255.0).clip(0.0, 1.0)
+    binary = mask > int(level * 255) if mask.dtype != bool else mask
+    height = mask.shape[0]
 
-    contours = measure.find_contours(normalized, level=level)
+    contours, _ = find_binary_contours(binary)
 
-    paths: List[str] = []
+    parts: List[str] = []
     for contour in contours:
-        if contour.shape[0] < 2:
+        if contour.shape[0] < 3:
             continue
 
-        if tolerance > 0:
-            contour = measure.approximate_polygon(contour, tolerance)
-            if contour.shape[0] < 3:
-                continue
+        # Flip to y pointing up
+        contour[:, 1] = height - contour[:, 1]
 
-        # Skimage returns points as (row, col); convert to (x, y)
-        points = contour[:, ::-1]
-        commands = []
-        x0, y0 = points[0]
-        commands.append(f"M {x0:.2f} {y0:.2f}")
-        for x, y in points[1:]:
-            commands.append(f"L {x:.2f} {y:.2f}")
-        commands.append("Z")
-        paths.append(" ".join(commands))
+        path = contour_to_path(contour, detail)
+        if path:
+            parts.append(path)
 
-    return paths
+    return ["".join(parts)] if parts else []
 
 
-def trace_mask(mask: np.ndarray, prefer_potrace: bool = True) -> List[str]:
+def trace_mask(
+    mask: np.ndarray, prefer_potrace: bool = True, detail: Optional[float] = None
+) -> List[str]:
     """
     Trace a binary mask to SVG path.
 
@@ -147,14 +98,86 @@ def trace_mask(mask: np.ndarray, prefer_potrace: bool = True) -> List[str]:
     Args:
         mask: Binary mask (0 or 255)
         prefer_potrace: Whether to try Potrace first
+        detail: Optional detail level in [0, 1]; lower values produce
+            simpler paths and smaller SVGs
 
     Returns:
         SVG path string
     """
     if prefer_potrace:
-        paths = trace_mask_potrace(mask)
+        paths = trace_mask_potrace(mask, detail=detail)
         if paths:
             return paths
 
     # Fallback to marching squares
-    return trace_mask_marching_squares(mask)
+    return trace_mask_marching_squares(mask, detail=detail)
+
+
+def trace_label_image(
+    label_image: np.ndarray,
+    detail: Optional[float] = None,
+    labels: Optional[Sequence[int]] = None,
+) -> Dict[int, str]:
+    """
+    Trace all color regions of a label image with shared boundaries.
+
+    The label image is walked once. Every border between two regions is
+    simplified and curve-fitted once and used by both regions (one of them
+    walking it backwards), so neighbouring paths meet exactly: no hairline
+    gaps and no overlap. Work grows with the total boundary length rather
+    than with colors x image size.
+
+    Args:
+        label_image: (H, W) integer region labels
+        detail: Detail level in [0, 1] (default ``DEFAULT_DETAIL``)
+        labels: Labels to trace (default: all)
+
+    Returns:
+        Dict mapping each traced label to its SVG path data (y-up
+        pixel-corner coordinates); labels whose regions collapse entirely
+        are omitted
+    """
+    if detail is None:
+        detail = DEFAULT_DETAIL
+    tolerance = detail_to_tolerance(detail)
+    precision = detail_to_precision(detail)
+    curves = detail < 1.0
+
+    boundaries = find_label_boundaries(label_image, labels=None if labels is None else list(labels))
+    points = boundaries.points.copy()
+    points[:, 1] = label_image.shape[0] - points[:, 1]
+
+    # Chain key -> (start, segments) in the direction it was first walked
+    fitted: Dict[int, tuple] = {}
+
+    def piece_segments(piece: int):
+        key = int(boundaries.piece_keys[piece])
+        if key in fitted:
+            # The other side walks the chain in the opposite direction
+            return reverse_segments(*fitted.pop(key))
+
+        chain = points[boundaries.piece_offsets[piece] : boundaries.piece_offsets[piece + 1]]
+        if boundaries.piece_closed[piece]:
+            result = fit_closed_contour(chain, tolerance, curves=curves)
+        else:
+            result = (chain[0], fit_open_chain(chain, tolerance, curves=curves))
+        fitted[key] = result
+        return result
+
+    paths: Dict[int, List[str]] = {}
+    offsets = boundaries.cycle_offsets
+    for cycle, label in enumerate(boundaries.cycle_labels):
+        start = None
+        segments = []
+        for piece in range(offsets[cycle], offsets[cycle + 1]):
+            piece_start, piece_segs = piece_segments(piece)
+            if start is None:
+                start = piece_start
+            segments.extend(piece_segs)
+
+        # Collapsed loops and back-and-forth slivers
+        if len(segments) < 2 or (len(segments) == 2 and all(kind == "L" for kind, _ in segments)):
+            continue
+        paths.setdefault(int(label), []).append(encode_segments(start, segments, precision))
+
+    return {label: "".join(parts) for label, parts in paths.items()}
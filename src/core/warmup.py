@@ -0,0 +1,79 @@
+"""
+Warm-up of the heavy processing backends.
+
+The numerical libraries (scikit-learn, OpenCV, CairoSVG) are
+imported lazily on first use so the service becomes ready quickly. Calling
+``warm_up`` loads them ahead of traffic and runs each pipeline once on a tiny
+input so the first real request does not pay for imports and initialization.
+"""
+import time
+from typing import Dict, Iterable, Union
+
+import numpy as np
+
+BACKENDS = ("vectorize", "rasterize", "remove_background")
+
+_TINY_SVG = (
+    b'<svg xmlns="http://www.w3.org/2000/svg" width="8" height="8">'
+    b'<rect width="4" height="4" fill="red"/></svg>'
+)
+
+
+def _tiny_image() -> np.ndarray:
+    image = np.full((16, 16, 3), 255, dtype=np.uint8)
+    image[4:12, 4:12] = (0, 0, 200)
+    return image
+
+
+def _warm_vectorize() -> None:
+    from src.core.quantize import quantize_colors, get_color_masks
+    from src.core.trace import trace_mask
+    from src.utils.mask_ops import filter_speckles
+
+    _, label_image, colors = quantize_colors(_tiny_image(), 2)
+    label_image = filter_speckles(label_image, 2, len(colors))
+    for mask in get_color_masks(label_image, len(colors)):
+        trace_mask(mask, prefer_potrace=True)
+
+
+def _warm_rasterize() -> None:
+    from src.core.rasterizer import render_sandbox
+
+    # Starts a sandbox worker, which then stays up for real requests
+    render_sandbox.render(_TINY_SVG)
+
+
+def _warm_remove_background() -> None:
+    from src.core.background import remove_background
+
+    remove_background(_tiny_image(), method="kmeans")
+
+
+_WARMERS = {
+    "vectorize": _warm_vectorize,
+    "rasterize": _warm_rasterize,
+    "remove_background": _warm_remove_background,
+}
+
+
+def warm_up(backends: Iterable[str] = BACKENDS) -> Dict[str, Union[float, str]]:
+    """
+    Import and exercise the heavy backends once.
+    
+    Args:
+        backends: Backends to warm (subset of ``BACKENDS``)
+        
+    Returns:
+        Dict mapping each backend to its warm-up time in ms, or to an error
+        message if it could not be loaded
+    """
+    results: Dict[str, Union[float, str]] = {}
+    for name in backends:
+        start = time.perf_counter()
+        try:
+            _WARMERS[name]()
+        except Exception as e:  # noqa: BLE001 - reported to the caller
+            results[name] = f"error: {e}"
+        else:
+            results[name] = round((time.perf_counter() - start) * 1000.0, 1)
+    return results
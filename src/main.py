@@ -1,16 +1,29 @@
 """
 FastAPI entry point for image processing backend.
+
+Heavy numerical libraries are imported on first use, so importing this module
+stays cheap. Set ``EKTOOLS_WARMUP=1`` to load and exercise them at startup.
 """
+import os
+
 from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
-import yaml
 
+from src.core.background import segment_sandbox
+from src.core.compression import CompressionMiddleware
 from src.core.limiter import limiter
+from src.core.profiling import ProfilingMiddleware, profile_token
+from src.core.rasterizer import render_sandbox
+from src.core.result_cache import result_cache
+from src.core.single_flight import single_flight
+from src.core.warmup import warm_up
 from src.api.vectorize import router as vectorize_router
 from src.api.rasterize import router as rasterize_router
 from src.api.remove_bg import router as remove_bg_router
+from src.api.admin import router as admin_router
 
 app = FastAPI(
     title="EK Tools Image Backend",
@@ -22,6 +35,13 @@ app = FastAPI(
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
+# Per-request profiling, only installed when a profiling token is configured
+if profile_token():
+    app.add_middleware(ProfilingMiddleware)
+
+# Compress SVG and JSON responses for clients that accept it
+app.add_middleware(CompressionMiddleware)
+
 # CORS middleware
 # Only allow from *.eklab.xyz and localhost
 origins = [
@@ -42,12 +62,25 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-Colors",
+        "X-Palette",
+        "X-Palette-Source",
+        "X-Detail",
+        "X-Trace-Size",
+        "X-Buffer-Bytes",
+        "X-RSS-Bytes",
+        "X-Result-Cache",
+        "X-Degraded",
+        "X-Preview-Size",
+    ],
 )
 
 # Register routers
 app.include_router(vectorize_router, prefix="/vectorize", tags=["vectorize"])
 app.include_router(rasterize_router, prefix="/rasterize", tags=["rasterize"])
 app.include_router(remove_bg_router, prefix="/remove-background", tags=["remove-background"])
+app.include_router(admin_router, prefix="/admin", tags=["admin"], include_in_schema=False)
 
 
 @app.get("/")
@@ -63,12 +96,37 @@ async def health(request: Request):
     """Health check endpoint."""
     return {"status": "healthy"}
 
+
+@app.get("/metrics")
+@limiter.limit("100/minute")
+async def metrics(request: Request):
+    """Per-worker request coalescing and result cache counters."""
+    return {
+        "single_flight": single_flight.stats(),
+        "result_cache": result_cache.stats(),
+    }
+
+
+@app.post("/warmup")
+@limiter.limit("10/minute")
+async def warmup(request: Request):
+    """Load and exercise the heavy processing backends."""
+    timings = await run_in_threadpool(warm_up)
+    return {"status": "warm", "backends_ms": timings}
+
+
 @app.on_event("startup")
-async def generate_openapi():
-    """Generate OpenAPI specification file on startup."""
-    openapi_schema = app.openapi()
-    with open("openapi.yaml", "w") as f:
-        yaml.dump(openapi_schema, f, sort_keys=False)
+async def warm_backends():
+    """Warm the processing backends before serving when EKTOOLS_WARMUP is set."""
+    if os.environ.get("EKTOOLS_WARMUP", "").lower() in ("1", "true", "yes"):
+        await run_in_threadpool(warm_up)
+
+
+@app.on_event("shutdown")
+async def stop_render_workers():
+    """Stop the idle render and segmentation sandbox workers."""
+    render_sandbox.close()
+    segment_sandbox.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,285 @@
+"""
+Preforking server for production.
+
+The master process pins BLAS/OpenMP thread counts, imports the application and
+the heavy numerical libraries once, then forks the workers. Workers share
+those pages copy-on-write instead of each importing (and holding) their own
+copy, and each worker keeps its own warm caches for its whole lifetime. Dead
+workers are replaced; SIGTERM/SIGINT shut everything down gracefully.
+
+Usage:
+    python -m src.serve --host 0.0.0.0 --port 8000 --workers 4
+
+``uvicorn --workers`` spawns fresh interpreters rather than forking, so it
+gets neither the shared pages nor the preloaded imports.
+"""
+import argparse
+import asyncio
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger("ektools.serve")
+
+# Environment variables read by the BLAS/OpenMP runtimes when they load.
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "BLIS_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+# Modules imported in the master so workers inherit them already loaded.
+PRELOAD_MODULES = (
+    "numpy",
+    "cv2",
+    "sklearn.cluster",
+    "cairosvg",
+)
+
+# A worker that dies sooner than this after starting is considered crashing;
+# respawns are then delayed so a broken deploy does not fork in a tight loop.
+MIN_WORKER_LIFETIME = 1.0
+RESPAWN_DELAY = 1.0
+
+
+def default_workers() -> int:
+    """Number of workers from ``EKTOOLS_WORKERS``, defaulting to the CPU count."""
+    value = os.environ.get("EKTOOLS_WORKERS")
+    if value:
+        return max(1, int(value))
+    return max(1, os.cpu_count() or 1)
+
+
+def threads_per_worker(workers: int, cpus: Optional[int] = None) -> int:
+    """
+    Split the available cores evenly between workers.
+
+    Args:
+        workers: Number of worker processes
+        cpus: Available cores (defaults to ``os.cpu_count()``)
+
+    Returns:
+        Native threads each worker may use, at least 1
+    """
+    cpus = cpus or os.cpu_count() or 1
+    return max(1, cpus // max(1, workers))
+
+
+def pin_thread_env(threads: int) -> Dict[str, str]:
+    """
+    Limit BLAS/OpenMP thread pools through the environment.
+
+    Must run before numpy/scikit-learn are imported; the runtimes size their
+    pools when they load. Values already set by the operator are kept.
+
+    Args:
+        threads: Threads per pool
+
+    Returns:
+        The thread variables as they are now set
+    """
+    for name in THREAD_ENV_VARS:
+        os.environ.setdefault(name, str(threads))
+    return {name: os.environ[name] for name in THREAD_ENV_VARS}
+
+
+def preload() -> None:
+    """Import the application and the heavy libraries in the master process."""
+    import importlib
+
+    import src.main  # noqa: F401
+
+    for name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(name)
+        except Exception as e:  # noqa: BLE001 - optional backends may be missing
+            logger.warning("Could not preload %s: %s", name, e)
+
+
+def limit_worker_threads(threads: int) -> None:
+    """
+    Apply the per-worker thread limit to pools that ignore the environment.
+
+    Args:
+        threads: Threads per pool
+    """
+    try:
+        import cv2
+        cv2.setNumThreads(threads)
+    except ImportError:
+        pass
+
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return
+    threadpool_limits(limits=threads)
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """Create the listening socket shared by all workers."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(sock: socket.socket, threads: int, warmup: bool, log_level: str) -> None:
+    """Body of a forked worker; never returns."""
+    import uvicorn
+
+    from src.main import app
+
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    limit_worker_threads(threads)
+
+    # Warm state is built after the fork, by the app's startup hook: OpenMP
+    # and BLAS thread pools do not survive fork(), so no compute may run in
+    # the master.
+    os.environ["EKTOOLS_WARMUP"] = "1" if warmup else "0"
+
+    config = uvicorn.Config(app, log_level=log_level, lifespan="on")
+    server = uvicorn.Server(config)
+    exit_code = 0
+    try:
+        asyncio.run(server.serve(sockets=[sock]))
+    except Exception:  # noqa: BLE001 - logged, worker is respawned
+        logger.exception("Worker %d crashed", os.getpid())
+        exit_code = 1
+    finally:
+        os._exit(exit_code)
+
+
+class Master:
+    """
+    Fork and supervise worker processes sharing one listening socket.
+
+    Args:
+        sock: Bound, listening socket
+        workers: Number of worker processes
+        threads: Native threads per worker
+        warmup: Run the backend warm-up in each worker before serving
+        log_level: Uvicorn log level for the workers
+    """
+
+    def __init__(self, sock: socket.socket, workers: int, threads: int, warmup: bool = False, log_level: str = "info"):
+        self.sock = sock
+        self.workers = workers
+        self.threads = threads
+        self.warmup = warmup
+        self.log_level = log_level
+        self.children: Dict[int, float] = {}
+        self.stopping = False
+
+    def spawn(self) -> int:
+        """Fork one worker and return its pid."""
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(self.sock, self.threads, self.warmup, self.log_level)
+        self.children[pid] = time.monotonic()
+        logger.info("Started worker %d", pid)
+        return pid
+
+    def _handle_stop(self, signum, frame) -> None:
+        self.stopping = True
+
+    def _reap(self) -> None:
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.children.clear()
+                return
+            if pid == 0:
+                return
+            started = self.children.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+            logger.warning("Worker %d exited with status %d, restarting", pid, os.waitstatus_to_exitcode(status))
+            if time.monotonic() - started < MIN_WORKER_LIFETIME:
+                time.sleep(RESPAWN_DELAY)
+            self.spawn()
+
+    def shutdown(self, timeout: float = 30.0) -> None:
+        """Ask workers to finish in-flight requests, then kill stragglers."""
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                self.children.pop(pid, None)
+
+        deadline = time.monotonic() + timeout
+        while self.children and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.05)
+
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        self.children.clear()
+
+    def run(self) -> None:
+        """Start the workers and supervise them until SIGTERM/SIGINT."""
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+
+        # Move everything imported so far out of the collector's reach so the
+        # first GC pass in a worker does not touch (and copy) every shared page.
+        gc.collect()
+        gc.freeze()
+
+        for _ in range(self.workers):
+            self.spawn()
+
+        while not self.stopping:
+            self._reap()
+            time.sleep(0.2)
+
+        logger.info("Shutting down %d workers", len(self.children))
+        self.shutdown()
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Preforking server for the image backend")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: EKTOOLS_WORKERS or CPU count)")
+    parser.add_argument("--threads", type=int, default=None, help="Native threads per worker (default: CPUs / workers)")
+    parser.add_argument("--no-warmup", action="store_true", help="Skip the per-worker backend warm-up")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    workers = args.workers or default_workers()
+    threads = args.threads or threads_per_worker(workers)
+
+    if "numpy" in sys.modules:
+        logger.warning("numpy was imported before thread limits were set; BLAS may oversubscribe")
+    pin_thread_env(threads)
+    preload()
+
+    sock = bind_socket(args.host, args.port)
+    logger.info("Listening on %s:%d with %d workers x %d threads", args.host, args.port, workers, threads)
+    Master(sock, workers, threads, warmup=not args.no_warmup, log_level=args.log_level).run()
+    sock.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
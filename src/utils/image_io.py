@@ -2,22 +2,30 @@
 Image I/O utilities for loading and saving images.
 """
 import io
-from typing import Tuple
+import struct
+import zlib
+from typing import Optional, Tuple
 import numpy as np
 from PIL import Image
-import cv2
 
+from src.core.buffers import Arena
 
-def load_image_from_bytes(image_bytes: bytes) -> Tuple[np.ndarray, Image.Image]:
+
+def load_image_from_bytes(
+    image_bytes: bytes, arena: Optional[Arena] = None
+) -> Tuple[np.ndarray, Image.Image]:
     """
     Load image from bytes into both OpenCV and PIL formats.
     
     Args:
         image_bytes: Image file bytes
+        arena: Optional buffer arena to take the BGR array from
         
     Returns:
         Tuple of (opencv_image, pil_image)
     """
+    import cv2
+
     # Load with PIL
     pil_image = Image.open(io.BytesIO(image_bytes))
     
@@ -26,7 +34,11 @@ def load_image_from_bytes(image_bytes: bytes) -> Tuple[np.ndarray, Image.Image]:
         pil_image = pil_image.convert("RGB")
     
     # Convert to OpenCV format (BGR)
-    opencv_image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
+    rgb = np.asarray(pil_image)
+    if arena is not None:
+        opencv_image = cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR, dst=arena.empty(rgb.shape, np.uint8))
+    else:
+        opencv_image = cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
     
     return opencv_image, pil_image
 
@@ -57,6 +69,8 @@ def numpy_to_pil(image: np.ndarray) -> Image.Image:
     Returns:
         PIL Image in RGB format
     """
+    import cv2
+
     # Convert BGR to RGB
     if len(image.shape) == 3:
         image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
@@ -65,3 +79,59 @@ def numpy_to_pil(image: np.ndarray) -> Image.Image:
     
     return Image.fromarray(image_rgb)
 
+
+class PNGStreamEncoder:
+    """
+    Incremental PNG encoder for 8-bit RGBA images delivered in row strips.
+
+    Only the zlib state and the current strip are held in memory, so
+    arbitrarily tall images can be written while they are produced. Rows use
+    the Sub filter, which turns flat color runs into zeros for deflate.
+
+    Args:
+        width: Image width in pixels
+        height: Image height in pixels
+        level: zlib compression level
+    """
+
+    def __init__(self, width: int, height: int, level: int = 6):
+        self.width = width
+        self.height = height
+        self._rows = 0
+        self._compressor = zlib.compressobj(level)
+
+    @staticmethod
+    def _chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    def header(self) -> bytes:
+        """PNG signature and IHDR chunk."""
+        ihdr = struct.pack(">IIBBBBB", self.width, self.height, 8, 6, 0, 0, 0)
+        return b"\x89PNG\r\n\x1a\n" + self._chunk(b"IHDR", ihdr)
+
+    def encode(self, rgba: np.ndarray) -> bytes:
+        """
+        Compress the next rows.
+
+        Args:
+            rgba: (rows, width, 4) uint8 straight-alpha RGBA
+
+        Returns:
+            IDAT chunk bytes (possibly empty while zlib buffers input)
+        """
+        rows = rgba.reshape(rgba.shape[0], self.width * 4)
+        filtered = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+        filtered[:, 0] = 1  # Sub filter
+        filtered[:, 1:5] = rows[:, :4]
+        np.subtract(rows[:, 4:], rows[:, :-4], out=filtered[:, 5:])
+        self._rows += rows.shape[0]
+
+        data = self._compressor.compress(filtered.tobytes())
+        return self._chunk(b"IDAT", data) if data else b""
+
+    def finish(self) -> bytes:
+        """Flush the compressor and end the file."""
+        if self._rows != self.height:
+            raise ValueError(f"Encoded {self._rows} of {self.height} rows")
+        data = self._compressor.flush()
+        return (self._chunk(b"IDAT", data) if data else b"") + self._chunk(b"IEND", b"")
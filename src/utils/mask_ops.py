@@ -1,9 +1,14 @@
 """
 Mask operations for image processing.
 """
-from typing import Tuple
+from typing import Optional, Tuple
 import numpy as np
-import cv2
+
+from src.core.buffers import Arena, allocator
+
+# Regions smaller than this many pixels are merged into their neighbours
+# before tracing (Potrace's turdsize, applied to every backend)
+DEFAULT_SPECKLE_AREA = 5
 
 
 def create_binary_mask(mask: np.ndarray) -> np.ndarray:
@@ -30,6 +35,8 @@ def get_largest_contour(mask: np.ndarray) -> np.ndarray:
     Returns:
         Largest contour or None
     """
+    import cv2
+
     contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     if not contours:
         return None
@@ -67,6 +74,8 @@ def apply_mask(image: np.ndarray, mask: np.ndarray) -> np.ndarray:
     Returns:
         Image with alpha channel
     """
+    import cv2
+
     # Convert to RGBA
     if len(image.shape) == 2:
         image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
@@ -78,3 +87,66 @@ def apply_mask(image: np.ndarray, mask: np.ndarray) -> np.ndarray:
     
     return rgba
 
+
+
+def filter_speckles(
+    label_image: np.ndarray, min_area: int, n_labels: int, arena: Optional[Arena] = None
+) -> np.ndarray:
+    """
+    Merge small connected regions into their surrounding labels.
+    
+    Regions are found per label with 4-connectivity (matching how the
+    tracers separate diagonal pixels). Every pixel of a region smaller than
+    ``min_area`` is then relabeled in one pass from its nearest surviving
+    pixel, so specks take the color of whatever encloses or borders them.
+    
+    Args:
+        label_image: Image with cluster labels (H, W)
+        min_area: Regions with fewer pixels than this are merged (<= 1 disables)
+        n_labels: Number of labels in the image
+        arena: Optional buffer arena to take the working images from
+        
+    Returns:
+        Filtered label image (the input is returned unchanged if nothing is merged)
+    """
+    import cv2
+
+    if min_area <= 1:
+        return label_image
+    
+    empty = allocator(arena)
+    shape = label_image.shape
+    mask = empty(shape, np.uint8)
+    components = empty(shape, np.int32)
+    speck_pixels = empty(shape, np.uint8)
+    specks = empty(shape, np.uint8)
+    specks.fill(0)
+    for label in range(n_labels):
+        np.equal(label_image, label, out=mask.view(bool))
+        _, components, stats, _ = cv2.connectedComponentsWithStats(
+            mask, labels=components, connectivity=4, ltype=cv2.CV_32S
+        )
+        small = stats[:, cv2.CC_STAT_AREA] < min_area
+        small[0] = False  # component 0 is everything outside this label
+        if small.any():
+            np.take(small.view(np.uint8), components, out=speck_pixels, mode="clip")
+            specks |= speck_pixels
+    
+    if not specks.any() or specks.all():
+        return label_image
+    
+    # For every speck pixel, find the nearest non-speck pixel; each non-speck
+    # pixel gets its own label in ``nearest``
+    _, nearest = cv2.distanceTransformWithLabels(
+        specks,
+        cv2.DIST_L1,
+        3,
+        dst=empty(shape, np.float32),
+        labels=components,
+        labelType=cv2.DIST_LABEL_PIXEL,
+    )
+    survivors = np.equal(specks, 0, out=mask.view(bool))
+    lookup = np.zeros(int(nearest.max()) + 1, dtype=label_image.dtype)
+    lookup[nearest[survivors]] = label_image[survivors]
+    
+    return np.take(lookup, nearest, out=empty(shape, label_image.dtype), mode="clip")
@@ -3,7 +3,9 @@ File validation utilities for image processing endpoints.
 """
 import os
 from typing import Optional
-from fastapi import UploadFile, HTTPException
+from fastapi import UploadFile, HTTPException, Request
+
+from src.core.deadline import Deadline
 
 
 def validate_png_file(file: UploadFile) -> None:
@@ -107,6 +109,39 @@ def validate_file_size(file_size: int, max_size_mb: int) -> None:
         )
 
 
+def parse_deadline(request: Request, deadline_ms: Optional[int], degrade: bool) -> Deadline:
+    """
+    Build the request's deadline from the form value or X-Deadline-Ms header.
+    
+    Args:
+        request: Incoming request
+        deadline_ms: Form value in milliseconds (takes precedence)
+        degrade: Whether quality may be lowered to meet the deadline
+        
+    Returns:
+        Deadline (without a time limit if neither is given)
+        
+    Raises:
+        HTTPException: If the deadline is not a positive integer
+    """
+    if deadline_ms is None:
+        header = request.headers.get("x-deadline-ms")
+        if header is not None:
+            try:
+                deadline_ms = int(header)
+            except ValueError:
+                raise HTTPException(
+                    status_code=400,
+                    detail="X-Deadline-Ms must be an integer number of milliseconds"
+                )
+    if deadline_ms is not None and deadline_ms <= 0:
+        raise HTTPException(
+            status_code=400,
+            detail="deadline_ms must be positive"
+        )
+    return Deadline(None if deadline_ms is None else deadline_ms / 1000.0, degrade=degrade)
+
+
 async def get_file_size(file: UploadFile) -> int:
     """
     Get the size of an uploaded file.
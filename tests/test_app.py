@@ -0,0 +1,61 @@
+"""
+Tests for application startup behaviour and service endpoints.
+"""
+import subprocess
+import sys
+from pathlib import Path
+
+import yaml
+from fastapi.testclient import TestClient
+
+from src.main import app
+
+client = TestClient(app)
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_import_does_not_load_heavy_backends():
+    """Importing the app must not pull in the numerical libraries."""
+    code = (
+        "import sys, src.main; "
+        "print(','.join(m for m in ('sklearn', 'skimage', 'cv2', 'cairosvg') if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert result.stdout.strip() == ""
+
+
+def test_openapi_spec_is_current():
+    """openapi.yaml is regenerated with scripts/export_openapi.py."""
+    with open(REPO_ROOT / "openapi.yaml", encoding="utf-8") as f:
+        committed = yaml.safe_load(f)
+
+    assert committed == app.openapi()
+
+
+def test_warmup_endpoint():
+    """The warmup endpoint reports every backend."""
+    response = client.post("/warmup")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "warm"
+    assert set(body["backends_ms"]) == {"vectorize", "rasterize", "remove_background"}
+    assert isinstance(body["backends_ms"]["vectorize"], float)
+
+
+def test_metrics_endpoint():
+    """The metrics endpoint reports coalescing and result cache counters."""
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert set(body["single_flight"]) == {"leaders", "coalesced", "abandoned", "in_flight"}
+    assert set(body["result_cache"]) == {"entries", "bytes", "hits", "misses"}
@@ -0,0 +1,33 @@
+"""
+Tests for the offline batch tool.
+"""
+from PIL import Image
+
+from src.batch import run_batch
+
+
+def _write_png(path, color):
+    image = Image.new("RGB", (40, 30), color="white")
+    image.paste(color, (10, 10, 30, 25))
+    image.save(path)
+
+
+def test_batch_skips_unchanged_inputs(tmp_path):
+    """Re-runs only process inputs whose content or options changed."""
+    source = tmp_path / "in"
+    (source / "nested").mkdir(parents=True)
+    _write_png(source / "a.png", (200, 0, 0))
+    _write_png(source / "nested" / "b.png", (0, 0, 200))
+    output = tmp_path / "out"
+    options = {"colors": 2}
+
+    first = run_batch("vectorize", [str(source)], str(output), options)
+    assert (first["done"], first["skipped"], first["failed"]) == (2, 0, 0)
+    assert "<svg" in (output / "nested" / "b.svg").read_text()
+
+    _write_png(source / "a.png", (0, 160, 0))
+    second = run_batch("vectorize", [str(source)], str(output), options)
+    assert (second["done"], second["skipped"]) == (1, 1)
+
+    third = run_batch("vectorize", [str(source / "**" / "*.png")], str(output), {"colors": 3})
+    assert third["done"] == 2
@@ -0,0 +1,105 @@
+"""
+Tests for the benchmark regression comparison.
+"""
+import pytest
+
+from benchmarks.compare import compare_results
+
+
+def make_report(quantize_ms: float, svg_bytes: int) -> dict:
+    """Create a minimal benchmark report with one case."""
+    return {
+        "meta": {},
+        "results": [
+            {
+                "fixture": "logo",
+                "size": 256,
+                "colors": 8,
+                "stages": {"quantize": {"median_ms": quantize_ms, "min_ms": quantize_ms}},
+                "total_ms": quantize_ms,
+                "peak_rss_mb": 150.0,
+                "output_bytes": {"svg": svg_bytes},
+            }
+        ],
+    }
+
+
+def test_compare_flags_slowdown():
+    """A stage that got slower beyond the threshold is a regression."""
+    findings = compare_results(make_report(100.0, 1000), make_report(150.0, 1000))
+    flagged = {f["metric"] for f in findings if f["regression"]}
+
+    assert "stages.quantize.median_ms" in flagged
+    assert "output_bytes.svg" not in flagged
+
+
+def test_compare_ignores_noise():
+    """Small absolute timing changes are not regressions."""
+    findings = compare_results(make_report(2.0, 1000), make_report(3.0, 1000), min_ms=5.0)
+
+    assert not any(f["regression"] for f in findings)
+
+
+def test_compare_reports_improvement_and_size_growth():
+    """Faster stages are improvements; larger outputs are regressions."""
+    findings = compare_results(make_report(200.0, 1000), make_report(100.0, 2000))
+    by_metric = {f["metric"]: f for f in findings}
+
+    assert by_metric["stages.quantize.median_ms"]["improvement"]
+    assert by_metric["output_bytes.svg"]["regression"]
+
+
+def make_load_report(rps: float, p95_ms: float, error_rate: float) -> dict:
+    """Create a minimal load report with one endpoint record."""
+    return {
+        "meta": {},
+        "results": [
+            {
+                "fixture": "/vectorize",
+                "size": None,
+                "colors": None,
+                "throughput_rps": rps,
+                "error_rate": error_rate,
+                "latency": {"median_ms": 100.0, "p95_ms": p95_ms, "p99_ms": p95_ms},
+            }
+        ],
+    }
+
+
+def test_compare_load_reports():
+    """Lower throughput, higher tail latency and more errors are regressions."""
+    findings = compare_results(make_load_report(10.0, 500.0, 0.0), make_load_report(6.0, 900.0, 0.05))
+    flagged = {f["metric"] for f in findings if f["regression"]}
+
+    assert flagged == {"throughput_rps", "latency.p95_ms", "latency.p99_ms", "error_rate"}
+
+    findings = compare_results(make_load_report(10.0, 500.0, 0.0), make_load_report(14.0, 500.0, 0.0))
+    by_metric = {f["metric"]: f for f in findings}
+    assert by_metric["throughput_rps"]["improvement"]
+    assert not by_metric["throughput_rps"]["regression"]
+
+
+def test_load_mix_and_percentiles():
+    from benchmarks.load import _Recorder, parse_mix, percentile, summarize
+
+    assert parse_mix("vectorize_logo_512:3,remove_bg_photo_512") == {
+        "vectorize_logo_512": 3.0,
+        "remove_bg_photo_512": 1.0,
+    }
+    with pytest.raises(ValueError):
+        parse_mix("no_such_scenario:1")
+
+    values = list(range(1, 101))
+    assert (percentile(values, 50), percentile(values, 95), percentile(values, 99)) == (50, 95, 99)
+
+    mix = {"vectorize_logo_512": 1, "remove_bg_photo_512": 1}
+    recorder = _Recorder(mix)
+    for latency in (10.0, 20.0, 30.0):
+        recorder.record("vectorize_logo_512", "ok", latency)
+    recorder.record("remove_bg_photo_512", "rate_limited", 5.0)
+    records = {r["fixture"]: r for r in summarize(recorder, mix, elapsed=2.0)}
+
+    assert records["/vectorize"]["throughput_rps"] == 1.5
+    assert records["/remove-background"]["rate_limited"] == 1
+    assert records["all"]["requests"] == 4
+    assert records["all"]["error_rate"] == 0.0
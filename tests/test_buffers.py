@@ -0,0 +1,35 @@
+"""
+Tests for the request buffer pool.
+"""
+import numpy as np
+
+from src.core.buffers import BufferPool
+
+
+def test_buffers_are_reused_by_shape_and_dtype():
+    pool = BufferPool(max_bytes=1 << 20)
+
+    with pool.lease() as arena:
+        first = arena.empty((10, 10), np.int32)
+    with pool.lease() as arena:
+        same = arena.empty((10, 10), np.int32)
+        other = arena.empty((10, 10), np.uint8)
+
+    assert same is first
+    assert other is not first
+    assert arena.reused_bytes == first.nbytes
+    assert arena.nbytes == first.nbytes + other.nbytes
+
+
+def test_idle_buffers_stay_within_budget():
+    """Least recently used shapes are dropped once the budget is exceeded."""
+    pool = BufferPool(max_bytes=2500)
+
+    for size in (1000, 1001, 1002):
+        with pool.lease() as arena:
+            arena.empty(size, np.uint8)
+
+    assert pool.stats() == {"buffers": 2, "bytes": 2003}
+    with pool.lease() as arena:
+        arena.empty(1000, np.uint8)
+    assert arena.reused_bytes == 0
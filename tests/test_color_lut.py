@@ -0,0 +1,55 @@
+"""
+Tests for lookup-table color assignment.
+"""
+import numpy as np
+
+from src.core.color_lut import ColorLUT, LUTCache, cell_histogram, cell_index
+
+
+def brute_force(image: np.ndarray, colors: np.ndarray) -> np.ndarray:
+    pixels = image.reshape(-1, 3)[:, ::-1].astype(np.float32)
+    distances = ((pixels[:, None, :] - colors[None, :, :].astype(np.float32)) ** 2).sum(axis=2)
+    return distances.argmin(axis=1)
+
+
+def test_exact_lut_matches_brute_force():
+    """Refined lookups equal brute-force nearest colors, ties included."""
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, (120, 90, 3), dtype=np.uint8)
+    colors = rng.integers(0, 256, (7, 3)).astype(np.uint8)
+    colors[6] = colors[2]  # duplicate entry: ties go to the lower index
+
+    expected = brute_force(image, colors)
+    for bits in (4, 6):
+        lut = ColorLUT(colors, bits)
+        assert np.array_equal(lut.assign(image), expected)
+        assert 0 < lut.ambiguous_fraction < 1
+        # Unrefined lookups are only wrong inside ambiguous cells
+        approximate = lut.assign(image, exact=False)
+        wrong = approximate != expected
+        assert lut.ambiguous[cell_index(image, bits)][wrong].all()
+
+
+def test_cell_histogram_means_and_counts():
+    image = np.zeros((2, 3, 3), dtype=np.uint8)
+    image[0] = (10, 20, 30)
+    image[1, :2] = (11, 20, 30)  # same 4-level cell as 10
+    image[1, 2] = (255, 255, 255)
+
+    means, counts = cell_histogram(image, cell_index(image, 6), 6)
+
+    assert counts.tolist() == [5, 1]
+    assert np.allclose(means[0], (30, 20, 10.4))
+    assert means[1].tolist() == [255, 255, 255]
+
+
+def test_lut_cache_reuses_tables():
+    cache = LUTCache(max_entries=1)
+    palette = [(0, 0, 0), (255, 255, 255)]
+
+    assert cache.get(palette) is cache.get(palette)
+    cache.get([(1, 2, 3), (4, 5, 6)])
+    assert cache.misses == 2 and cache.hits == 1
+    # The first palette was evicted
+    cache.get(palette)
+    assert cache.misses == 3
@@ -0,0 +1,159 @@
+"""
+Tests for response compression and the result cache.
+"""
+import asyncio
+import gzip
+import io
+
+from fastapi.testclient import TestClient
+from PIL import Image, ImageDraw
+from starlette.responses import PlainTextResponse
+
+from src.core import compression, result_cache as result_cache_module
+from src.core.compression import CompressionMiddleware, negotiate
+from src.core.result_cache import CachedResponse, ResultCache, result_cache
+from src.main import app
+
+client = TestClient(app)
+
+
+def create_shapes_png(size: int = 240) -> bytes:
+    img = Image.new("RGB", (size, size), color="white")
+    draw = ImageDraw.Draw(img)
+    colors = ["red", "green", "blue", "orange"]
+    for i in range(24):
+        x, y = (i * 37) % (size - 40), (i * 53) % (size - 40)
+        draw.ellipse((x, y, x + 30 + i % 5 * 4, y + 25 + i % 3 * 6), fill=colors[i % 4])
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_negotiate_encoding():
+    assert negotiate("gzip, deflate") == "gzip"
+    assert negotiate("deflate") is None
+    assert negotiate("gzip;q=0") is None
+    assert negotiate("*") is not None
+    assert negotiate("identity") is None
+    assert negotiate(None) is None
+
+
+def test_svg_response_is_compressed():
+    """Large SVG bodies are gzipped; small JSON bodies are not."""
+    response = client.post(
+        "/vectorize",
+        files={"file": ("shapes.png", create_shapes_png(), "image/png")},
+        data={"colors": "5"},
+        headers={"Accept-Encoding": "gzip"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    # The client decodes transparently
+    assert response.text.startswith("<?xml")
+
+    plain = client.post(
+        "/vectorize",
+        files={"file": ("shapes.png", create_shapes_png(), "image/png")},
+        data={"colors": "5"},
+        headers={"Accept-Encoding": "identity"},
+    )
+    assert "content-encoding" not in plain.headers
+    assert plain.text == response.text
+
+    health = client.get("/health", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in health.headers
+
+
+def test_result_cache_serves_stored_compressed_body(monkeypatch):
+    monkeypatch.setattr(result_cache, "max_bytes", 1 << 20)
+    result_cache.clear()
+    request = dict(
+        files={"file": ("shapes.png", create_shapes_png(), "image/png")},
+        data={"colors": "4"},
+        headers={"Accept-Encoding": "gzip"},
+    )
+
+    first = client.post("/vectorize", **request)
+    second = client.post("/vectorize", **request)
+
+    assert first.headers["x-result-cache"] == "miss"
+    assert second.headers["x-result-cache"] == "hit"
+    assert second.headers["content-encoding"] == "gzip"
+    assert second.text == first.text
+    # Vary names the encoding once, and a hit reports no run of its own
+    for response in (first, second):
+        vary = [token.strip() for token in response.headers["vary"].split(",")]
+        assert vary.count("Accept-Encoding") == 1
+    assert "x-palette-source" in first.headers
+    assert "x-palette-source" not in second.headers
+    assert "x-buffer-bytes" not in second.headers
+    assert second.headers["x-palette"] == first.headers["x-palette"]
+    result_cache.clear()
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def test_large_bodies_compress_off_the_event_loop(monkeypatch):
+    """Neither a cache miss nor the middleware compresses a large body on the loop."""
+    loop_calls = []
+    original_compress = result_cache_module.compress
+    original_compressor = compression.compressor
+
+    def compress(data, encoding):
+        loop_calls.append(_on_event_loop())
+        return original_compress(data, encoding)
+
+    def compressor(encoding):
+        engine = original_compressor(encoding)
+        feed = engine.compress
+
+        def checked(data):
+            if len(data) >= compression.OFFLOAD_SIZE:
+                loop_calls.append(_on_event_loop())
+            return feed(data)
+
+        engine.compress = checked
+        return engine
+
+    monkeypatch.setattr(result_cache_module, "compress", compress)
+    monkeypatch.setattr(compression, "compressor", compressor)
+
+    monkeypatch.setattr(result_cache, "max_bytes", 1 << 20)
+    result_cache.clear()
+    response = client.post(
+        "/vectorize",
+        files={"file": ("shapes.png", create_shapes_png(), "image/png")},
+        data={"colors": "3"},
+        headers={"Accept-Encoding": "gzip"},
+    )
+    result_cache.clear()
+    assert response.headers["content-encoding"] == "gzip"
+
+    async def large(scope, receive, send):
+        await PlainTextResponse("x" * (4 * compression.OFFLOAD_SIZE))(scope, receive, send)
+
+    response = TestClient(CompressionMiddleware(large)).get("/", headers={"Accept-Encoding": "gzip"})
+    assert response.text == "x" * (4 * compression.OFFLOAD_SIZE)
+
+    assert len(loop_calls) == 2 and not any(loop_calls)
+
+
+def test_result_cache_evicts_within_budget():
+    cache = ResultCache(max_bytes=3000)
+    for name in "abc":
+        cache.put(name, CachedResponse(bytes(1200), "text/plain", {}))
+
+    assert cache.get("a") is None
+    assert cache.get("c") is not None
+
+    # Compressed forms count against the budget
+    body, encoding = cache.get("c").body_for("gzip")
+    assert encoding == "gzip" and gzip.decompress(body) == bytes(1200)
+    assert cache.nbytes == 2400 + len(body)
@@ -0,0 +1,100 @@
+"""
+Tests for the binary mask contour tracer.
+"""
+import numpy as np
+
+from src.core.contours import find_binary_contours, find_label_boundaries
+
+
+def polygon_area(points: np.ndarray) -> float:
+    """Signed shoelace area; positive for clockwise on screen."""
+    x, y = points[:, 0], points[:, 1]
+    return 0.5 * float(np.sum(x * np.roll(y, -1) - np.roll(x, -1) * y))
+
+
+def test_square_with_hole():
+    """An outline and its hole come out with opposite orientations."""
+    mask = np.zeros((6, 6), dtype=np.uint8)
+    mask[1:5, 1:5] = 255
+    mask[2:4, 2:4] = 0
+
+    contours, is_hole = find_binary_contours(mask, midpoints=False)
+
+    assert is_hole.tolist() == [False, True]
+    assert contours[0].tolist() == [[1, 1], [5, 1], [5, 5], [1, 5]]
+    assert polygon_area(contours[0]) == 16
+    assert polygon_area(contours[1]) == -4
+
+
+def test_area_matches_pixel_count():
+    """Outer minus hole areas equal the foreground pixel count."""
+    rng = np.random.default_rng(0)
+    mask = rng.random((40, 50)) > 0.5
+
+    contours, _ = find_binary_contours(mask, midpoints=False)
+
+    assert sum(polygon_area(c) for c in contours) == mask.sum()
+
+
+def test_diagonal_pixels_are_separate():
+    """Foreground is 4-connected: diagonal neighbours trace separately."""
+    mask = np.zeros((4, 4), dtype=bool)
+    mask[1, 1] = mask[2, 2] = True
+
+    contours, is_hole = find_binary_contours(mask)
+
+    assert len(contours) == 2
+    assert not is_hole.any()
+
+
+def test_packed_input_matches_unpacked():
+    rng = np.random.default_rng(1)
+    mask = rng.random((13, 21)) > 0.5
+
+    unpacked, _ = find_binary_contours(mask)
+    packed, _ = find_binary_contours(np.packbits(mask, axis=1), width=21)
+
+    assert len(unpacked) == len(packed)
+    assert all(np.array_equal(a, b) for a, b in zip(unpacked, packed))
+
+
+def test_label_boundaries_share_chains():
+    """Both regions along a border walk the same chain in opposite directions."""
+    labels = np.zeros((8, 8), dtype=np.int32)
+    labels[4:, :4] = 1
+    labels[4:, 4:] = 2
+
+    bounds = find_label_boundaries(labels)
+
+    chains = {}
+    for piece, key in enumerate(bounds.piece_keys.tolist()):
+        chain = bounds.points[bounds.piece_offsets[piece] : bounds.piece_offsets[piece + 1]]
+        chains.setdefault(key, []).append(chain)
+
+    shared = [pair for pair in chains.values() if len(pair) == 2]
+    # 0|1, 0|2 and 1|2 meet at the T junction (4, 4)
+    assert len(shared) == 3
+    for first, second in shared:
+        assert np.array_equal(first, second[::-1])
+    assert bounds.cycle_labels.tolist() == [0, 1, 2]
+
+
+def test_island_is_one_closed_chain():
+    """A region inside another shares one closed chain with its hole."""
+    labels = np.zeros((10, 10), dtype=np.int32)
+    labels[3:7, 3:7] = 1
+
+    bounds = find_label_boundaries(labels, labels=[1])
+
+    assert bounds.cycle_labels.tolist() == [1]
+    assert bounds.piece_closed.tolist() == [True]
+
+
+def test_empty_requested_label_traces_nothing():
+    """A requested label without pixels must not pick up the padding frame."""
+    labels = np.zeros((6, 6), dtype=np.int32)
+    labels[:, 3:] = 1
+
+    bounds = find_label_boundaries(labels, labels=[0, 1, 2])
+
+    assert bounds.cycle_labels.tolist() == [0, 1]
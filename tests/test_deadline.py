@@ -0,0 +1,118 @@
+"""
+Tests for request deadlines, cancellation and quality degradation.
+"""
+import asyncio
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image, ImageDraw
+
+from src.core import pipeline
+from src.core.deadline import Deadline, DeadlineExceeded, RequestCancelled, watch_disconnect
+from src.main import app
+
+client = TestClient(app)
+
+
+def create_test_png(size: int = 512) -> bytes:
+    img = Image.new("RGB", (size, size), color="white")
+    draw = ImageDraw.Draw(img)
+    for i, color in enumerate(["red", "green", "blue", "orange", "purple", "gray"]):
+        x = i * size // 6
+        draw.rectangle((x, size // 8, x + size // 12, size - size // 8), fill=color)
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_deadline_check():
+    Deadline().check("decode")
+    Deadline(60).check("decode")
+
+    with pytest.raises(DeadlineExceeded):
+        Deadline(0).check("decode")
+
+    cancelled = Deadline(60)
+    cancelled.cancel()
+    with pytest.raises(RequestCancelled):
+        cancelled.check("decode")
+
+    assert not Deadline(60).should_degrade(1e9)
+    assert Deadline(60, degrade=True).should_degrade(1e9)
+    assert not Deadline(degrade=True).should_degrade(1e9)
+
+
+def test_cancelled_pipeline_stops():
+    deadline = Deadline()
+    deadline.cancel()
+
+    with pytest.raises(RequestCancelled):
+        pipeline.vectorize_image(create_test_png(), colors=4, deadline=deadline)
+
+
+def test_vectorize_degrades_to_meet_deadline(monkeypatch):
+    # Make every image look far too expensive for the budget
+    monkeypatch.setattr(pipeline, "VECTORIZE_SECONDS_PER_MEGAPIXEL", 1e6)
+    deadline = Deadline(60, degrade=True)
+
+    result = pipeline.vectorize_image(create_test_png(), colors=16, deadline=deadline)
+
+    assert deadline.degradations == ["colors=8", "trace_size=256x256"]
+    assert len(result.colors) == 8
+    assert result.trace_size == (256, 256)
+    assert (result.width, result.height) == (512, 512)
+
+
+def test_vectorize_reports_degradation(monkeypatch):
+    monkeypatch.setattr(pipeline, "VECTORIZE_SECONDS_PER_MEGAPIXEL", 1e6)
+
+    response = client.post(
+        "/vectorize",
+        files={"file": ("test.png", create_test_png(), "image/png")},
+        data={"colors": "auto", "deadline_ms": "60000", "degrade": "true"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["x-degraded"] == "colors=8,trace_size=256x256"
+    assert response.headers["x-trace-size"] == "256x256"
+
+
+def test_remove_background_falls_back_to_kmeans(monkeypatch):
+    monkeypatch.setattr(pipeline, "GRABCUT_SECONDS_PER_MEGAPIXEL", 1e6)
+
+    response = client.post(
+        "/remove-background",
+        files={"file": ("test.png", create_test_png(128), "image/png")},
+        data={"method": "grabcut", "degrade": "true"},
+        headers={"X-Deadline-Ms": "60000"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["x-degraded"] == "method=kmeans"
+
+
+def test_invalid_deadline_rejected():
+    response = client.post(
+        "/vectorize",
+        files={"file": ("test.png", create_test_png(64), "image/png")},
+        data={"colors": "4"},
+        headers={"X-Deadline-Ms": "0"},
+    )
+
+    assert response.status_code == 400
+
+
+def test_disconnect_cancels_work():
+    class DisconnectedRequest:
+        async def is_disconnected(self):
+            return True
+
+    deadline = Deadline()
+
+    async def main():
+        await watch_disconnect(DisconnectedRequest(), asyncio.sleep(5), deadline.cancel, interval=0.01)
+
+    with pytest.raises(RequestCancelled):
+        asyncio.run(main())
+    assert deadline.cancelled
@@ -0,0 +1,29 @@
+"""
+Tests for mask operations.
+"""
+import numpy as np
+
+from src.utils.mask_ops import filter_speckles
+
+
+def test_filter_speckles_merges_small_regions():
+    """Regions below the minimum area take their neighbours' label."""
+    labels = np.zeros((10, 10), dtype=np.int32)
+    labels[5:, :] = 1
+    labels[2, 2] = 1  # single pixel of label 1 inside label 0
+    labels[7, 7] = 0  # single pixel of label 0 inside label 1
+
+    filtered = filter_speckles(labels, min_area=2, n_labels=2)
+
+    expected = np.zeros((10, 10), dtype=np.int32)
+    expected[5:, :] = 1
+    assert np.array_equal(filtered, expected)
+
+
+def test_filter_speckles_keeps_large_regions():
+    """Regions at or above the minimum area are untouched."""
+    labels = np.zeros((10, 10), dtype=np.int32)
+    labels[2:4, 2:4] = 1
+
+    assert np.array_equal(filter_speckles(labels, min_area=4, n_labels=2), labels)
+    assert filter_speckles(labels, min_area=0, n_labels=2) is labels
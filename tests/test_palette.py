@@ -0,0 +1,53 @@
+"""
+Tests for palette parsing, assignment and caching.
+"""
+import numpy as np
+import pytest
+
+from src.core.palette import (
+    PaletteCache,
+    assign_palette,
+    format_palette,
+    image_fingerprint,
+    parse_palette,
+)
+
+
+def test_palette_round_trip():
+    """Formatted palettes parse back to the same colors."""
+    colors = [(255, 0, 0), (0, 128, 255)]
+
+    assert parse_palette(format_palette(colors)) == colors
+    assert parse_palette("FF0000, #0080ff") == colors
+
+
+def test_parse_palette_rejects_garbage():
+    """Malformed entries raise ValueError."""
+    with pytest.raises(ValueError):
+        parse_palette("#ff0000,#12345")
+
+
+def test_assign_palette_nearest_color():
+    """Pixels map to their nearest palette entry."""
+    image = np.array([[[10, 0, 250], [240, 250, 5]]], dtype=np.uint8)  # BGR
+
+    _, labels, colors = assign_palette(image, [(0, 0, 255), (255, 0, 0)])
+
+    assert labels.tolist() == [[1, 0]]
+    assert colors == [(0, 0, 255), (255, 0, 0)]
+
+
+def test_cache_matches_similar_images():
+    """A near-identical image reuses the cached palette."""
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, size=(64, 64, 3), dtype=np.uint8)
+    variant = image.copy()
+    variant[:2, :2] = 0
+
+    cache = PaletteCache()
+    cache.put(image_fingerprint(image), [(1, 2, 3), (4, 5, 6)])
+
+    cached = cache.get(image_fingerprint(variant), 2)
+    assert cached is not None
+    assert cached.tolist() == [[1, 2, 3], [4, 5, 6]]
+    assert cache.get(image_fingerprint(variant), 3) is None
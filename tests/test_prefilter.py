@@ -0,0 +1,23 @@
+"""
+Tests for pre-quantization smoothing.
+"""
+import numpy as np
+
+from src.core.prefilter import PREFILTERS, prefilter_image
+from src.core.quantize import color_histogram
+
+
+def test_prefilters_reduce_noise_colors():
+    """Noise on a flat two-color image collapses into fewer distinct colors."""
+    rng = np.random.default_rng(0)
+    image = np.full((64, 64, 3), 200, dtype=np.uint8)
+    image[:, 32:] = (40, 60, 180)
+    noisy = np.clip(image + rng.integers(-6, 7, image.shape), 0, 255).astype(np.uint8)
+
+    before = len(color_histogram(noisy)[0])
+    for method in PREFILTERS[1:]:
+        filtered = prefilter_image(noisy, method)
+        assert filtered.shape == noisy.shape
+        assert len(color_histogram(filtered)[0]) < before
+
+    assert prefilter_image(noisy, "none") is noisy
@@ -0,0 +1,96 @@
+"""
+Tests for PNG previews rendered from traced paths.
+"""
+import base64
+import io
+
+import numpy as np
+from fastapi.testclient import TestClient
+from PIL import Image, ImageDraw
+
+from src.core.preview import path_to_polygons, preview_size_for, render_preview
+from src.main import app
+
+client = TestClient(app)
+
+
+def create_test_png(width: int = 160, height: int = 80) -> bytes:
+    img = Image.new("RGB", (width, height), color="white")
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((10, 10, width // 2, height - 10), fill="red")
+    draw.ellipse((width // 2 + 10, 10, width - 10, height - 10), fill="blue")
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_path_to_polygons():
+    """Absolute and relative commands, implicit repeats and several subpaths."""
+    polygons = path_to_polygons("M0 0l10 0 0 10-10 0zM20 20H30V30L20 30z")
+    assert len(polygons) == 2
+    np.testing.assert_allclose(polygons[0], [[0, 0], [10, 0], [10, 10], [0, 10]])
+    np.testing.assert_allclose(polygons[1], [[20, 20], [30, 20], [30, 30], [20, 30]])
+
+    # A relative curve ends where its end point says, sampled in between
+    (curve,) = path_to_polygons("M0 0c0 10 10 10 10 0l0-5z", curve_steps=4)
+    assert len(curve) == 1 + 4 + 1
+    np.testing.assert_allclose(curve[4], [10, 0])
+    np.testing.assert_allclose(curve[2], [5, 7.5])
+
+
+def test_render_preview_fills_and_flips():
+    """Paths are y-up like the SVG; holes stay transparent."""
+    square_with_hole = "M0 0l100 0 0 100-100 0zM25 25l0 50 50 0 0-50z"
+    bottom_strip = "M0 0l100 0 0 10-100 0z"
+    paths = [(square_with_hole, (255, 0, 0)), (bottom_strip, (0, 0, 255))]
+
+    bgra = render_preview(paths, (100, 100), (50, 50))
+
+    assert bgra.shape == (50, 50, 4)
+    assert tuple(bgra[10, 5]) == (0, 0, 255, 255)  # red, opaque
+    assert bgra[25, 25, 3] == 0  # the hole
+    assert tuple(bgra[48, 25]) == (255, 0, 0, 255)  # blue, painted last, at the bottom
+
+
+def test_preview_size_keeps_aspect():
+    assert preview_size_for(200, 100, 64) == (64, 32)
+    assert preview_size_for(100, 400, 64) == (16, 64)
+
+
+def test_vectorize_png_and_both_outputs():
+    png_bytes = create_test_png()
+
+    response = client.post(
+        "/vectorize",
+        files={"file": ("test.png", png_bytes, "image/png")},
+        data={"colors": "3", "output": "png", "preview_size": "100"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/png"
+    assert response.headers["x-preview-size"] == "100x50"
+    preview = Image.open(io.BytesIO(response.content))
+    assert preview.size == (100, 50)
+    # Left half red, right half mostly blue
+    assert preview.convert("RGB").getpixel((20, 25)) == (255, 0, 0)
+
+    response = client.post(
+        "/vectorize",
+        files={"file": ("test.png", png_bytes, "image/png")},
+        data={"colors": "3", "output": "both", "preview_size": "40"},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["svg"].startswith("<?xml")
+    preview = Image.open(io.BytesIO(base64.b64decode(body["preview_png"])))
+    assert preview.size == (40, 20)
+
+
+def test_vectorize_invalid_output_options():
+    png_bytes = create_test_png()
+    for data in ({"output": "gif"}, {"output": "png", "preview_size": "8"}):
+        response = client.post(
+            "/vectorize",
+            files={"file": ("test.png", png_bytes, "image/png")},
+            data={"colors": "3", **data},
+        )
+        assert response.status_code == 400
@@ -0,0 +1,125 @@
+"""
+Tests for on-demand request profiling.
+"""
+import io
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from src.api import vectorize as vectorize_api
+from src.core.profiling import ProfilingMiddleware, profile_sampler, profile_store
+from src.main import app
+
+TOKEN = "secret-token"
+
+
+def create_test_png() -> bytes:
+    img = Image.new("RGB", (200, 200), color="white")
+    img.paste((200, 30, 30), (40, 40, 160, 160))
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    """Client for the app wrapped in the profiling middleware, as with a token set."""
+    monkeypatch.setenv("EKTOOLS_PROFILE_TOKEN", TOKEN)
+    monkeypatch.setattr(profile_store, "directory", str(tmp_path))
+    monkeypatch.setattr(profile_store, "keep", 2)
+    monkeypatch.setattr(profile_sampler, "remaining", 0)
+    return TestClient(ProfilingMiddleware(app))
+
+
+def vectorize(client, headers=None):
+    return client.post(
+        "/vectorize",
+        files={"file": ("test.png", create_test_png(), "image/png")},
+        data={"colors": "3"},
+        headers=headers or {},
+    )
+
+
+def admin_headers(token=TOKEN):
+    return {"X-Profile-Token": token}
+
+
+@pytest.mark.parametrize("mode,marker", [("cprofile", "vectorize_image"), ("sample", ";")])
+def test_profile_header_stores_report(client, mode, marker):
+    response = vectorize(client, {"X-Profile-Token": TOKEN, "X-Profile": mode})
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+
+    report = client.get(f"/admin/profiles/{profile_id}", headers=admin_headers())
+    assert report.status_code == 200
+    assert report.text.startswith("# POST /vectorize")
+    assert f"mode={mode}" in report.text
+    if mode == "cprofile":
+        assert marker in report.text
+
+
+def test_concurrent_cprofile_requests(client, monkeypatch):
+    """Overlapping cprofile requests both succeed; the second one is sampled."""
+    barrier = threading.Barrier(2, timeout=30)
+    original = vectorize_api._vectorize_response
+
+    def overlapping(*args):
+        barrier.wait()  # both requests are inside the profiled call
+        return original(*args)
+
+    monkeypatch.setattr(vectorize_api, "_vectorize_response", overlapping)
+    headers = {"X-Profile-Token": TOKEN, "X-Profile": "cprofile"}
+    responses = [None, None]
+
+    def send(i):
+        # Different options, so the two uploads are not coalesced
+        responses[i] = client.post(
+            "/vectorize",
+            files={"file": ("test.png", create_test_png(), "image/png")},
+            data={"colors": str(3 + i)},
+            headers=headers,
+        )
+
+    threads = [threading.Thread(target=send, args=(i,)) for i in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [r.status_code for r in responses] == [200, 200]
+    reports = [
+        client.get(f"/admin/profiles/{r.headers['x-profile-id']}", headers=admin_headers()).text
+        for r in responses
+    ]
+    assert sum("sampled instead" in report for report in reports) == 1
+    assert any("vectorize_image" in report for report in reports)
+
+
+def test_requests_without_token_are_not_profiled(client):
+    assert "x-profile-id" not in vectorize(client).headers
+    assert "x-profile-id" not in vectorize(client, {"X-Profile-Token": "wrong"}).headers
+
+
+def test_admin_sampling_and_store_bound(client):
+    assert client.get("/admin/profiles", headers=admin_headers("wrong")).status_code == 403
+
+    armed = client.post(
+        "/admin/profiles/sample", data={"count": "3", "rate": "1"}, headers=admin_headers()
+    )
+    assert armed.status_code == 200
+
+    ids = [vectorize(client).headers.get("x-profile-id") for _ in range(4)]
+    assert all(ids[:3]) and ids[3] is None
+
+    listed = client.get("/admin/profiles", headers=admin_headers()).json()["profiles"]
+    assert len(listed) == 2
+
+
+def test_admin_hidden_without_token(monkeypatch):
+    monkeypatch.delenv("EKTOOLS_PROFILE_TOKEN", raising=False)
+
+    response = TestClient(app).get("/admin/profiles", headers=admin_headers())
+
+    assert response.status_code == 404
@@ -0,0 +1,58 @@
+"""
+Tests for color quantization.
+"""
+import numpy as np
+
+from src.core.quantize import quantize_colors, quantize_colors_auto
+
+
+def make_striped_image(n_colors: int, size: int = 64) -> np.ndarray:
+    """Create a BGR image with ``n_colors`` vertical stripes plus mild noise."""
+    rng = np.random.default_rng(0)
+    palette = rng.integers(0, 256, size=(n_colors, 3))
+    stripes = np.repeat(np.arange(n_colors), -(-size // n_colors))[:size]
+    image = palette[stripes][None, :, :].repeat(size, axis=0).astype(np.int16)
+    image += rng.integers(-2, 3, size=image.shape)
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+
+def test_auto_colors_finds_palette_size():
+    """The smallest palette meeting the error target is selected."""
+    image = make_striped_image(5)
+
+    quantized, labels, colors = quantize_colors_auto(image)
+
+    assert len(colors) == 5
+    assert labels.shape == image.shape[:2]
+    assert quantized.shape == image.shape
+
+
+def test_auto_colors_respects_max_colors():
+    """The palette never grows beyond ``max_colors``."""
+    image = make_striped_image(12)
+
+    _, labels, colors = quantize_colors_auto(image, max_colors=4)
+
+    assert len(colors) == 4
+    assert labels.max() < 4
+
+
+def test_auto_colors_single_color():
+    """A flat image yields its only color without running K-means."""
+    image = np.full((10, 10, 3), (10, 20, 30), dtype=np.uint8)
+
+    _, labels, colors = quantize_colors_auto(image)
+
+    assert colors == [(30, 20, 10)]
+    assert not labels.any()
+
+
+def test_fewer_colors_than_requested():
+    """An image with fewer distinct colors gets only those, no duplicates."""
+    image = np.zeros((10, 10, 3), dtype=np.uint8)
+    image[:, 5:] = (255, 0, 0)
+
+    _, labels, colors = quantize_colors(image, 5)
+
+    assert sorted(colors) == [(0, 0, 0), (0, 0, 255)]
+    assert set(np.unique(labels)) == {0, 1}
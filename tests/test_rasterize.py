@@ -1,14 +1,38 @@
 """
 Tests for /rasterize endpoint.
 """
+import io
+
+import numpy as np
 import pytest
 from fastapi.testclient import TestClient
+from PIL import Image
 
+from src.core import rasterizer
+from src.core.rasterizer import (
+    RenderSizeMismatch,
+    RenderTooLarge,
+    check_output_size,
+    svg_output_size,
+    svg_to_png_stream,
+)
 from src.main import app
+from src.utils.image_io import PNGStreamEncoder
 
 client = TestClient(app)
 
 
+def _cairo_available() -> bool:
+    try:
+        import cairosvg  # noqa: F401
+    except (ImportError, OSError):
+        return False
+    return True
+
+
+requires_cairo = pytest.mark.skipif(not _cairo_available(), reason="libcairo is not installed")
+
+
 def create_test_svg() -> bytes:
     """Create a simple test SVG."""
     svg_content = """<?xml version="1.0" encoding="UTF-8"?>
@@ -68,3 +92,91 @@ def test_rasterize_invalid_svg():
     # Should either succeed (if CairoSVG is lenient) or return 500
     assert response.status_code in [200, 500]
 
+
+
+def test_rasterize_rejects_oversized_output():
+    """Outputs over the pixel budget are refused before rendering."""
+    huge_svg = b'<svg xmlns="http://www.w3.org/2000/svg" width="100000" height="100000"/>'
+
+    response = client.post(
+        "/rasterize",
+        files={"file": ("huge.svg", huge_svg, "image/svg+xml")}
+    )
+
+    assert response.status_code == 400
+    assert "pixel budget" in response.json()["detail"]
+
+
+def test_svg_output_size():
+    """Output size follows CairoSVG's units, viewBox fallback and scaling."""
+    svg = b'<svg xmlns="http://www.w3.org/2000/svg" width="1in" height="50%" viewBox="0 0 10 40"/>'
+
+    assert svg_output_size(svg) == (96, 40)
+    assert svg_output_size(svg, width=192) == (192, 80)
+    assert svg_output_size(create_test_svg(), width=30, height=20) == (30, 20)
+    with pytest.raises(RenderTooLarge):
+        check_output_size(create_test_svg(), max_pixels=9999)
+    with pytest.raises(ValueError):
+        svg_output_size(b"<not>a valid svg</not>")
+
+
+def test_png_stream_encoder_round_trip():
+    """Strips fed to the streaming encoder decode to the original pixels."""
+    rgba = np.random.default_rng(0).integers(0, 256, (25, 13, 4), dtype=np.uint8)
+
+    encoder = PNGStreamEncoder(13, 25)
+    png = encoder.header()
+    for top in range(0, 25, 10):
+        png += encoder.encode(rgba[top : top + 10])
+    png += encoder.finish()
+
+    assert np.array_equal(np.array(Image.open(io.BytesIO(png))), rgba)
+
+
+def test_rasterize_rejects_use_expansion():
+    """Nested <use> fan-out is refused by the complexity scan."""
+    parts = [b'<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10"><defs><rect id="l0"/>']
+    for level in range(1, 9):
+        parts.append(f'<g id="l{level}">'.encode() + f'<use href="#l{level - 1}"/>'.encode() * 10 + b"</g>")
+    parts.append(b'</defs><use href="#l8"/></svg>')
+
+    response = client.post(
+        "/rasterize",
+        files={"file": ("laughs.svg", b"".join(parts), "image/svg+xml")}
+    )
+
+    assert response.status_code == 400
+    assert "<use>" in response.json()["detail"]
+
+
+STRIP_SVG = b"""<svg xmlns="http://www.w3.org/2000/svg" width="120" height="90" viewBox="0 0 60 45">
+  <defs><linearGradient id="g"><stop offset="0" stop-color="#c8102e"/><stop offset="1" stop-color="#00f" stop-opacity="0.3"/></linearGradient></defs>
+  <rect width="60" height="45" fill="url(#g)"/>
+  <circle cx="30" cy="22" r="17" fill="#0a0" fill-opacity="0.6"/>
+  <rect x="5" y="30%" width="50%" height="3" fill="#fff"/>
+</svg>"""
+
+
+@requires_cairo
+def test_strip_rendering_matches_whole(monkeypatch):
+    """Rendering in strips of 7 rows gives the same pixels as one surface."""
+    monkeypatch.setattr(rasterizer, "STRIP_PIXELS", 120 * 7)
+
+    strips = b"".join(svg_to_png_stream(STRIP_SVG))
+    whole = rasterizer._render_whole(STRIP_SVG, None, None)
+
+    strip_pixels = np.asarray(Image.open(io.BytesIO(strips)).convert("RGBA"), dtype=np.int16)
+    whole_pixels = np.asarray(Image.open(io.BytesIO(whole)).convert("RGBA"), dtype=np.int16)
+    assert strip_pixels.shape == whole_pixels.shape == (90, 120, 4)
+    assert np.abs(strip_pixels - whole_pixels).max() <= 1
+
+
+@requires_cairo
+def test_strip_rendering_checks_size_before_streaming(monkeypatch):
+    """A wrong size estimate fails before the PNG header is sent."""
+    monkeypatch.setattr(rasterizer, "STRIP_PIXELS", 120 * 7)
+    monkeypatch.setattr(rasterizer, "check_output_size", lambda *args: (121, 90))
+
+    stream = svg_to_png_stream(STRIP_SVG)
+    with pytest.raises(RenderSizeMismatch):
+        next(stream)
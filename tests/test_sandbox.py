@@ -0,0 +1,60 @@
+"""
+Tests for the killable render sandbox.
+"""
+import time
+
+import pytest
+
+from src.core.sandbox import RenderSandbox, RenderTimeout
+
+
+def _echo(data: bytes, delay: float):
+    """Render stand-in: sleeps, then yields its input in two chunks."""
+    time.sleep(delay)
+    if not data:
+        raise ValueError("nothing to render")
+    yield data[:1]
+    yield data[1:]
+
+
+def test_sandbox_kills_renders_over_budget():
+    """An overrunning worker is killed and the next render gets a fresh one."""
+    sandbox = RenderSandbox(_echo, workers=1, timeout=10)
+    try:
+        assert sandbox.render(b"png", 0) == b"png"
+
+        start = time.monotonic()
+        with pytest.raises(RenderTimeout):
+            sandbox.render(b"png", 60, timeout=0.5)
+        assert time.monotonic() - start < 5
+        assert sandbox.killed == 1
+
+        assert sandbox.render(b"again", 0) == b"again"
+    finally:
+        sandbox.close()
+
+
+def test_sandbox_reraises_render_errors():
+    sandbox = RenderSandbox(_echo, workers=1, timeout=10)
+    try:
+        with pytest.raises(ValueError, match="nothing to render"):
+            sandbox.render(b"", 0)
+        # The worker survived the error and is reused
+        assert sandbox.render(b"ok", 0) == b"ok"
+        assert sandbox.killed == 0
+    finally:
+        sandbox.close()
+
+
+def test_sandbox_budget_excludes_slow_readers():
+    """Time the consumer holds a chunk is not charged to the render."""
+    sandbox = RenderSandbox(_echo, workers=1, timeout=10)
+    try:
+        chunks = []
+        for chunk in sandbox.render_stream(b"png", 0, timeout=1):
+            chunks.append(chunk)
+            time.sleep(0.8)
+        assert b"".join(chunks) == b"png"
+        assert sandbox.killed == 0
+    finally:
+        sandbox.close()
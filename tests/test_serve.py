@@ -0,0 +1,78 @@
+"""
+Tests for the preforking server.
+"""
+import io
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+from PIL import Image
+
+from src import serve
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_threads_per_worker_splits_cores():
+    assert serve.threads_per_worker(4, cpus=16) == 4
+    assert serve.threads_per_worker(3, cpus=8) == 2
+    assert serve.threads_per_worker(8, cpus=2) == 1
+
+
+def test_pin_thread_env_keeps_operator_values(monkeypatch):
+    for name in serve.THREAD_ENV_VARS:
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("OMP_NUM_THREADS", "3")
+
+    pinned = serve.pin_thread_env(2)
+
+    assert pinned["OMP_NUM_THREADS"] == "3"
+    assert pinned["OPENBLAS_NUM_THREADS"] == "2"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_forked_workers_serve_vectorize():
+    """Workers forked from the preloaded master can run K-means and tracing."""
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "src.serve", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", "2", "--log-level", "warning"],
+        cwd=REPO_ROOT,
+    )
+    image = Image.new("RGB", (40, 40), color=(255, 255, 255))
+    image.paste((200, 0, 0), (10, 10, 30, 30))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+
+    try:
+        url = f"http://127.0.0.1:{port}"
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                if httpx.get(f"{url}/health").status_code == 200:
+                    break
+            except httpx.TransportError:
+                if time.monotonic() > deadline or server.poll() is not None:
+                    raise
+                time.sleep(0.1)
+
+        response = httpx.post(
+            f"{url}/vectorize",
+            files={"file": ("test.png", buffer.getvalue(), "image/png")},
+            data={"colors": "2"},
+            timeout=60,
+        )
+        assert response.status_code == 200
+        assert "<svg" in response.text
+    finally:
+        server.send_signal(signal.SIGTERM)
+        assert server.wait(timeout=30) == 0
@@ -0,0 +1,90 @@
+"""
+Tests for shared memory arrays handed to worker processes.
+"""
+import io
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.core import background
+from src.core.pipeline import remove_background_image
+from src.core.sandbox import RenderSandbox
+from src.core.shared_arrays import SharedArena, attach
+
+
+def _invert(source, target, crash: bool = False):
+    """Worker stand-in: writes the inverted input, or dies halfway."""
+    with attach(source) as src, attach(target) as dst:
+        if crash:
+            os._exit(1)
+        np.subtract(255, src, out=dst)
+    return iter(())
+
+
+def _exists(name: str) -> bool:
+    try:
+        segment = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return False
+    segment.close()
+    return True
+
+
+def test_worker_writes_into_shared_arrays():
+    sandbox = RenderSandbox(_invert, workers=1, timeout=30)
+    try:
+        with SharedArena() as shared:
+            source = shared.empty((64, 48, 3), np.uint8)
+            source[:] = np.arange(64 * 48 * 3, dtype=np.uint8).reshape(source.shape)
+            target = shared.empty(source.shape, np.uint8)
+
+            sandbox.render(shared.handle(source), shared.handle(target))
+
+            np.testing.assert_array_equal(target, 255 - source)
+            assert shared.nbytes == 2 * source.nbytes
+            del source, target
+
+        with pytest.raises(ValueError):
+            shared.handle(np.zeros(3))
+    finally:
+        sandbox.close()
+
+
+def test_segments_are_unlinked_when_the_worker_crashes():
+    sandbox = RenderSandbox(_invert, workers=1, timeout=30)
+    try:
+        with SharedArena() as shared:
+            source = shared.empty((16, 16), np.uint8)
+            target = shared.empty((16, 16), np.uint8)
+            names = [shared.handle(source).name, shared.handle(target).name]
+            with pytest.raises(RuntimeError, match="exited unexpectedly"):
+                sandbox.render(shared.handle(source), shared.handle(target), True)
+            del source, target
+        assert sandbox.killed == 1
+        assert not any(_exists(name) for name in names)
+    finally:
+        sandbox.close()
+
+
+def test_remove_background_in_worker_matches_in_process(monkeypatch):
+    img = Image.new("RGB", (80, 60), color="white")
+    img.paste((200, 30, 30), (20, 15, 60, 45))
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+
+    expected = remove_background_image(buffer.getvalue())
+
+    sandbox = RenderSandbox(background.remove_background_shared, workers=1, timeout=60)
+    monkeypatch.setattr(background, "segment_workers", 1)
+    monkeypatch.setattr(background, "segment_sandbox", sandbox)
+    try:
+        isolated = remove_background_image(buffer.getvalue())
+    finally:
+        sandbox.close()
+
+    assert np.array_equal(
+        np.asarray(Image.open(io.BytesIO(isolated))), np.asarray(Image.open(io.BytesIO(expected)))
+    )
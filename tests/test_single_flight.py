@@ -0,0 +1,55 @@
+"""
+Tests for in-flight request coalescing.
+"""
+import asyncio
+import threading
+
+import pytest
+
+from src.core.single_flight import SingleFlight
+
+
+def test_identical_calls_share_one_run():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def work(value):
+        calls.append(value)
+        release.wait(5)
+        return object()
+
+    async def main():
+        tasks = [asyncio.ensure_future(flight.do("same", work, 1)) for _ in range(5)]
+        other = asyncio.ensure_future(flight.do("other", work, 2))
+        await asyncio.sleep(0.05)
+        assert flight.in_flight == 2
+        release.set()
+        return await asyncio.gather(*tasks), await other
+
+    results, other = asyncio.run(main())
+
+    assert sorted(calls) == [1, 2]
+    assert all(result is results[0] for result in results)
+    assert other is not results[0]
+    assert (flight.leaders, flight.coalesced, flight.in_flight) == (2, 4, 0)
+
+
+def test_errors_are_shared_and_not_cached():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("boom")
+
+    async def main():
+        return await asyncio.gather(
+            flight.do("key", fail), flight.do("key", fail), return_exceptions=True
+        )
+
+    errors = asyncio.run(main())
+    assert all(isinstance(error, ValueError) for error in errors)
+
+    # The key is free again once the failed run finished
+    with pytest.raises(ValueError):
+        asyncio.run(flight.do("key", fail))
+    assert flight.leaders == 2
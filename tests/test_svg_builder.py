@@ -0,0 +1,34 @@
+"""
+Tests for SVG document assembly.
+"""
+import xml.etree.ElementTree as ET
+
+from src.core.svg_builder import build_svg, format_color
+
+SVG_NS = "{http://www.w3.org/2000/svg}"
+
+
+def test_format_color_uses_short_hex():
+    assert format_color((255, 0, 0)) == "#f00"
+    assert format_color((200, 16, 46)) == "#c8102e"
+
+
+def test_same_color_paths_share_one_element():
+    """One flipped root group; subpaths of a color merge in paint order."""
+    paths = [
+        ("M0 0l1 0 0 1z", (255, 255, 255)),
+        ("M2 2l1 0 0 1z", (0, 0, 255)),
+        ("M5 5l1 0 0 1z", (255, 255, 255)),
+        ("", (0, 0, 0)),
+    ]
+
+    root = ET.fromstring(build_svg(10, 8, paths))
+
+    groups = root.findall(f"{SVG_NS}g")
+    assert len(groups) == 1
+    assert groups[0].get("transform") == "matrix(1 0 0 -1 0 8)"
+    elements = groups[0].findall(f"{SVG_NS}path")
+    assert [(p.get("fill"), p.get("d")) for p in elements] == [
+        ("#fff", "M0 0l1 0 0 1zM5 5l1 0 0 1z"),
+        ("#00f", "M2 2l1 0 0 1z"),
+    ]
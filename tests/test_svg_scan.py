@@ -0,0 +1,52 @@
+"""
+Tests for the SVG complexity scan.
+"""
+import pytest
+
+from src.core.svg_scan import ScanLimits, SvgTooComplex, check_svg_complexity, scan_svg
+
+SVG_OPEN = b'<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink">'
+
+
+def _nested_uses(levels: int, fan_out: int) -> bytes:
+    """Each level is a group of ``fan_out`` uses of the level below."""
+    parts = [SVG_OPEN, b'<defs><rect id="l0" width="1" height="1"/>']
+    for level in range(1, levels + 1):
+        uses = f'<use xlink:href="#l{level - 1}"/>' * fan_out
+        parts.append(f'<g id="l{level}">{uses}</g>'.encode())
+    parts.append(f'</defs><use href="#l{levels}"/></svg>'.encode())
+    return b"".join(parts)
+
+
+def test_scan_counts_expanded_uses_paths_and_filters():
+    stats = scan_svg(_nested_uses(3, 10))
+    assert stats.use_depth == 4
+    # 1 + 10 + 100 + 1000 groups/rects reachable from the top-level use
+    assert stats.rendered_elements > 1000
+
+    svg = SVG_OPEN + (
+        b'<filter id="f"><feGaussianBlur stdDeviation="3"/></filter>'
+        b'<path d="M0 0L10-5,20 5z" filter="url(#f)"/>'
+        b'<polygon points="0,0 4,0 4,4"/></svg>'
+    )
+    stats = scan_svg(svg)
+    assert stats.filters == 2
+    # 6 polygon numbers; "0L10" counts once in the path's estimate of 5
+    assert stats.path_values == 5 + 6
+    assert stats.max_depth == 3
+
+
+def test_check_rejects_over_budget_documents():
+    with pytest.raises(SvgTooComplex, match="elements after <use> expansion"):
+        check_svg_complexity(_nested_uses(8, 10))
+
+    cycle = SVG_OPEN + b'<g id="a"><use href="#b"/></g><g id="b"><use href="#a"/></g></svg>'
+    with pytest.raises(SvgTooComplex, match="cycle"):
+        scan_svg(cycle)
+
+    with pytest.raises(SvgTooComplex, match="path coordinates"):
+        check_svg_complexity(
+            SVG_OPEN + b'<path d="M0 0 1 1 2 2"/></svg>', ScanLimits(max_path_values=4)
+        )
+
+    assert check_svg_complexity(_nested_uses(2, 3)).use_depth == 3
@@ -0,0 +1,127 @@
+"""
+Tests for mask tracing and path simplification.
+"""
+import re
+
+import numpy as np
+
+from src.core.potrace_backend import PotraceCLI, encode_pbm
+from src.core.simplify import contour_to_path, douglas_peucker, encode_segments
+from src.core.trace import trace_label_image, trace_mask_marching_squares
+
+
+def path_points(path: str) -> np.ndarray:
+    """Absolute vertices of an "M x y l dx dy ... z" polygon path."""
+    numbers = [float(n) for n in re.findall(r"-?\d*\.?\d+", path)]
+    points = np.array(numbers).reshape(-1, 2)
+    return np.cumsum(points, axis=0)
+
+
+def test_douglas_peucker_drops_collinear_points():
+    """Collinear vertices are removed; corners are kept."""
+    points = np.array([[0, 0], [1, 0], [2, 0], [2, 1], [2, 2]], dtype=float)
+
+    assert douglas_peucker(points, 0.1).tolist() == [0, 2, 4]
+
+
+def test_encode_segments_relative_integer():
+    """Paths use relative commands and minimal number formatting."""
+    segments = [("L", np.array([10.0, 0.0])), ("L", np.array([10.0, 5.0]))]
+
+    assert encode_segments(np.array([0.0, 0.0]), segments) == "M0 0l10 0 0 5z"
+    assert encode_segments(np.array([0.5, 0.0]), segments, precision=1) == "M.5 0l9.5 0 0 5z"
+
+
+def test_circle_is_fitted_with_curves():
+    """Smooth contours become a handful of cubic segments."""
+    t = np.linspace(0, 2 * np.pi, 400, endpoint=False)
+    circle = np.c_[100 + 80 * np.cos(t), 100 + 80 * np.sin(t)]
+
+    path = contour_to_path(circle, detail=0.5)
+
+    assert "c" in path
+    assert path.count("c") + len(re.findall(r"-?\d+", path)) < 60
+
+
+def test_marching_squares_uses_y_up_pixel_corners():
+    """Traced coordinates follow Potrace's y-up convention used by build_svg."""
+    mask = np.zeros((20, 20), dtype=np.uint8)
+    mask[0:5, 0:8] = 255  # block in the top-left corner
+
+    paths = trace_mask_marching_squares(mask, detail=1.0)
+
+    assert len(paths) == 1
+    points = path_points(paths[0])
+    assert points[:, 0].min() >= -0.5 and points[:, 0].max() <= 8.5
+    assert points[:, 1].min() >= 14.5 and points[:, 1].max() <= 20.5
+
+
+def test_marching_squares_drops_specks():
+    """Single-pixel islands collapse below the default tolerance."""
+    mask = np.zeros((20, 20), dtype=np.uint8)
+    mask[10, 10] = 255
+
+    assert trace_mask_marching_squares(mask) == []
+
+
+def test_encode_pbm_packs_rows():
+    """Rows are packed MSB first and padded to whole bytes."""
+    mask = np.zeros((2, 10), dtype=np.uint8)
+    mask[0, 0] = 255
+    mask[1, 9] = 255
+
+    assert encode_pbm(mask) == b"P4\n10 2\n" + bytes([0x80, 0x00, 0x00, 0x40])
+
+
+def test_potrace_cli_missing_executable():
+    """A missing binary is reported unavailable without running anything."""
+    backend = PotraceCLI(executable="potrace-does-not-exist")
+
+    assert not backend.available()
+    assert backend.trace(np.zeros((4, 4), dtype=np.uint8)) is None
+
+
+def test_potrace_cli_disabled_after_failures():
+    """Repeated failures take the backend out of rotation until retried."""
+    backend = PotraceCLI(executable="false", max_failures=2, retry_interval=60)
+    mask = np.full((4, 4), 255, dtype=np.uint8)
+
+    assert backend.available()
+    assert backend.trace(mask) is None
+    assert backend.trace(mask) is None
+    assert not backend.available()
+
+
+def test_marching_squares_cuts_holes():
+    """A ring is one path with the hole as a second subpath."""
+    mask = np.zeros((30, 30), dtype=np.uint8)
+    mask[5:25, 5:25] = 255
+    mask[12:18, 12:18] = 0
+
+    paths = trace_mask_marching_squares(mask, detail=1.0)
+
+    assert len(paths) == 1
+    assert paths[0].count("M") == 2
+
+
+def test_label_image_neighbours_meet_exactly():
+    """Adjacent regions trace their common border with identical vertices."""
+    labels = np.zeros((20, 20), dtype=np.int32)
+    labels[:, 10:] = 1
+
+    paths = trace_label_image(labels, detail=1.0)
+
+    left, right = (path_points(paths[label]) for label in (0, 1))
+    on_border = lambda points: {tuple(p) for p in points if p[0] == 10}
+    assert on_border(left) == on_border(right) == {(10.0, 0.0), (10.0, 20.0)}
+
+
+def test_label_image_selected_labels():
+    """Only the requested labels are returned."""
+    labels = np.zeros((20, 20), dtype=np.int32)
+    labels[5:15, 5:15] = 1
+
+    paths = trace_label_image(labels, labels=[1])
+
+    assert list(paths) == [1]
+    assert paths[1].count("M") == 1
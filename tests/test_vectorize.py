@@ -3,8 +3,9 @@ Tests for /vectorize endpoint.
 """
 import pytest
 from fastapi.testclient import TestClient
-from PIL import Image
+from PIL import Image, ImageDraw
 import io
+import re
 
 from src.main import app
 
@@ -31,12 +32,14 @@ def test_vectorize_success():
     
     assert response.status_code == 200
     assert response.headers["content-type"] == "text/plain; charset=utf-8"
+    assert int(response.headers["x-buffer-bytes"]) > 0
+    assert int(response.headers["x-rss-bytes"]) > 0
     
     # Check that response contains SVG
     svg_content = response.text
     assert "<svg" in svg_content.lower()
     assert "xmlns" in svg_content.lower()
-    assert "viewBox" in svg_content.lower()
+    assert "viewbox" in svg_content.lower()
 
 
 def test_vectorize_invalid_file_type():
@@ -98,3 +101,268 @@ def test_vectorize_missing_colors():
     
     assert response.status_code == 422  # FastAPI validation error
 
+
+
+def create_two_color_png(width: int = 60, height: int = 60) -> bytes:
+    """Create a PNG split into a red and a blue half."""
+    img = Image.new("RGB", (width, height), color="red")
+    img.paste((0, 0, 255), (width // 2, 0, width, height))
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_vectorize_auto_colors():
+    """Test that colors=auto picks the smallest sufficient palette."""
+    png_bytes = create_two_color_png()
+
+    response = client.post(
+        "/vectorize",
+        files={"file": ("test.png", png_bytes, "image/png")},
+        data={"colors": "auto"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["x-colors"] == "2"
+    assert "<svg" in response.text.lower()
+
+
+def test_vectorize_reports_distinct_colors():
+    """Asking for more colors than the image has reports the real count."""
+    response = client.post(
+        "/vectorize",
+        files={"file": ("test.png", create_two_color_png(), "image/png")},
+        data={"colors": "6"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["x-colors"] == "2"
+    assert sorted(response.headers["x-palette"].split(",")) == ["#0000ff", "#ff0000"]
+
+
+def test_vectorize_invalid_color_error():
+    """Test rejection of non-positive and non-finite color_error values."""
+    png_bytes = create_two_color_png()
+
+    for value in ("0", "-1", "nan", "inf"):
+        response = client.post(
+            "/vectorize",
+            files={"file": ("test.png", png_bytes, "image/png")},
+            data={"colors": "auto", "color_error": value}
+        )
+        assert response.status_code == 400
+
+
+def test_vectorize_invalid_colors_string():
+    """Test rejection of non-numeric colors other than 'auto'."""
+    png_bytes = create_test_png()
+
+    response = client.post(
+        "/vectorize",
+        files={"file": ("test.png", png_bytes, "image/png")},
+        data={"colors": "many"}
+    )
+
+    assert response.status_code == 400
+
+
+def test_vectorize_returns_palette():
+    """Test that the fitted palette is returned and reusable."""
+    png_bytes = create_two_color_png()
+
+    response = client.post(
+        "/vectorize",
+        files={"file": ("test.png", png_bytes, "image/png")},
+        data={"colors": "2"}
+    )
+    assert response.status_code == 200
+    palette = response.headers["x-palette"]
+    assert sorted(palette.split(",")) == ["#0000ff", "#ff0000"]
+
+    # Reusing the palette skips fitting entirely
+    response = client.post(
+        "/vectorize",
+        files={"file": ("test.png", png_bytes, "image/png")},
+        data={"colors": "5", "palette": palette}
+    )
+    assert response.status_code == 200
+    assert response.headers["x-palette-source"] == "supplied"
+    assert response.headers["x-colors"] == "2"
+
+
+def test_vectorize_unused_palette_color():
+    """An unused palette color must not be painted over the whole canvas."""
+    png_bytes = create_two_color_png()
+
+    response = client.post(
+        "/vectorize",
+        files={"file": ("test.png", png_bytes, "image/png")},
+        data={"colors": "3", "palette": "#ff0000,#0000ff,#00ff00"}
+    )
+
+    assert response.status_code == 200
+    fills = re.findall(r'<path fill="([^"]+)"', response.text)
+    assert sorted(fills) == ["#00f", "#f00"]
+
+
+def test_vectorize_warm_palette_cache():
+    """Test that repeated artwork warm-starts from the cached palette."""
+    png_bytes = create_two_color_png(80, 40)
+
+    for _ in range(2):
+        response = client.post(
+            "/vectorize",
+            files={"file": ("test.png", png_bytes, "image/png")},
+            data={"colors": "2"}
+        )
+        assert response.status_code == 200
+
+    assert response.headers["x-palette-source"] == "warm"
+
+
+def test_vectorize_invalid_palette():
+    """Test rejection of malformed palettes."""
+    png_bytes = create_test_png()
+
+    response = client.post(
+        "/vectorize",
+        files={"file": ("test.png", png_bytes, "image/png")},
+        data={"colors": "5", "palette": "#ff0000,notacolor"}
+    )
+
+    assert response.status_code == 400
+
+
+def create_shapes_png(size: int = 120) -> bytes:
+    """Create a PNG with a few colored circles on white."""
+    img = Image.new("RGB", (size, size), color="white")
+    draw = ImageDraw.Draw(img)
+    for i, color in enumerate(["red", "green", "blue"]):
+        offset = 15 + i * 30
+        draw.ellipse((offset, offset, offset + 30, offset + 30), fill=color)
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_vectorize_detail_shrinks_output():
+    """Test that lower detail produces a smaller SVG."""
+    png_bytes = create_shapes_png()
+
+    sizes = {}
+    for detail in ("1", "0"):
+        response = client.post(
+            "/vectorize",
+            files={"file": ("test.png", png_bytes, "image/png")},
+            data={"colors": "4", "detail": detail}
+        )
+        assert response.status_code == 200
+        sizes[detail] = len(response.content)
+
+    assert sizes["0"] < sizes["1"]
+
+
+def test_vectorize_max_bytes_lowers_detail():
+    """Test that a size budget steps the detail level down."""
+    png_bytes = create_shapes_png()
+
+    response = client.post(
+        "/vectorize",
+        files={"file": ("test.png", png_bytes, "image/png")},
+        data={"colors": "4", "detail": "1", "max_bytes": "1"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["x-detail"] == "0"
+
+
+def test_vectorize_invalid_detail():
+    """Test rejection of detail outside [0, 1]."""
+    png_bytes = create_test_png()
+
+    response = client.post(
+        "/vectorize",
+        files={"file": ("test.png", png_bytes, "image/png")},
+        data={"colors": "5", "detail": "2"}
+    )
+
+    assert response.status_code == 400
+
+
+def test_vectorize_speckle_filter():
+    """Test that isolated specks do not become paths."""
+    img = Image.new("RGB", (60, 60), color="white")
+    img.paste((0, 0, 0), (10, 10, 40, 40))
+    for x, y in [(50, 5), (5, 50), (52, 52)]:
+        img.putpixel((x, y), (0, 0, 0))
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+
+    paths = {}
+    for speckle_area in ("0", "5"):
+        response = client.post(
+            "/vectorize",
+            files={"file": ("test.png", buffer.getvalue(), "image/png")},
+            data={"colors": "2", "speckle_area": speckle_area, "detail": "1"}
+        )
+        assert response.status_code == 200
+        # Subpaths across all path elements
+        paths[speckle_area] = sum(d.count("M") for d in re.findall(r' d="([^"]*)"', response.text))
+
+    assert paths["5"] < paths["0"]
+
+
+def test_vectorize_tracers():
+    """Both tracers produce an SVG; unknown tracers are rejected."""
+    png_bytes = create_shapes_png()
+
+    for tracer in ("shared", "layers"):
+        response = client.post(
+            "/vectorize",
+            files={"file": ("test.png", png_bytes, "image/png")},
+            data={"colors": "4", "tracer": tracer}
+        )
+        assert response.status_code == 200
+        assert "<path" in response.text
+
+    response = client.post(
+        "/vectorize",
+        files={"file": ("test.png", png_bytes, "image/png")},
+        data={"colors": "4", "tracer": "potrace"}
+    )
+    assert response.status_code == 400
+
+
+def test_vectorize_prefilter():
+    """Prefilters are accepted by name; unknown ones are rejected."""
+    png_bytes = create_shapes_png()
+
+    response = client.post(
+        "/vectorize",
+        files={"file": ("test.png", png_bytes, "image/png")},
+        data={"colors": "4", "prefilter": "bilateral"}
+    )
+    assert response.status_code == 200
+
+    response = client.post(
+        "/vectorize",
+        files={"file": ("test.png", png_bytes, "image/png")},
+        data={"colors": "4", "prefilter": "gaussian"}
+    )
+    assert response.status_code == 400
+
+
+def test_vectorize_max_trace_pixels():
+    """Large images are traced at a working size and scaled back by the viewBox."""
+    png_bytes = create_two_color_png(200, 100)
+
+    response = client.post(
+        "/vectorize",
+        files={"file": ("test.png", png_bytes, "image/png")},
+        data={"colors": "2", "max_trace_pixels": "5000"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["x-trace-size"] == "100x50"
+    assert 'width="200" height="100"' in response.text
+    assert 'viewBox="0 0 100 50"' in response.text